@@ -0,0 +1,167 @@
+#Measures the SFTP code paths against a local server with WAN-like latency and bandwidth
+#
+# Usage (from the repo root):
+#   python -m benchmarks.bench_sftp
+#   python -m benchmarks.bench_sftp --latency 0 0.02 0.08 --bandwidth 10 --channels 4
+#
+# Results use the same JSON layout as run_benchmarks.py, so benchmarks.compare works on them.
+
+import argparse
+import datetime
+import json
+import logging
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath, Path
+from typing import Dict, List
+
+import paramiko
+
+from jade_api.remoteSetup import sftp_connect
+from jade_api.scan import get_asset_types, get_asset_names
+
+from benchmarks.generate_show import generate_show
+from benchmarks.run_benchmarks import RESULTS_DIR, _git_label
+from benchmarks.sftp_server import BENCH_PASSWORD, BENCH_USER, BenchSFTPServer
+
+REMOTE_ROOT = PurePosixPath("/")
+
+
+def _timed(func, repeat: int, shaper=None) -> Dict[str, float]:
+    samples = []
+    round_trips = 0
+    for _ in range(repeat):
+        before = shaper.requests if shaper else 0
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+        round_trips = (shaper.requests - before) if shaper else 0
+    return {"min": min(samples), "median": statistics.median(samples), "runs": repeat,
+            "round_trips": round_trips}
+
+
+def bench_link(show_root: Path, latency: float, bandwidth: float, repeat: int,
+               channels: int, upload_size: int) -> Dict[str, object]:
+    """Run every remote measurement against one server configuration."""
+    bandwidth_bytes = bandwidth * 1024 ** 2 if bandwidth else None
+    results = {"params": {"latency": latency, "bandwidth_MBps": bandwidth, "channels": channels,
+                          "upload_bytes": upload_size}}
+
+    with BenchSFTPServer(show_root, latency=latency, bandwidth=bandwidth_bytes) as server:
+        shaper = server.shaper
+
+        start = time.perf_counter()
+        sftp_client, ssh_client = sftp_connect("127.0.0.1", BENCH_USER, BENCH_PASSWORD, server.port)
+        connect_seconds = time.perf_counter() - start
+        results["connect"] = {"min": connect_seconds, "median": connect_seconds, "runs": 1, "round_trips": 0}
+        if sftp_client is None:
+            raise RuntimeError("Could not connect to the benchmark SFTP server")
+
+        try:
+            # 1. Listing: the remote get_asset_names used by the SFTP GUI
+            def list_assets():
+                for asset_type in get_asset_types():
+                    get_asset_names(REMOTE_ROOT, asset_type, sftp_client=sftp_client)
+            results["get_asset_names"] = _timed(list_assets, repeat, shaper)
+
+            # 2. Stat: one stat per entry vs one listdir_attr for a whole export folder
+            export_dir = _first_export_dir(show_root)
+            remote_export = (REMOTE_ROOT / export_dir.relative_to(show_root)).as_posix()
+            names = sftp_client.listdir(remote_export)
+
+            def stat_each():
+                for name in names:
+                    sftp_client.stat(f"{remote_export}/{name}")
+            results["stat_per_file"] = _timed(stat_each, repeat, shaper)
+            results["stat_listdir_attr"] = _timed(lambda: sftp_client.listdir_attr(remote_export), repeat, shaper)
+
+            # 3. Pooling: the same per-file stats spread over several channels on one transport
+            transport = ssh_client.get_transport()
+            pool = [paramiko.SFTPClient.from_transport(transport) for _ in range(channels)]
+
+            def stat_pooled():
+                with ThreadPoolExecutor(max_workers=channels) as executor:
+                    list(executor.map(lambda i: pool[i % channels].stat(f"{remote_export}/{names[i]}"),
+                                      range(len(names))))
+            results["stat_pooled"] = _timed(stat_pooled, repeat, shaper)
+
+            # 4. Upload throughput
+            local_file = show_root.parent / "upload.bin"
+            local_file.write_bytes(b"\0" * upload_size)
+            remote_file = (REMOTE_ROOT / ".tools" / "upload.bin").as_posix()
+            upload = _timed(lambda: sftp_client.put(str(local_file), remote_file), repeat, shaper)
+            upload["MBps"] = upload_size / 1024 ** 2 / upload["min"] if upload["min"] else 0.0
+            results["upload"] = upload
+
+            for client in pool:
+                client.close()
+        finally:
+            sftp_client.close()
+            ssh_client.close()
+
+    return results
+
+
+def _first_export_dir(show_root: Path) -> Path:
+    # A shot export folder: holds one file per generated version
+    for path in sorted((show_root / "prod" / "sequences").glob("*/working/*/export")):
+        return path
+    raise RuntimeError("Generated show has no shot export folders")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the JADE SFTP code paths on a loopback server.")
+    parser.add_argument("--latency", type=float, nargs="*", default=[0.0, 0.02, 0.08],
+                        help="Round-trip latencies to test, in seconds")
+    parser.add_argument("--bandwidth", type=float, default=None, help="Bandwidth cap in MB/s (default: none)")
+    parser.add_argument("--channels", type=int, default=4, help="SFTP channels in the pooled stat test")
+    parser.add_argument("--upload-mb", type=float, default=8, help="Size of the upload test file in MB")
+    parser.add_argument("--assets", type=int, default=20)
+    parser.add_argument("--shots", type=int, default=5)
+    parser.add_argument("--versions", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--label", default=None)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    # jade_api turns on DEBUG logging, and paramiko logs every packet at that level
+    logging.getLogger("paramiko").setLevel(logging.WARNING)
+
+    label = args.label or _git_label()
+    report = {
+        "label": label,
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": {},
+    }
+
+    temp_dir = Path(tempfile.mkdtemp(prefix="jade_sftp_bench_"))
+    try:
+        show_root = temp_dir / "show"
+        generate_show(show_root, args.assets, args.shots, args.versions, udims=2)
+        for latency in args.latency:
+            name = f"lat{int(latency * 1000)}ms" + (f"_bw{args.bandwidth:g}MBps" if args.bandwidth else "")
+            print(f"Running link '{name}'")
+            report["results"][name] = bench_link(show_root, latency, args.bandwidth, args.repeat,
+                                                 args.channels, int(args.upload_mb * 1024 ** 2))
+            for stage, timing in report["results"][name].items():
+                if stage != "params":
+                    print(f"  {stage:<20} min {timing['min']:.4f}s  round trips {timing['round_trips']}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    output = args.output or RESULTS_DIR / f"sftp_{label}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+#Compares two benchmark result files and flags regressions
+#
+# Usage: python -m benchmarks.compare <baseline.json> <candidate.json> [--threshold 0.10]
+# Exits with 1 when any stage got slower than the threshold, so it can gate a CI job.
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List
+
+
+def compare(baseline: dict, candidate: dict, threshold: float, metric: str = "min") -> List[str]:
+    """Print a stage-by-stage comparison and return the list of regressed 'scale/stage' keys."""
+    regressions = []
+    print(f"{'scale/stage':<40} {baseline['label']:>12} {candidate['label']:>12} {'change':>9}")
+    for scale_name, stages in candidate["results"].items():
+        old_stages = baseline["results"].get(scale_name)
+        if not old_stages:
+            print(f"{scale_name}: not in baseline, skipped")
+            continue
+        if old_stages.get("params") != stages.get("params"):
+            print(f"{scale_name}: parameters differ, skipped")
+            continue
+        for stage, timing in stages.items():
+            if stage == "params" or stage not in old_stages:
+                continue
+            old = old_stages[stage][metric]
+            new = timing[metric]
+            change = (new - old) / old if old else 0.0
+            flag = ""
+            if change > threshold:
+                flag = "  REGRESSION"
+                regressions.append(f"{scale_name}/{stage}")
+            # Metadata op counts are deterministic, so any increase is a regression
+            old_ops = old_stages[stage].get("ops")
+            new_ops = timing.get("ops")
+            if old_ops is not None and new_ops is not None:
+                flag += f"  ops {old_ops} -> {new_ops}"
+                if new_ops > old_ops and f"{scale_name}/{stage}" not in regressions:
+                    flag += "  REGRESSION"
+                    regressions.append(f"{scale_name}/{stage}")
+            print(f"{scale_name + '/' + stage:<40} {old:>11.4f}s {new:>11.4f}s {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two JADE benchmark result files.")
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown ratio (0.10 = 10%%)")
+    parser.add_argument("--metric", choices=["min", "median"], default="min")
+    args = parser.parse_args(argv)
+
+    baseline = json.loads(args.baseline.read_text())
+    candidate = json.loads(args.candidate.read_text())
+    if baseline.get("backend", "local") != candidate.get("backend", "local"):
+        print(f"Backends differ ({baseline.get('backend', 'local')} vs {candidate.get('backend', 'local')}), "
+              f"timings are not comparable")
+        return 1
+    regressions = compare(baseline, candidate, args.threshold, args.metric)
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
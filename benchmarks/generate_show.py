@@ -0,0 +1,119 @@
+#Builds synthetic shows on disk with the real DIR_CONFIG / create_new_asset / create_new_shot layouts
+
+from pathlib import Path
+from typing import Dict, Optional
+
+from jade_api.create import DIR_CONFIG, create_paths, create_new_asset, create_new_shot
+from jade_api.fs import FsBackend, get_fs
+
+# Working departments per asset type, must match ASSET_WORKING_STRUCTURES in create.py
+ASSET_DEPARTMENTS = {
+    "char": ["assembly", "geo", "rig", "tex"],
+    "prop": ["assembly", "geo", "tex"],
+    "set": ["geo", "tex"],
+}
+
+SHOT_DEPARTMENTS = ["light", "anim", "fx", "charfx", "set", "camera"]
+
+TEXTURE_CHANNELS = ["baseColor", "roughness", "normal"]
+
+# Named scales used by run_benchmarks.py. Versions are per export folder.
+SCALES: Dict[str, Dict[str, int]] = {
+    "small": {"assets": 10, "shots": 10, "versions": 3, "udims": 2},
+    "medium": {"assets": 100, "shots": 100, "versions": 10, "udims": 4},
+    "large": {"assets": 500, "shots": 400, "versions": 25, "udims": 10},
+}
+
+
+def _write(fs: FsBackend, path: Path, file_size: int):
+    fs.write_bytes(path, b"\0" * file_size)
+
+
+def _populate_asset_exports(fs: FsBackend, export_dir: Path, asset_name: str, department: str, versions: int,
+                            udims: int, file_size: int, initials: str):
+    # One export per version, named like the files the publish flow looks for
+    for version in range(1, versions + 1):
+        tag = f"v{version:03d}_{initials}"
+        if department == "geo":
+            _write(fs, export_dir / f"{asset_name}_geo_{tag}.usd", file_size)
+        elif department == "rig":
+            _write(fs, export_dir / f"{asset_name}_rig_{tag}.ma", file_size)
+        elif department == "assembly":
+            for ext in [".geo.usdc", ".mtl.usdc", ".payload.usdc", ".usd"]:
+                _write(fs, export_dir / f"{asset_name}_assembly_{tag}{ext}", file_size)
+            textures_dir = export_dir / f"{asset_name}_assembly_{tag}_textures"
+            fs.mkdir_many([textures_dir])
+            for udim in range(1001, 1001 + udims):
+                _write(fs, textures_dir / f"{asset_name}_baseColor_{tag}.{udim}.png", file_size)
+        elif department == "tex":
+            tex_dir = export_dir / f"{asset_name}_tex_{tag}"
+            fs.mkdir_many([tex_dir])
+            for channel in TEXTURE_CHANNELS:
+                for udim in range(1001, 1001 + udims):
+                    _write(fs, tex_dir / f"{asset_name}_{channel}_{tag}.{udim}.png", file_size)
+
+
+def shot_name_for(sequence_num: float, shot_num: float) -> str:
+    """Same naming rule as create_new_shot: seq 1, shot 1 -> seq_010_shot_0010"""
+    seq_formatted = str(int(round(sequence_num * 10))).zfill(3)
+    shot_formatted = str(int(round(shot_num * 10))).zfill(4)
+    return f"seq_{seq_formatted}_shot_{shot_formatted}"
+
+
+def generate_show(root_dir: Path, assets: int, shots: int, versions: int, udims: int,
+                  file_size: int = 1024, shots_per_sequence: int = 25, initials: str = "bm",
+                  frames: int = 0, fs: Optional[FsBackend] = None) -> Dict[str, list]:
+    """
+    Create a synthetic show under root_dir.
+
+    Args:
+        root_dir: Show base folder (created if missing)
+        assets: Number of assets, spread round-robin over char/prop/set
+        shots: Number of shots, grouped into sequences of shots_per_sequence
+        versions: Number of _vNNN_ exports written into every export folder
+        udims: Number of UDIM tiles per texture channel
+        file_size: Size in bytes of every generated file
+        frames: When > 0, every shot's fx export also gets one frame-cache folder per version
+            with this many frames (starting at 1001)
+        fs: Filesystem backend to generate into, local when None
+
+    Returns:
+        {"assets": [(asset_type, asset_name), ...], "shots": [shot_name, ...]}
+    """
+    fs = get_fs(fs)
+    fs.mkdir_many([root_dir])
+    create_paths(root_dir, DIR_CONFIG, fs=fs)
+    asset_base = root_dir / "prod" / "asset"
+    shot_base = root_dir / "prod" / "sequences"
+
+    created_assets = []
+    asset_types = list(ASSET_DEPARTMENTS)
+    for i in range(assets):
+        asset_type = asset_types[i % len(asset_types)]
+        asset_name = f"{asset_type}{i:04d}"
+        create_new_asset(asset_name, asset_type, asset_base, fs=fs)
+        for department in ASSET_DEPARTMENTS[asset_type]:
+            export_dir = asset_base / "working" / asset_type / asset_name / department / "export"
+            _populate_asset_exports(fs, export_dir, asset_name, department, versions, udims, file_size, initials)
+        created_assets.append((asset_type, asset_name))
+
+    created_shots = []
+    for i in range(shots):
+        sequence_num = i // shots_per_sequence + 1
+        shot_num = i % shots_per_sequence + 1
+        create_new_shot(sequence_num, shot_num, shot_base, fs=fs)
+        shot_name = shot_name_for(sequence_num, shot_num)
+        for department in SHOT_DEPARTMENTS:
+            export_dir = shot_base / shot_name / "working" / department / "export"
+            for version in range(1, versions + 1):
+                _write(fs, export_dir / f"{shot_name}_{department}_v{version:03d}_{initials}.usd", file_size)
+        if frames:
+            for version in range(1, versions + 1):
+                cache_name = f"{shot_name}_fx_v{version:03d}_{initials}"
+                cache_dir = shot_base / shot_name / "working" / "fx" / "export" / cache_name
+                fs.mkdir_many([cache_dir])
+                for frame in range(1001, 1001 + frames):
+                    _write(fs, cache_dir / f"{cache_name}.{frame}.bgeo.sc", file_size)
+        created_shots.append(shot_name)
+
+    return {"assets": created_assets, "shots": created_shots}
@@ -0,0 +1,276 @@
+#Times create, scan, version lookup, tree rendering and publish on synthetic shows
+#
+# Usage (from the repo root):
+#   python -m benchmarks.run_benchmarks --scales small medium
+#   python -m benchmarks.run_benchmarks --assets 50 --shots 20 --versions 5 --udims 4 --label my_change
+#   python -m benchmarks.run_benchmarks --backend memory   (algorithmic cost only, no disk I/O)
+#   python -m benchmarks.run_benchmarks --assets 0 --shots 4 --frames 2000   (fx frame-cache publishing)
+#   python -m benchmarks.compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+#   python -m benchmarks.run_benchmarks --check-budgets   (fails if a call makes more metadata ops than FS_BUDGETS)
+
+import argparse
+import datetime
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path, PurePosixPath
+from typing import Callable, Dict, List, Optional
+
+from jade_api.create import DIR_CONFIG, create_paths, find_highest_version_file, list_config_paths
+from jade_api.fs import FsBackend, MemoryFs, get_fs
+from jade_api.fstrace import FsBudgetExceeded, trace_fs_ops
+from jade_api.hashing import PUBLISH_INDEX_DIR_NAME
+from jade_api.publish import (
+    ASSET_DEPARTMENT_MAP, get_asset_source_dir, get_shot_source_dir, publish_asset, publish_shot, publish_shot_sequence
+)
+from jade_api.scan import get_asset_types, get_asset_names, get_shot_names, get_shot_departments, build_directory_tree
+
+from benchmarks.generate_show import ASSET_DEPARTMENTS, SCALES, SHOT_DEPARTMENTS, generate_show
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# Metadata calls allowed for one call on a local disk (every call is a round trip on the NFS filer),
+# counted on the calling thread only.
+FS_BUDGETS = {
+    # One mkdir per DIR_CONFIG folder, in an existing show base folder
+    "create_paths": len(list_config_paths(Path("show"), DIR_CONFIG)),
+    # A single listing of the export folder, whatever the number of versions
+    "find_highest_version_file": 1,
+    # Single-file department (geo) of a show that published before, first publish:
+    #   plan: stat export and publish folders, list the export folder, stat the version and the published file (5)
+    #   read the index log of the folder while planning and again under the lease (2)
+    #   lease: create, then read back and remove on release (3)
+    #   journal: create, mark the step, remove (3)
+    #   copy: stat the source under the lease, open both files, set the mtime (4)
+    #   append the index log and the publish history (2)
+    #   transfer marker in the user's runtime folder, for the user's other processes: create, remove (2, local)
+    "publish_asset": 21,
+    # Unchanged republish: the same without the copy and the appends, plus a stat of the published file in
+    # the plan and under the lease to compare it with its record
+    "publish_asset_unchanged": 18,
+}
+
+
+def _timed(func: Callable, repeat: int) -> Dict[str, float]:
+    # Report min and median so a single noisy run does not hide or fake a regression
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+
+    # One extra, untimed run counts the filesystem metadata calls of the stage (its worker pools included)
+    with trace_fs_ops(all_threads=True) as counter:
+        func()
+    return {"min": min(samples), "median": statistics.median(samples), "runs": repeat, "ops": counter.total}
+
+
+def bench_scale(scale_name: str, params: Dict[str, int], repeat: int, work_dir: Path,
+                fs: Optional[FsBackend] = None) -> Dict[str, object]:
+    """
+    Generate one show and time every stage on it. Returns the results for this scale.
+    With an in-memory fs the show lives in fs and work_dir is not touched.
+    """
+    if fs is not None:
+        show_root = PurePosixPath("/") / f"show_{scale_name}"
+    else:
+        show_root = work_dir / f"show_{scale_name}"
+        if show_root.exists():
+            shutil.rmtree(show_root)
+
+    # 1. Create (timed once, it is what generates the show for the other stages)
+    start = time.perf_counter()
+    layout = generate_show(show_root, params["assets"], params["shots"], params["versions"], params["udims"],
+                           frames=params.get("frames", 0), fs=fs)
+    create_seconds = time.perf_counter() - start
+
+    # 2. Scan: the get_* helpers the GUI calls when populating combos
+    def scan():
+        for asset_type in get_asset_types():
+            get_asset_names(show_root, asset_type, fs=fs)
+        for shot_name in get_shot_names(show_root, fs=fs):
+            get_shot_departments(show_root, shot_name, fs=fs)
+
+    # 3. find_highest_version_file over every export folder / extension the publish flow resolves
+    def find_versions():
+        for asset_type, asset_name in layout["assets"]:
+            for department in ASSET_DEPARTMENTS[asset_type]:
+                source_dir = get_asset_source_dir(show_root, asset_type, asset_name, department)
+                for source_ext, _, item_type in ASSET_DEPARTMENT_MAP[department]:
+                    find_highest_version_file(source_dir, asset_name, department, source_ext,
+                                              is_folder_search=(item_type == "folder"), fs=fs)
+        for shot_name in layout["shots"]:
+            for department in SHOT_DEPARTMENTS:
+                find_highest_version_file(get_shot_source_dir(show_root, shot_name, department),
+                                          shot_name, department, ".usd", fs=fs)
+
+    # 4. Full text tree of the show
+    def tree():
+        build_directory_tree(show_root, fs=fs)
+
+    # 5. Publish every asset department and every shot department. The publish index is dropped
+    #    first so every run copies; republish_unchanged then times the skip path on the same show.
+    publish_index = show_root / ".tools" / PUBLISH_INDEX_DIR_NAME
+
+    def publish_all():
+        for asset_type, asset_name in layout["assets"]:
+            for department in ASSET_DEPARTMENTS[asset_type]:
+                publish_asset(show_root, asset_type, asset_name, department, fs=fs)
+        for shot_name in layout["shots"]:
+            for department in SHOT_DEPARTMENTS:
+                publish_shot(show_root, shot_name, department, fs=fs)
+
+    def publish():
+        if get_fs(fs).exists(publish_index):
+            get_fs(fs).rmtree(publish_index)
+        publish_all()
+
+    results = {
+        "params": params,
+        "create": {"min": create_seconds, "median": create_seconds, "runs": 1},
+        "scan": _timed(scan, repeat),
+        "find_highest_version_file": _timed(find_versions, repeat),
+        "build_directory_tree": _timed(tree, repeat),
+        "publish": _timed(publish, repeat),
+        "republish_unchanged": _timed(publish_all, repeat),
+    }
+
+    # 6. Frame-cache publishing of every shot's fx department (only when the show has caches)
+    if params.get("frames"):
+        def publish_sequences():
+            for shot_name in layout["shots"]:
+                publish_shot_sequence(show_root, shot_name, "fx", fs=fs)
+
+        results["publish_sequences"] = _timed(publish_sequences, repeat)
+    if fs is None:
+        shutil.rmtree(show_root, ignore_errors=True)
+    return results
+
+
+def check_fs_budgets(work_dir: Path) -> List[str]:
+    """
+    Trace one call of create_paths, find_highest_version_file and publish_asset on a small show
+    on disk and check each against FS_BUDGETS.
+
+    Returns:
+        One message per call over its budget (empty if all are within)
+    """
+    show_root = work_dir / "show_budgets"
+    for folder in (show_root, work_dir / "show_budgets_paths"):
+        shutil.rmtree(folder, ignore_errors=True)
+    failures = []
+
+    def check(name: str, func: Callable):
+        try:
+            with trace_fs_ops(name, budget=FS_BUDGETS[name]) as counter:
+                func()
+            print(f"  {counter.report()} (budget {FS_BUDGETS[name]})")
+        except FsBudgetExceeded as e:
+            print(f"  {e}")
+            failures.append(str(e))
+
+    try:
+        (work_dir / "show_budgets_paths").mkdir()
+        check("create_paths", lambda: create_paths(work_dir / "show_budgets_paths", DIR_CONFIG))
+        layout = generate_show(show_root, 2, 0, 10, 2)
+        asset_type, asset_name = layout["assets"][0]
+        source_dir = get_asset_source_dir(show_root, asset_type, asset_name, "geo")
+        check("find_highest_version_file", lambda: find_highest_version_file(source_dir, asset_name, "geo", ".usd"))
+        # Another asset publishes first, so .tools and its folders exist like in any show in production
+        publish_asset(show_root, *layout["assets"][1], "geo")
+        check("publish_asset", lambda: publish_asset(show_root, asset_type, asset_name, "geo"))
+        check("publish_asset_unchanged", lambda: publish_asset(show_root, asset_type, asset_name, "geo"))
+    finally:
+        shutil.rmtree(show_root, ignore_errors=True)
+        shutil.rmtree(work_dir / "show_budgets_paths", ignore_errors=True)
+    return failures
+
+
+def _git_label() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=Path(__file__).parent, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark JADE on synthetic shows.")
+    parser.add_argument("--scales", nargs="*", default=["small"], choices=sorted(SCALES),
+                        help="Named scales to run (ignored when --assets is given)")
+    parser.add_argument("--assets", type=int, help="Custom scale: number of assets")
+    parser.add_argument("--shots", type=int, default=10, help="Custom scale: number of shots")
+    parser.add_argument("--versions", type=int, default=3, help="Custom scale: versions per export folder")
+    parser.add_argument("--udims", type=int, default=2, help="Custom scale: UDIM tiles per texture channel")
+    parser.add_argument("--frames", type=int, default=0, help="Custom scale: frames per fx cache version (0 = none)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage")
+    parser.add_argument("--label", default=None, help="Name for the result file (default: git short hash)")
+    parser.add_argument("--output", type=Path, default=None, help="Result JSON path")
+    parser.add_argument("--work-dir", type=Path, default=None,
+                        help="Where to generate shows (default: a temp folder). Use the NFS share to measure it.")
+    parser.add_argument("--backend", choices=["local", "memory"], default="local",
+                        help="memory keeps the show in RAM to separate algorithmic cost from I/O")
+    parser.add_argument("--check-budgets", action="store_true",
+                        help="Only check the metadata calls of single calls against FS_BUDGETS (exit code 1 if over)")
+    args = parser.parse_args(argv)
+
+    if args.assets is not None:
+        scales = {"custom": {"assets": args.assets, "shots": args.shots,
+                             "versions": args.versions, "udims": args.udims}}
+        if args.frames:
+            scales["custom"]["frames"] = args.frames
+    else:
+        scales = {name: SCALES[name] for name in args.scales}
+
+    label = args.label or _git_label()
+    report = {
+        "label": label,
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "backend": args.backend,
+        "results": {},
+    }
+
+    temp_dir = None
+    work_dir = args.work_dir
+    if work_dir is None:
+        temp_dir = tempfile.mkdtemp(prefix="jade_bench_")
+        work_dir = Path(temp_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    if args.check_budgets:
+        try:
+            print("Checking metadata call budgets")
+            failures = check_fs_budgets(work_dir)
+        finally:
+            if temp_dir:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+        return 1 if failures else 0
+
+    try:
+        for scale_name, params in scales.items():
+            print(f"Running scale '{scale_name}': {params}")
+            fs = MemoryFs() if args.backend == "memory" else None
+            report["results"][scale_name] = bench_scale(scale_name, params, args.repeat, work_dir, fs=fs)
+            for stage, timing in report["results"][scale_name].items():
+                if stage != "params":
+                    print(f"  {stage:<28} min {timing['min']:.4f}s  median {timing['median']:.4f}s")
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    output = args.output or RESULTS_DIR / f"{label}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
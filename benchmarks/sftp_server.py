@@ -0,0 +1,276 @@
+#In-process paramiko SFTP server on loopback, with injected latency and bandwidth caps
+#
+# Serves a local folder so the remote code paths (sftp_connect, get_asset_names with an
+# sftp_client, uploads) can be measured without the school server.
+
+import errno
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import paramiko
+
+BENCH_USER = "jade"
+BENCH_PASSWORD = "jade"
+
+
+class LinkShaper:
+    """
+    Simulates a WAN link: every SFTP request waits `latency` seconds (one round trip)
+    and every read/write waits len(data) / `bandwidth` seconds. paramiko serves each
+    channel on its own thread, so the delays serialize per channel like a busy link
+    would, and extra pooled channels run in parallel.
+
+    Args:
+        latency: Seconds added to every request
+        bandwidth: Bytes per second for file data, None for unlimited
+    """
+
+    def __init__(self, latency: float = 0.0, bandwidth: Optional[float] = None):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def round_trip(self):
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def transfer(self, num_bytes: int):
+        if self.bandwidth:
+            time.sleep(num_bytes / self.bandwidth)
+
+
+def _to_sftp_error(e: OSError) -> int:
+    return paramiko.SFTPServer.convert_errno(e.errno)
+
+
+class _BenchServerInterface(paramiko.ServerInterface):
+    # Password-only SSH server that accepts the benchmark credentials
+
+    def check_auth_password(self, username, password):
+        if username == BENCH_USER and password == BENCH_PASSWORD:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+
+class _ShapedHandle(paramiko.SFTPHandle):
+    # File handle that charges bandwidth for every chunk read or written
+
+    def __init__(self, shaper: LinkShaper, flags: int = 0):
+        super().__init__(flags)
+        self.shaper = shaper
+
+    # Data requests are pipelined by paramiko, so they pay bandwidth but not a full round trip each
+    def read(self, offset, length):
+        data = super().read(offset, length)
+        if isinstance(data, bytes):
+            self.shaper.transfer(len(data))
+        return data
+
+    def write(self, offset, data):
+        self.shaper.transfer(len(data))
+        return super().write(offset, data)
+
+    def stat(self):
+        self.shaper.round_trip()
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+        except OSError as e:
+            return _to_sftp_error(e)
+
+
+class ShapedSFTPServer(paramiko.SFTPServerInterface):
+    """
+    SFTP server interface backed by a local root folder. Remote paths are
+    absolute POSIX paths relative to that root ("/prod/asset" -> <root>/prod/asset).
+    """
+
+    def __init__(self, server, root: Path, shaper: LinkShaper, *args, **kwargs):
+        super().__init__(server, *args, **kwargs)
+        self.root = Path(root)
+        self.shaper = shaper
+
+    def _local(self, path: str) -> str:
+        return str(self.root / self.canonicalize(path).lstrip("/"))
+
+    def list_folder(self, path):
+        self.shaper.round_trip()
+        local = self._local(path)
+        try:
+            result = []
+            for name in os.listdir(local):
+                attr = paramiko.SFTPAttributes.from_stat(os.lstat(os.path.join(local, name)))
+                attr.filename = name
+                result.append(attr)
+            return result
+        except OSError as e:
+            return _to_sftp_error(e)
+
+    def stat(self, path):
+        self.shaper.round_trip()
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(self._local(path)))
+        except OSError as e:
+            return _to_sftp_error(e)
+
+    def lstat(self, path):
+        self.shaper.round_trip()
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.lstat(self._local(path)))
+        except OSError as e:
+            return _to_sftp_error(e)
+
+    def open(self, path, flags, attr):
+        self.shaper.round_trip()
+        local = self._local(path)
+        try:
+            binary_flag = getattr(os, "O_BINARY", 0)
+            fd = os.open(local, flags | binary_flag, 0o666)
+        except OSError as e:
+            return _to_sftp_error(e)
+        if (flags & os.O_CREAT) and attr is not None:
+            attr._flags &= ~attr.FLAG_PERMISSIONS
+            paramiko.SFTPServer.set_file_attr(local, attr)
+        if flags & os.O_WRONLY:
+            mode = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            mode = "a+b" if flags & os.O_APPEND else "r+b"
+        else:
+            mode = "rb"
+        try:
+            f = os.fdopen(fd, mode)
+        except OSError as e:
+            return _to_sftp_error(e)
+        handle = _ShapedHandle(self.shaper, flags)
+        handle.filename = local
+        handle.readfile = f
+        handle.writefile = f
+        return handle
+
+    def remove(self, path):
+        self.shaper.round_trip()
+        try:
+            os.remove(self._local(path))
+        except OSError as e:
+            return _to_sftp_error(e)
+        return paramiko.SFTP_OK
+
+    def rename(self, oldpath, newpath):
+        self.shaper.round_trip()
+        try:
+            os.rename(self._local(oldpath), self._local(newpath))
+        except OSError as e:
+            return _to_sftp_error(e)
+        return paramiko.SFTP_OK
+
+    def posix_rename(self, oldpath, newpath):
+        self.shaper.round_trip()
+        try:
+            os.replace(self._local(oldpath), self._local(newpath))
+        except OSError as e:
+            return _to_sftp_error(e)
+        return paramiko.SFTP_OK
+
+    def mkdir(self, path, attr):
+        self.shaper.round_trip()
+        try:
+            os.mkdir(self._local(path))
+        except OSError as e:
+            return _to_sftp_error(e)
+        return paramiko.SFTP_OK
+
+    def rmdir(self, path):
+        self.shaper.round_trip()
+        try:
+            os.rmdir(self._local(path))
+        except OSError as e:
+            return _to_sftp_error(e)
+        return paramiko.SFTP_OK
+
+    def chattr(self, path, attr):
+        self.shaper.round_trip()
+        try:
+            paramiko.SFTPServer.set_file_attr(self._local(path), attr)
+        except OSError as e:
+            return _to_sftp_error(e)
+        return paramiko.SFTP_OK
+
+
+class BenchSFTPServer:
+    """
+    Loopback SFTP server for benchmarks.
+
+    Usage:
+        with BenchSFTPServer(root, latency=0.02, bandwidth=10 * 1024 ** 2) as server:
+            sftp_client, ssh_client = sftp_connect("127.0.0.1", BENCH_USER, BENCH_PASSWORD, server.port)
+
+    Remote path "/" is `root`. Every SSH connection gets its own transport and
+    shares the same LinkShaper, so shaper.requests counts all round trips.
+    """
+
+    def __init__(self, root: Path, latency: float = 0.0, bandwidth: Optional[float] = None):
+        self.root = Path(root)
+        self.shaper = LinkShaper(latency, bandwidth)
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.port = None
+        self._socket = None
+        self._thread = None
+        self._transports = []
+        self._stopping = threading.Event()
+
+    def start(self):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(("127.0.0.1", 0))
+        self._socket.listen(16)
+        self._socket.settimeout(0.2)
+        self.port = self._socket.getsockname()[1]
+        self._thread = threading.Thread(target=self._serve, name="jade-bench-sftp", daemon=True)
+        self._thread.start()
+        return self
+
+    def _serve(self):
+        while not self._stopping.is_set():
+            try:
+                conn, _ = self._socket.accept()
+            except socket.timeout:
+                continue
+            except OSError as e:
+                if e.errno in (errno.EBADF, errno.EINVAL):
+                    break
+                raise
+            transport = paramiko.Transport(conn)
+            transport.add_server_key(self.host_key)
+            transport.set_subsystem_handler("sftp", paramiko.SFTPServer, ShapedSFTPServer,
+                                            self.root, self.shaper)
+            transport.start_server(server=_BenchServerInterface())
+            self._transports.append(transport)
+
+    def stop(self):
+        self._stopping.set()
+        for transport in self._transports:
+            transport.close()
+        if self._socket:
+            self._socket.close()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -5,6 +5,8 @@ import logging
 #from .transfer import *
 from .info import *
 from .create import *
+from .scan import *
+from .publish import *
 
 # API wide config
 logging.basicConfig(level=logging.DEBUG)
\ No newline at end of file
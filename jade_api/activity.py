@@ -1,16 +1,19 @@
 import datetime
 import getpass
 from pathlib import Path
+from typing import Optional
 
-def log_action(base_path: Path, action: str, details: str = ""):
+from jade_api.fs import FsBackend, get_fs
+
+def log_action(base_path: Path, action: str, details: str = "", fs: Optional[FsBackend] = None):
     """
     Logs the action taken by the user to a plain text log file located
-    at <base_path>/.log/activity_log.txt.
+    at <base_path>/.tools/activity_log.txt. Pass the SFTP backend as fs to log on the remote show.
     """
+    fs = get_fs(fs)
 
     # Define the path for the log folder and file
     log_dir = base_path / ".tools"
-    log_dir.mkdir(exist_ok=True)
     log_file = log_dir / "activity_log.txt"
 
     # Get user, time, and format the message
@@ -22,8 +25,9 @@ def log_action(base_path: Path, action: str, details: str = ""):
 
     # Write to the file
     try:
-        with open(log_file, 'a') as f:
-            f.write(log_entry)
+        fs.mkdir_many([log_dir])
+        with fs.open(log_file, 'ab') as f:
+            f.write(log_entry.encode("utf-8"))
     except Exception as e:
         # If the logging fails (e.g., permissions), print an error but don't crash the main app
         print(f"ERROR writing to log file: {e}")
\ No newline at end of file
@@ -0,0 +1,349 @@
+#Archive of cold working versions: old _vNNN_ exports are moved into compressed tar packs per asset or shot
+#
+# archive_cold_versions picks the versions prune_working_versions would remove that nobody touched for a
+# number of days, and moves them into .tools/archive/<asset or shot>/<pack>.tar instead of deleting them.
+# Every file is a separate gzip member of the tar, and .tools/archive/<asset or shot>/index.json records
+# where each member's data starts, so restoring one version seeks straight to its members instead of
+# reading the pack. The packs are plain tar files of .gz files: tar and gunzip restore them too.
+# Assets and shots are packed in parallel; originals are removed only once their pack was read back.
+
+import gzip
+import json
+import tarfile
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from jade_api.fs import FsBackend, FsEntry, chunk_hook, get_fs, join
+from jade_api.hashing import HASH_BUFFER_SIZE, new_hasher
+from jade_api.locks import PublishLease, PublishLockTimeout
+from jade_api.retention import RETENTION_WORKERS, RetentionReport, apply_retention, plan_retention
+from jade_api.scheduler import BULK, get_scheduler
+from jade_api.sequences import format_size
+from jade_api.sync import relative_join
+
+ARCHIVE_DIR_NAME = "archive"
+ARCHIVE_INDEX_NAME = "index.json"
+PACK_SUFFIX = ".tar"
+MEMBER_SUFFIX = ".gz"
+
+# Packs being written, renamed into place once read back
+PACK_PARTIAL_SUFFIX = ".jade-archive.tmp"
+
+# Versions untouched for this long are archived
+ARCHIVE_AFTER_DAYS = 90
+
+# The newest version of every export folder stays in place whatever its age (publishes use it)
+ARCHIVE_KEEP_VERSIONS = 1
+
+# Moderate level: most of the gain on USD / Maya ASCII at a fraction of the CPU of level 9
+ARCHIVE_COMPRESSION_LEVEL = 6
+
+# Compressed members are held in memory up to this size, then in a temporary file
+SPOOL_BYTES = 64 * 1024 * 1024
+
+
+class ArchiveReport:
+    """
+    What archiving found (and did).
+
+    Attributes:
+        retention: The retention plan the archived versions come from
+        packs: Packs written
+        archived: Versions (files or version folders) moved into packs
+        files: Files stored in packs
+        packed_size: Bytes of the packs written
+        changed: Versions left in place because they changed while being packed
+        skipped: Assets and shots skipped because another archive run is packing them
+    """
+
+    def __init__(self, retention: RetentionReport):
+        self.retention = retention
+        self.packs = 0
+        self.archived = 0
+        self.files = 0
+        self.packed_size = 0
+        self.changed: List[str] = []
+        self.skipped: List[str] = []
+        # Assets and shots are packed by several threads
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        return (f"{self.archived} of {len(self.retention.candidates)} cold versions "
+                f"({format_size(self.retention.reclaimable)}) archived in {self.packs} packs "
+                f"({format_size(self.packed_size)}), {self.files} files"
+                + (f", {len(self.changed)} changed meanwhile" if self.changed else "")
+                + (f", {len(self.skipped)} busy" if self.skipped else ""))
+
+
+def pack_key(relative_path: str) -> str:
+    """
+    Asset or shot a working path belongs to, which names its archive folder:
+    prod/asset/working/char/lion or prod/sequences/seq_010_shot_0010
+
+    Raises:
+        ValueError: If the path is not inside an asset or shot
+    """
+    parts = relative_path.strip("/").split("/")
+    if len(parts) >= 5 and parts[1] == "asset":
+        return "/".join(parts[:5])
+    if len(parts) >= 3 and parts[1] == "sequences":
+        return "/".join(parts[:3])
+    raise ValueError(f"Not an asset or shot path: {relative_path}")
+
+
+class ArchiveIndex:
+    """
+    Members of the packs of one asset or shot: .tools/archive/<key>/index.json
+
+    {<working file relative to the base folder>: {"pack": <pack file name>, "offset": int, "length": int,
+                                                  "size": int, "mtime": float, "blake2b": hex}}
+    offset and length locate the gzip data of the file inside the pack; size, mtime and blake2b
+    describe the original file.
+    """
+
+    def __init__(self, base_path, key: str, fs: Optional[FsBackend] = None):
+        self.base_path = base_path
+        self.key = key
+        self.fs = get_fs(fs)
+        self.folder = relative_join(base_path / ".tools" / ARCHIVE_DIR_NAME, key)
+        self.path = self.folder / ARCHIVE_INDEX_NAME
+
+    def load(self) -> Dict[str, dict]:
+        try:
+            return json.loads(self.fs.read_bytes(self.path).decode("utf-8"))
+        except FileNotFoundError:
+            return {}
+
+    def save(self, members: Dict[str, dict]):
+        self.fs.mkdir_many([self.folder])
+        self.fs.write_bytes_atomic(self.path, json.dumps(members, sort_keys=True).encode("utf-8"))
+
+    def members(self, relative_path: str) -> Dict[str, dict]:
+        """Members of a version: the file itself, or every file of a version folder."""
+        prefix = relative_path.rstrip("/") + "/"
+        return {path: member for path, member in self.load().items()
+                if path == relative_path or path.startswith(prefix)}
+
+
+class _Slice:
+    # Read-only view of length bytes of a file from offset (a member's data inside its pack)
+
+    def __init__(self, f, offset: int, length: int):
+        self.f = f
+        self.remaining = length
+        f.seek(offset)
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.f.read(size) if size else b""
+        self.remaining -= len(data)
+        return data
+
+
+def _files(fs: FsBackend, relative_path: str, entry: FsEntry, base_path) -> List[Tuple[str, FsEntry]]:
+    # (relative path, entry) of a version file, or of every file of a version folder
+    if not entry.is_dir:
+        return [(relative_path, entry)]
+    files = []
+    for child in fs.scandir(relative_join(base_path, relative_path)):
+        files.extend(_files(fs, f"{relative_path}/{child.name}", child, base_path))
+    return files
+
+
+def _compress(fs: FsBackend, path, spool) -> str:
+    # gzip path into spool; returns the blake2b of the original data
+    hasher = new_hasher()
+    hook = chunk_hook()
+    with fs.open(path, "rb") as f, gzip.GzipFile(fileobj=spool, mode="wb", compresslevel=ARCHIVE_COMPRESSION_LEVEL,
+                                                 mtime=0) as gz:
+        for chunk in iter(lambda: f.read(HASH_BUFFER_SIZE), b""):
+            if hook is not None:
+                hook(len(chunk))
+            hasher.update(chunk)
+            gz.write(chunk)
+    return hasher.hexdigest()
+
+
+def _read_member(fs: FsBackend, pack_path, member: dict, write: Optional[Callable[[bytes], None]] = None) -> str:
+    # Decompress one member straight from its offset; returns the blake2b of the data
+    hasher = new_hasher()
+    with fs.open(pack_path, "rb") as f:
+        with gzip.GzipFile(fileobj=_Slice(f, member["offset"], member["length"]), mode="rb") as gz:
+            for chunk in iter(lambda: gz.read(HASH_BUFFER_SIZE), b""):
+                hasher.update(chunk)
+                if write is not None:
+                    write(chunk)
+    return hasher.hexdigest()
+
+
+def _write_pack(base_path, key: str, versions: List[Tuple[str, FsEntry, int]], fs: FsBackend
+                ) -> Tuple[str, Dict[str, dict], int]:
+    # (pack file name, index members, pack size) of a new pack holding versions
+    index = ArchiveIndex(base_path, key, fs)
+    fs.mkdir_many([index.folder])
+    pack_name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}{PACK_SUFFIX}"
+    partial = index.folder / f"{pack_name}{PACK_PARTIAL_SUFFIX}"
+    members = {}
+    with fs.open(partial, "wb") as raw, tarfile.open(fileobj=raw, mode="w", format=tarfile.PAX_FORMAT) as tar:
+        for relative_path, entry, _ in versions:
+            for file_path, file_entry in _files(fs, relative_path, entry, base_path):
+                with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as spool:
+                    digest = _compress(fs, relative_join(base_path, file_path), spool)
+                    length = spool.tell()
+                    spool.seek(0)
+                    info = tarfile.TarInfo(file_path[len(key) + 1:] + MEMBER_SUFFIX)
+                    info.size = length
+                    info.mtime = file_entry.mtime
+                    tar.addfile(info, spool)
+                # The data ends the archive so far, before the padding to the next 512 byte block
+                offset = tar.offset - -(-length // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+                members[file_path] = {"pack": pack_name, "offset": offset, "length": length,
+                                      "size": file_entry.size, "mtime": file_entry.mtime, "blake2b": digest}
+
+    # Read every member back before anything is removed
+    for file_path, member in members.items():
+        if _read_member(fs, partial, member) != member["blake2b"]:
+            fs.remove(partial)
+            raise OSError(f"Archive pack of {key} does not read back {file_path}")
+    fs.rename(partial, index.folder / pack_name)
+    return pack_name, members, fs.stat(index.folder / pack_name).size
+
+
+def _archive_key(base_path, key: str, versions: List[Tuple[str, FsEntry, int]], fs: FsBackend,
+                 report: ArchiveReport) -> RetentionReport:
+    # Pack the versions of one asset or shot; returns what can now be removed
+    removable = RetentionReport()
+    try:
+        lease = PublishLease(base_path, f"{ARCHIVE_DIR_NAME}/{key}", fs, timeout=0)
+        lease.acquire()
+    except PublishLockTimeout:
+        with report.lock:
+            report.skipped.append(key)
+        return removable
+    try:
+        with get_scheduler().transfer(BULK, job="archive"):
+            pack_name, members, pack_size = _write_pack(base_path, key, versions, fs)
+        index = ArchiveIndex(base_path, key, fs)
+        records = index.load()
+        records.update(members)
+        index.save(records)
+    finally:
+        lease.release()
+    archived_files = 0
+    changed = []
+    # A version written to while it was packed stays in place (its pack copy is older)
+    for relative_path, entry, size in versions:
+        try:
+            files = _files(fs, relative_path, fs.stat(relative_join(base_path, relative_path)), base_path)
+        except FileNotFoundError:
+            files = []
+        if files and all(members.get(path, {}).get("mtime") == file_entry.mtime for path, file_entry in files):
+            removable.candidates.append((relative_path, entry, size))
+            archived_files += len(files)
+        else:
+            changed.append(relative_path)
+
+    with report.lock:
+        report.packs += 1
+        report.packed_size += pack_size
+        report.archived += len(removable.candidates)
+        report.files += archived_files
+        report.changed.extend(changed)
+    return removable
+
+
+def archive_cold_versions(base_path, days: float = ARCHIVE_AFTER_DAYS, keep: int = ARCHIVE_KEEP_VERSIONS,
+                          dry_run: bool = False, fs: Optional[FsBackend] = None,
+                          workers: int = RETENTION_WORKERS) -> ArchiveReport:
+    """
+    Move working versions untouched for days into per asset / per shot packs.
+
+    Versions are chosen like prune_working_versions: the newest keep versions of every export folder,
+    published versions and files without a version tag stay in place.
+
+    Args:
+        base_path: Show base folder
+        days: Versions (the newest file of a version folder) modified more recently stay in place
+        keep: Versions always left in every export folder
+        dry_run: Only report what would be archived
+        workers: Assets and shots packed at once (and folders listed at once)
+    """
+    fs = get_fs(fs)
+    retention = plan_retention(base_path, keep, fs=fs, workers=workers, older_than=time.time() - days * 86400)
+    report = ArchiveReport(retention)
+    if dry_run or not retention.candidates:
+        return report
+
+    by_key: Dict[str, List[Tuple[str, FsEntry, int]]] = {}
+    for candidate in retention.candidates:
+        by_key.setdefault(pack_key(candidate[0]), []).append(candidate)
+
+    removable = RetentionReport()
+
+    def archive(key: str):
+        try:
+            return _archive_key(base_path, key, by_key[key], fs, report)
+        except OSError as e:
+            print(f"WARNING: archiving {key} failed, its versions stay in place: {e}")
+            return RetentionReport()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="jade-archive") as pool:
+        for packed in pool.map(archive, sorted(by_key)):
+            removable.candidates.extend(packed.candidates)
+    apply_retention(base_path, removable, fs=fs, workers=workers)
+    return report
+
+
+def archived_versions(base_path, relative_path: str, fs: Optional[FsBackend] = None) -> Dict[str, dict]:
+    """Archived files of an asset or shot (or under any working path of it), from its index only."""
+    return ArchiveIndex(base_path, pack_key(relative_path), fs).members(relative_path)
+
+
+def restore_version(base_path, relative_path: str, fs: Optional[FsBackend] = None, destination_base=None,
+                    overwrite: bool = False) -> List[str]:
+    """
+    Extract an archived version (a file or a version folder) by seeking to its members in the pack.
+
+    Args:
+        base_path: Show base folder
+        relative_path: Working path of the version, relative to the base folder
+        destination_base: Folder to restore into, at the same relative path (the show when None)
+        overwrite: Replace files that exist at the destination
+
+    Returns:
+        Restored files, relative to the base folder
+
+    Raises:
+        FileNotFoundError: If the version is not archived
+        FileExistsError: If a restored file exists and overwrite is False
+        OSError: If a member does not match the checksum recorded when it was archived
+    """
+    fs = get_fs(fs)
+    index = ArchiveIndex(base_path, pack_key(relative_path), fs)
+    members = index.members(relative_path)
+    if not members:
+        raise FileNotFoundError(f"{relative_path} is not archived")
+    destination_base = base_path if destination_base is None else destination_base
+    targets = {path: relative_join(destination_base, path) for path in members}
+    if not overwrite:
+        for target in targets.values():
+            if fs.exists(target):
+                raise FileExistsError(f"{target} exists")
+
+    for path, member in sorted(members.items()):
+        target = targets[path]
+        fs.mkdir_many([target.parent])
+        partial = join(target.parent, f".{target.name}{PACK_PARTIAL_SUFFIX}")
+        with fs.open(partial, "wb") as out:
+            digest = _read_member(fs, index.folder / member["pack"], member, out.write)
+        if digest != member["blake2b"]:
+            fs.remove(partial)
+            raise OSError(f"Archived {path} does not match its checksum")
+        fs.set_mtime(partial, member["mtime"])
+        fs.rename(partial, target)
+    return sorted(members)
@@ -0,0 +1,180 @@
+#Batch shot publishing: every department of a shot, every shot of a sequence, or everything that changed
+#
+# Versions are resolved from the show catalog (one cached listing per folder for the whole batch),
+# then the publishes run on a bounded pool of workers.
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional, Tuple
+
+from jade_api.catalog import ShowCatalog
+from jade_api.create import pick_highest_version
+from jade_api.hashing import PublishIndex
+from jade_api.publish import (
+    PUBLISH_WORKERS, SEQUENCE_DEPARTMENTS, VERSION_AND_INITIALS_PATTERN,
+    get_shot_publish_dir, get_shot_source_dir, publish_shot, publish_shot_sequence
+)
+
+# Shot department publishes running at the same time
+BATCH_WORKERS = 4
+
+
+class ShotPublishJob:
+    """
+    One resolved shot department publish.
+
+    Attributes:
+        shot_name: e.g. "seq_040_shot_0010"
+        department: e.g. "light"
+        source: Highest versioned .usd file, or cache folder for frame-sequence departments
+        is_sequence: True when source is a frame-cache folder (publish_shot_sequence)
+        changed: True when the current publish does not match source
+    """
+    __slots__ = ("shot_name", "department", "source", "is_sequence", "changed")
+
+    def __init__(self, shot_name: str, department: str, source, is_sequence: bool, changed: bool = True):
+        self.shot_name = shot_name
+        self.department = department
+        self.source = source
+        self.is_sequence = is_sequence
+        self.changed = changed
+
+    def __str__(self):
+        return f"{self.shot_name} / {self.department}: {self.source.name}"
+
+
+def _listing(catalog: ShowCatalog, path):
+    try:
+        return catalog.listing(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def _folder_names(catalog: ShowCatalog, path) -> List[str]:
+    return [entry.name for entry in _listing(catalog, path) if entry.is_dir and not entry.name.startswith('.')]
+
+
+def sequence_of(shot_name: str) -> str:
+    """seq_040_shot_0010 -> seq_040"""
+    return shot_name.split("_shot_")[0]
+
+
+def shot_names(catalog: ShowCatalog, sequence: Optional[str] = None) -> List[str]:
+    """Shot folders of the show, or only those of one sequence (e.g. "seq_040")."""
+    names = [name for name in _folder_names(catalog, catalog.base_path / "prod" / "sequences")
+             if name.startswith("seq_")]
+    if sequence:
+        names = [name for name in names if sequence_of(name) == sequence]
+    return sorted(names)
+
+
+def shot_departments(catalog: ShowCatalog, shot_name: str) -> List[str]:
+    """Same as scan.get_shot_departments, from the catalog."""
+    return sorted(_folder_names(catalog, catalog.base_path / "prod" / "sequences" / shot_name / "working"))
+
+
+def _is_changed(catalog: ShowCatalog, index: PublishIndex, job: ShotPublishJob) -> bool:
+    publish_dir = get_shot_publish_dir(catalog.base_path, job.shot_name, job.department)
+
+    if job.is_sequence:
+        published = {entry.name: (entry.size, entry.mtime)
+                     for entry in _listing(catalog, publish_dir) if not entry.is_dir}
+        # Frame caches are current when the publish folder holds the renamed source files with the same
+        # size and mtime (copies keep mtimes, hardlinks share them)
+        expected = {VERSION_AND_INITIALS_PATTERN.sub('', entry.name): (entry.size, entry.mtime)
+                    for entry in _listing(catalog, job.source) if not entry.is_dir}
+        return expected != published
+
+    # Files are current when the publish index recorded this source, and the published file is still the
+    # one recorded (a link into the object store has the object's mtime, not the source's), like publish_file.
+    # Both are stat-ed: a file overwritten in place does not change its folder, so the listings may be older.
+    destination = publish_dir / f"{job.shot_name}_{job.department}.usd"
+    record = index.get(destination)
+    if record is None or record["source"] != index.key(job.source):
+        return True
+    try:
+        source = catalog.refresh_entry(job.source)
+        published = catalog.refresh_entry(destination)
+    except FileNotFoundError:
+        return True
+    if (record["size"], record["mtime"]) != (source.size, source.mtime):
+        return True
+    return (published.size, published.mtime) != (record["size"], record.get("published_mtime", record["mtime"]))
+
+
+def resolve_shot_publishes(catalog: ShowCatalog, shots: List[str], departments: Optional[List[str]] = None,
+                           changed_only: bool = False) -> List[ShotPublishJob]:
+    """
+    Find the version every shot department would publish.
+
+    Args:
+        catalog: Show catalog (its cached listings are reused, nothing is listed twice)
+        shots: Shot names
+        departments: Departments to publish, all departments of each shot when None
+        changed_only: Skip departments whose publish already matches the highest version
+
+    Returns:
+        Jobs in shot, department order. Departments without a versioned export are left out.
+    """
+    jobs = []
+    index = PublishIndex(catalog.base_path, catalog.fs)
+    for shot_name in shots:
+        for department in departments or shot_departments(catalog, shot_name):
+            export_dir = get_shot_source_dir(catalog.base_path, shot_name, department)
+            entries = _listing(catalog, export_dir)
+
+            source = None
+            if department in SEQUENCE_DEPARTMENTS:
+                source = pick_highest_version(entries, export_dir, shot_name, department, None, is_folder_search=True)
+            is_sequence = source is not None
+            if source is None:
+                source = pick_highest_version(entries, export_dir, shot_name, department, ".usd")
+            if source is None:
+                continue
+
+            job = ShotPublishJob(shot_name, department, source, is_sequence)
+            job.changed = _is_changed(catalog, index, job)
+            if changed_only and not job.changed:
+                continue
+            jobs.append(job)
+    return jobs
+
+
+def run_batch_publish(catalog: ShowCatalog, jobs: List[ShotPublishJob], workers: int = BATCH_WORKERS,
+                      progress: Optional[Callable[[int, int], None]] = None
+                      ) -> List[Tuple[ShotPublishJob, object, Optional[Exception]]]:
+    """
+    Publish the jobs concurrently on the catalog's filesystem.
+
+    Args:
+        catalog: Show catalog the jobs were resolved from
+        jobs: From resolve_shot_publishes
+        workers: Jobs running at once. Frame-sequence jobs share PUBLISH_WORKERS copy threads between them.
+        progress: Called as progress(done, total) from the calling thread after each job
+
+    Returns:
+        (job, publish result, exception or None) for every job, in job order. A failed job does not stop the others.
+    """
+    workers = max(1, workers)
+    frame_workers = max(1, PUBLISH_WORKERS // workers)
+
+    def run(job: ShotPublishJob):
+        if job.is_sequence:
+            return publish_shot_sequence(catalog.base_path, job.shot_name, job.department, workers=frame_workers,
+                                         fs=catalog.fs, source_folder=job.source)
+        return publish_shot(catalog.base_path, job.shot_name, job.department, fs=catalog.fs, source_file=job.source)
+
+    results = [None] * len(jobs)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jade-batch") as pool:
+        futures = {pool.submit(run, job): position for position, job in enumerate(jobs)}
+        for done, future in enumerate(as_completed(futures), 1):
+            position = futures[future]
+            job = jobs[position]
+            try:
+                results[position] = (job, future.result(), None)
+            except Exception as e:
+                results[position] = (job, None, e)
+            # The publish folder changed under the catalog
+            catalog.invalidate(get_shot_publish_dir(catalog.base_path, job.shot_name, job.department))
+            if progress:
+                progress(done, len(jobs))
+    return results
@@ -0,0 +1,336 @@
+#Size-bounded local read-through cache of a remote show's published files
+#
+# In remote mode every read of a published USD layer or texture would cross the WAN. RemoteCache keeps a
+# local copy of each file read, keyed by its remote path and valid while the remote size and mtime match,
+# so opening the same publishes again only costs a stat. The cache is bounded by a disk budget
+# (JADE_CACHE_BUDGET, in GB) and evicts the least recently used files first, except pinned ones (the
+# publishes the current shot depends on). Concurrent reads of the same file download it once.
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from jade_api.checkout import REFERENCING_EXTENSIONS, asset_publish_root, find_asset_references, shot_publish_root
+from jade_api.fs import FsBackend, FsEntry, get_fs
+from jade_api.hashing import new_hasher
+from jade_api.scheduler import INTERACTIVE, get_scheduler
+from jade_api.sequences import format_size
+from jade_api.sync import list_files, relative_join, transfer_file
+
+CACHE_DIR_ENV_VAR = "JADE_CACHE_DIR"
+CACHE_BUDGET_ENV_VAR = "JADE_CACHE_BUDGET"
+
+# Disk budget when JADE_CACHE_BUDGET is not set
+DEFAULT_CACHE_BUDGET = 20 * 1024 ** 3
+
+CACHE_INDEX_NAME = "cache_index.json"
+
+# Cached data lives in <cache dir>/files/<ab>/<cdef...><ext>
+FILES_DIR_NAME = "files"
+
+# Only published data is cached: it changes through new publishes, not in place like the .tools state files
+CACHEABLE_FOLDER = "/publish/"
+
+
+def default_cache_dir() -> Path:
+    """JADE_CACHE_DIR, or ~/.cache/jade."""
+    cache_dir = os.environ.get(CACHE_DIR_ENV_VAR, "").strip()
+    return Path(cache_dir).expanduser() if cache_dir else Path.home() / ".cache" / "jade"
+
+
+def cache_budget() -> int:
+    """Disk budget in bytes from JADE_CACHE_BUDGET (GB, decimals allowed), DEFAULT_CACHE_BUDGET otherwise."""
+    value = os.environ.get(CACHE_BUDGET_ENV_VAR, "").strip()
+    if not value:
+        return DEFAULT_CACHE_BUDGET
+    try:
+        return int(float(value) * 1024 ** 3)
+    except ValueError:
+        print(f"WARNING: ignoring {CACHE_BUDGET_ENV_VAR}={value!r}, expected a size in GB")
+        return DEFAULT_CACHE_BUDGET
+
+
+def is_cacheable(path) -> bool:
+    """True for files inside a publish folder."""
+    posix = str(path).replace("\\", "/")
+    return CACHEABLE_FOLDER in posix and "/.tools/" not in posix
+
+
+def _serialized_channel(fs: FsBackend) -> Callable:
+    # Lends fs to one thread at a time: concurrent requests on a single SFTP client can stall
+    lock = threading.Lock()
+
+    @contextmanager
+    def channel():
+        with lock:
+            yield fs
+    return channel
+
+
+def _key(remote_path) -> str:
+    return remote_path.as_posix() if hasattr(remote_path, "as_posix") else str(remote_path).replace("\\", "/")
+
+
+class RemoteCache:
+    """
+    Local copies of remote files, least recently used evicted first once over budget.
+
+    Usage:
+        cache = RemoteCache(default_cache_dir() / host, SftpFs(sftp_client))
+        with cache.open(remote_path) as f:
+            data = f.read()
+
+    Index (<cache dir>/cache_index.json), least recently used first: [[remote path, [size, mtime]], ...]
+    """
+
+    def __init__(self, cache_dir, remote_fs: FsBackend, budget: Optional[int] = None,
+                 local_fs: Optional[FsBackend] = None, channel: Optional[Callable] = None):
+        """
+        Args:
+            cache_dir: Local folder of this cache (one per server)
+            remote_fs: Backend the files are read from
+            budget: Disk budget in bytes (default: cache_budget())
+            channel: Lends remote channels for parallel fills (SftpChannelPool.channel), remote_fs
+                one thread at a time by default
+        """
+        self.cache_dir = Path(cache_dir)
+        self.remote_fs = remote_fs
+        self.local_fs = get_fs(local_fs)
+        self.budget = cache_budget() if budget is None else budget
+        self.channel = channel or _serialized_channel(remote_fs)
+        self.index_path = self.cache_dir / CACHE_INDEX_NAME
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, list]" = self._load_index()
+        self._size = sum(size for size, _ in self._entries.values())
+        # Remote path -> Event set when the download in progress finishes
+        self._in_flight: Dict[str, threading.Event] = {}
+        self._pins: tuple = ()
+
+    # ---- index ----
+
+    def _load_index(self) -> "OrderedDict[str, list]":
+        try:
+            records = json.loads(self.local_fs.read_bytes(self.index_path).decode("utf-8"))
+        except FileNotFoundError:
+            return OrderedDict()
+        except ValueError as e:
+            print(f"WARNING: ignoring unreadable cache index {self.index_path}: {e}")
+            return OrderedDict()
+        return OrderedDict((path, record) for path, record in records)
+
+    def _save_index(self):
+        # Called with the lock held; a list of pairs keeps the LRU order
+        self.local_fs.mkdir_many([self.cache_dir])
+        self.local_fs.write_bytes_atomic(self.index_path, json.dumps(list(self._entries.items())).encode("utf-8"))
+
+    def local_path(self, remote_path) -> Path:
+        """Where the local copy of a remote file is kept (whether cached or not)."""
+        key = _key(remote_path)
+        hasher = new_hasher()
+        hasher.update(key.encode("utf-8"))
+        digest = hasher.hexdigest()
+        return self.cache_dir / FILES_DIR_NAME / digest[:2] / (digest[2:] + os.path.splitext(key)[1])
+
+    # ---- reads ----
+
+    def fetch(self, remote_path, entry: Optional[FsEntry] = None, priority: str = INTERACTIVE) -> Path:
+        """
+        Local copy of a remote file, downloaded if it is not cached or changed on the server.
+
+        Args:
+            remote_path: File on the remote backend
+            entry: The file's remote stat when already known (from a listing), saves a round trip
+            priority: Transfer class of the download (scheduler.PREFETCH for speculative reads)
+
+        Returns:
+            Local path of the copy. Do not modify it; it may be evicted once the budget is exceeded.
+
+        Raises:
+            FileNotFoundError: If the remote file does not exist
+        """
+        key = _key(remote_path)
+        if entry is None:
+            with self.channel() as remote_fs:
+                entry = remote_fs.stat(remote_path)
+        record = [entry.size, entry.mtime]
+        local_path = self.local_path(key)
+
+        while True:
+            with self._lock:
+                if self._entries.get(key) == record and os.path.exists(local_path):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return local_path
+                event = self._in_flight.get(key)
+                if event is None:
+                    event = self._in_flight[key] = threading.Event()
+                    break
+            # Someone else is downloading this file: wait for it and check again
+            event.wait()
+
+        try:
+            with get_scheduler().transfer(priority, job="cache"), self.channel() as remote_fs:
+                transfer_file(remote_fs, remote_path, self.local_fs, local_path)
+            with self._lock:
+                self.misses += 1
+                previous = self._entries.pop(key, None)
+                self._size += entry.size - (previous[0] if previous else 0)
+                self._entries[key] = record
+                self._evict()
+                self._save_index()
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            event.set()
+        return local_path
+
+    def open(self, remote_path, entry: Optional[FsEntry] = None):
+        """Open the local copy of a remote file for reading ('rb')."""
+        return open(self.fetch(remote_path, entry), "rb")
+
+    def invalidate(self, remote_path):
+        """Forget a remote file (it is being rewritten or removed)."""
+        key = _key(remote_path)
+        with self._lock:
+            record = self._entries.pop(key, None)
+            if record is None:
+                return
+            self._size -= record[0]
+            self._remove_local(key)
+            self._save_index()
+
+    # ---- pins and eviction ----
+
+    def pin(self, remote_folders: Iterable):
+        """
+        Keep every cached file under these remote folders, whatever the budget. Replaces the previous pins.
+
+        Args:
+            remote_folders: Remote folders (e.g. a shot's publish folder and the asset publishes it uses)
+        """
+        self._set_pins(tuple(_key(folder).rstrip("/") + "/" for folder in remote_folders))
+
+    def unpin(self):
+        self._set_pins(())
+
+    def _set_pins(self, pins: tuple):
+        # Files that were only kept for the previous pins are evicted now if over budget
+        with self._lock:
+            self._pins = pins
+            if self._size > self.budget:
+                self._evict()
+                self._save_index()
+
+    def pin_shot(self, remote_base, shot_name: str) -> List[str]:
+        """
+        Pin a shot's publish folder and every asset publish it references, reading the referencing
+        files through the cache. References are followed recursively, like SparseCheckout.
+
+        Returns:
+            The pinned folders, relative to remote_base
+        """
+        roots: List[str] = []
+        pending = [shot_publish_root(shot_name)]
+        while pending:
+            roots.extend(pending)
+            remote_files = list_files(self.channel, remote_base, pending)
+            referenced = set()
+            for path, (size, mtime) in remote_files.items():
+                if path.endswith(REFERENCING_EXTENSIONS):
+                    remote_path = relative_join(remote_base, path)
+                    local_path = self.fetch(remote_path, FsEntry(remote_path.name, remote_path, False, size, mtime))
+                    referenced |= find_asset_references(local_path, self.local_fs, path)
+            pending = sorted({asset_publish_root(*asset) for asset in referenced} - set(roots))
+        self.pin(relative_join(remote_base, root) for root in roots)
+        return roots
+
+    def _is_pinned(self, key: str) -> bool:
+        return key.startswith(self._pins) if self._pins else False
+
+    def _evict(self):
+        # Called with the lock held: drop least recently used unpinned files until within budget
+        if self._size <= self.budget:
+            return
+        for key in list(self._entries):
+            if self._size <= self.budget:
+                return
+            if self._is_pinned(key) or key in self._in_flight:
+                continue
+            self._size -= self._entries.pop(key)[0]
+            self._remove_local(key)
+        print(f"WARNING: remote cache over budget ({format_size(self._size)} of {format_size(self.budget)}), "
+              "the rest is pinned or being read")
+
+    def _remove_local(self, key: str):
+        try:
+            self.local_fs.remove(self.local_path(key))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            # Windows refuses to remove a file that is open, it is overwritten on its next fill
+            print(f"WARNING: could not remove cached copy of {key}: {e}")
+
+    def summary(self) -> str:
+        with self._lock:
+            return (f"{len(self._entries)} files, {format_size(self._size)} of {format_size(self.budget)}, "
+                    f"{self.hits} hits, {self.misses} misses")
+
+
+class CachedFs(FsBackend):
+    """
+    A remote backend whose published files are read through a RemoteCache.
+
+    Metadata calls and writes go to the remote backend; writing, renaming or removing a file drops it
+    from the cache. Files outside publish folders are always read from the server.
+    """
+    supports_links = False
+
+    def __init__(self, remote_fs: FsBackend, cache: RemoteCache):
+        self.remote_fs = remote_fs
+        self.cache = cache
+        self.name = remote_fs.name
+
+    def scandir(self, path) -> List[FsEntry]:
+        return self.remote_fs.scandir(path)
+
+    def stat(self, path) -> FsEntry:
+        return self.remote_fs.stat(path)
+
+    def exists(self, path) -> bool:
+        return self.remote_fs.exists(path)
+
+    def mkdir_many(self, paths: Iterable):
+        self.remote_fs.mkdir_many(paths)
+
+    def copy(self, src, dst):
+        self.cache.invalidate(dst)
+        self.remote_fs.copy(src, dst)
+
+    def rename(self, src, dst):
+        self.cache.invalidate(src)
+        self.cache.invalidate(dst)
+        self.remote_fs.rename(src, dst)
+
+    def remove(self, path):
+        self.cache.invalidate(path)
+        self.remote_fs.remove(path)
+
+    def rmdir(self, path):
+        self.remote_fs.rmdir(path)
+
+    def open(self, path, mode: str = "rb"):
+        if "r" in mode and is_cacheable(path):
+            return self.cache.open(path)
+        if "r" not in mode:
+            self.cache.invalidate(path)
+        return self.remote_fs.open(path, mode)
+
+    def set_mtime(self, path, mtime: float):
+        self.remote_fs.set_mtime(path, mtime)
@@ -0,0 +1,239 @@
+#In-memory catalog of the show folders: cached listings and tree text, invalidated per folder
+
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from jade_api.fs import FsBackend, FsEntry, get_fs, join
+from jade_api.sequences import FileSequence, collapse_sequences, display_name
+
+# "_v012_" / "_v012." / trailing "_v012" in export names: lion_geo_v012_sg.usd, lion_tex_v003_sg
+VERSION_TAG_PATTERN = re.compile(r"_v(\d+)(?=[_.]|$)")
+
+
+class _Folder:
+    __slots__ = ("entries", "items", "stale", "lines")
+
+    def __init__(self, entries: List[FsEntry]):
+        self.entries = entries
+        # entries with numbered files collapsed into sequences, built on first use
+        self.items: Optional[List[Union[FsEntry, FileSequence]]] = None
+        self.stale = False
+        # Rendered tree lines of this folder (relative, no prefix), None until rendered or after a change below it
+        self.lines: Optional[List[str]] = None
+
+
+def _sort_key(entry: FsEntry):
+    # Directories first, then files, both alphabetically (same order as build_directory_tree)
+    return not entry.is_dir, entry.name.lower()
+
+
+def latest_versions(entries: List[FsEntry], keep: int) -> Tuple[List[FsEntry], int]:
+    """
+    Collapse an export folder listing to its newest versions.
+
+    Args:
+        entries: Folder listing
+        keep: Number of distinct versions to keep (all files of a kept version stay)
+
+    Returns:
+        (entries to show in their original order, number of hidden entries).
+        Entries without a version tag are always shown.
+    """
+    versions = set()
+    for entry in entries:
+        match = VERSION_TAG_PATTERN.search(entry.name)
+        if match:
+            versions.add(int(match.group(1)))
+    if len(versions) <= keep:
+        return entries, 0
+
+    kept_versions = set(sorted(versions, reverse=True)[:keep])
+    shown = []
+    for entry in entries:
+        match = VERSION_TAG_PATTERN.search(entry.name)
+        if not match or int(match.group(1)) in kept_versions:
+            shown.append(entry)
+    return shown, len(entries) - len(shown)
+
+
+class ShowCatalog:
+    """
+    Cache of the show folder listings and of the rendered directory tree.
+
+    Every folder is listed once and then served from memory. When a watcher reports
+    that a folder changed, only that folder is listed again and only the tree text of
+    that folder and its ancestors is rebuilt; the rest of the show is not touched.
+    Safe to read from the GUI thread while the watcher thread queues changes.
+    """
+
+    def __init__(self, base_path, fs: Optional[FsBackend] = None):
+        self.base_path = base_path
+        self.fs = get_fs(fs)
+        self._folders: Dict[object, _Folder] = {}
+        self._lock = threading.RLock()
+
+    def listing(self, path=None) -> List[FsEntry]:
+        """
+        Entries of a folder, directories first. Listed on first use and after invalidation.
+
+        Raises:
+            FileNotFoundError: If the folder does not exist (it is dropped from the catalog)
+        """
+        with self._lock:
+            return self._folder(self.base_path if path is None else path).entries
+
+    def items(self, path=None) -> List[Union[FsEntry, FileSequence]]:
+        """
+        Like listing(), with frame and UDIM runs collapsed into FileSequence records.
+
+        Raises:
+            FileNotFoundError: If the folder does not exist
+        """
+        with self._lock:
+            folder = self._folder(self.base_path if path is None else path)
+            if folder.items is None:
+                folder.items = collapse_sequences(folder.entries)
+            return folder.items
+
+    def _folder(self, path) -> _Folder:
+        folder = self._folders.get(path)
+        if folder is not None and not folder.stale:
+            return folder
+        try:
+            entries = sorted(self.fs.scandir(path), key=_sort_key)
+        except (FileNotFoundError, NotADirectoryError):
+            self._forget(path)
+            raise
+        if folder is not None:
+            # Sub-folders that disappeared (deleted or moved away) take their cached listings with them
+            kept = {entry.name for entry in entries if entry.is_dir}
+            for entry in folder.entries:
+                if entry.is_dir and entry.name not in kept:
+                    self._forget(join(path, entry.name))
+        folder = _Folder(entries)
+        self._folders[path] = folder
+        return folder
+
+    def _forget(self, path):
+        # Drop a folder and everything cached below it
+        self._folders.pop(path, None)
+        for cached in [p for p in self._folders if path in getattr(p, "parents", ())]:
+            del self._folders[cached]
+
+    def _mark_ancestors(self, path):
+        # The tree text of every ancestor embeds this folder's lines
+        while path != self.base_path:
+            parent = getattr(path, "parent", None)
+            if parent is None or parent == path:
+                break
+            folder = self._folders.get(parent)
+            if folder is not None:
+                folder.lines = None
+            path = parent
+
+    def invalidate(self, path):
+        """Mark one folder's listing as out of date. It is listed again on next access."""
+        with self._lock:
+            folder = self._folders.get(path)
+            if folder is not None:
+                folder.stale = True
+                folder.lines = None
+            self._mark_ancestors(path)
+
+    def cached_folders(self) -> List:
+        """Folders listed so far (expanded in a tree, or read by a form): what a polling watcher needs to watch."""
+        with self._lock:
+            return list(self._folders)
+
+    def refresh_entry(self, path) -> FsEntry:
+        """
+        Stat a file (or folder) instead of trusting its cached entry. A file overwritten in place keeps the
+        mtime of its folder, so watchers polling folders never report it: when the cached listing holds
+        another size or mtime, the entry is replaced there (with the sequences and tree text of its folder).
+
+        Raises:
+            FileNotFoundError: If path does not exist (its folder is listed again on next access)
+        """
+        parent = path.parent
+        try:
+            entry = self.fs.stat(path)
+        except FileNotFoundError:
+            self.invalidate(parent)
+            raise
+        with self._lock:
+            folder = self._folders.get(parent)
+            if folder is None or folder.stale:
+                return entry
+            for position, cached in enumerate(folder.entries):
+                if cached.name != entry.name:
+                    continue
+                if (cached.is_dir, cached.size, cached.mtime) != (entry.is_dir, entry.size, entry.mtime):
+                    entries = list(folder.entries)
+                    entries[position] = FsEntry(cached.name, cached.path, entry.is_dir, entry.size, entry.mtime)
+                    folder.entries = entries
+                    folder.items = None
+                    folder.lines = None
+                    self._mark_ancestors(parent)
+                return entry
+        # Created since the folder was listed
+        self.invalidate(parent)
+        return entry
+
+    def apply_changes(self, paths: Iterable) -> int:
+        """
+        Invalidate the folders reported by a watcher.
+
+        Returns:
+            Number of cached folders that were affected
+        """
+        affected = 0
+        with self._lock:
+            for path in paths:
+                if path in self._folders:
+                    affected += 1
+                self.invalidate(path)
+        return affected
+
+    def clear(self):
+        with self._lock:
+            self._folders.clear()
+
+    def render_tree(self, path=None) -> str:
+        """
+        Text tree of a folder in the build_directory_tree format, built from the cache.
+        Returns an empty string if the folder does not exist.
+        """
+        with self._lock:
+            lines = self._lines(self.base_path if path is None else path)
+        return "".join(line + "\n" for line in lines)
+
+    def _lines(self, path) -> List[str]:
+        try:
+            folder = self._folder(path)
+            items = self.items(path)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            return []
+        if folder.lines is not None:
+            return folder.lines
+
+        # Filter out hidden files/dirs, numbered files are already one line per sequence
+        items = [item for item in items if not item.name.startswith('.')]
+        folders = [item for item in items if item.is_dir]
+        files = [item for item in items if not item.is_dir]
+
+        lines = []
+        for i, entry in enumerate(folders):
+            is_last_folder = (i == len(folders) - 1) and len(files) == 0
+            connector = "└── " if is_last_folder else "├── "
+            lines.append(f"{connector}📁 {entry.name}")
+
+            extension = "    " if is_last_folder else "│   "
+            lines.extend(extension + line for line in self._lines(join(path, entry.name)))
+
+        for i, entry in enumerate(files):
+            connector = "└── " if i == len(files) - 1 else "├── "
+            lines.append(f"{connector}📄 {display_name(entry)}")
+
+        folder.lines = lines
+        return lines
@@ -0,0 +1,253 @@
+#Sparse checkout of one shot: its publish folder and the asset publishes it references, fetched over SFTP
+#
+# The local cache is laid out like the show (same relative paths), so the GUIs and USD references work on it.
+# .tools/checkout_state.json remembers the checked out shots and the size/mtime of every fetched file, so a
+# refresh only downloads files that changed on the server and removes the ones that are gone.
+
+import json
+import posixpath
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from jade_api.fs import FsBackend, get_fs
+from jade_api.scan import get_shot_names
+from jade_api.scheduler import BULK, get_scheduler
+from jade_api.sequences import format_size
+from jade_api.sync import SftpChannelPool, list_files, relative_join, single_channel, transfer_file
+
+CHECKOUT_STATE_NAME = "checkout_state.json"
+
+# Published files whose content may reference assets (USD layers, Maya ascii rigs)
+REFERENCING_EXTENSIONS = (".usd", ".usda", ".usdc", ".ma")
+
+# Any path through an asset publish folder: @../../asset/publish/char/lion/geo/lion_geo.usd@
+ASSET_REFERENCE_PATTERN = re.compile(rb"asset/publish/([A-Za-z0-9_]+)/([A-Za-z0-9_]+)")
+
+# Asset paths of an ascii USD layer: @./geo/lion_geo.usd@
+USD_ASSET_PATH_PATTERN = re.compile(rb"@([^@\r\n]+)@")
+
+
+def shot_publish_root(shot_name: str) -> str:
+    return f"prod/sequences/{shot_name}/publish"
+
+
+def asset_publish_root(asset_type: str, asset_name: str) -> str:
+    return f"prod/asset/publish/{asset_type}/{asset_name}"
+
+
+def _usd_dependencies(path) -> Optional[List[str]]:
+    # Asset paths of a USD layer through the USD library (handles binary .usdc), None without pxr
+    try:
+        from pxr import Sdf
+    except ImportError:
+        return None
+    layer = Sdf.Layer.FindOrOpen(str(path))
+    if layer is None:
+        return []
+    if hasattr(layer, "GetCompositionAssetDependencies"):
+        return list(layer.GetCompositionAssetDependencies())
+    return list(layer.externalReferences)
+
+
+def find_asset_references(path, fs: Optional[FsBackend] = None, relative_path: Optional[str] = None
+                          ) -> Set[Tuple[str, str]]:
+    """
+    (asset type, asset name) of every asset publish referenced by a file.
+
+    USD layers are read through pxr when it is installed (binary crate files included). Otherwise,
+    and for Maya ascii files, the @asset paths@ and any asset publish path in the raw bytes are used,
+    which covers ascii layers.
+
+    Args:
+        path: File to read
+        relative_path: The file's path relative to the show base folder, to resolve "../" references
+    """
+    fs = get_fs(fs)
+    dependencies = None
+    if str(path).endswith((".usd", ".usda", ".usdc")) and fs.name == "local":
+        dependencies = _usd_dependencies(path)
+    if dependencies is None:
+        data = fs.read_bytes(path)
+        dependencies = [match.decode("utf-8", "replace") for match in USD_ASSET_PATH_PATTERN.findall(data)]
+        dependencies.extend(match.group(0).decode() for match in ASSET_REFERENCE_PATTERN.finditer(data))
+
+    assets = set()
+    for dependency in dependencies:
+        dependency = dependency.replace("\\", "/")
+        if dependency.startswith(".") and relative_path:
+            dependency = posixpath.normpath(posixpath.join(posixpath.dirname(relative_path), dependency))
+        match = ASSET_REFERENCE_PATTERN.search(dependency.encode())
+        if match:
+            assets.add((match.group(1).decode(), match.group(2).decode()))
+    return assets
+
+
+class CheckoutResult:
+    """
+    What a checkout or refresh did.
+
+    Attributes:
+        roots: Folders checked out (the shot publish folder and the referenced asset publishes)
+        downloaded: Files fetched because they were new or changed on the server
+        removed: Local files removed because they are gone from the server or no longer referenced
+        unchanged: Files already up to date
+        downloaded_size: Bytes fetched
+    """
+
+    def __init__(self):
+        self.roots: List[str] = []
+        self.downloaded: List[str] = []
+        self.removed: List[str] = []
+        self.unchanged = 0
+        self.downloaded_size = 0
+
+    def __str__(self):
+        return (f"{len(self.roots)} folders: {len(self.downloaded)} files downloaded "
+                f"({format_size(self.downloaded_size)}), {len(self.removed)} removed, {self.unchanged} up to date")
+
+
+class SparseCheckout:
+    """
+    Local cache holding a few shots of a remote show.
+
+    Usage:
+        checkout = SparseCheckout(cache_base, remote_base, SftpFs(sftp_client))
+        with SftpChannelPool(sftp_client) as pool:
+            print(checkout.checkout("seq_010_shot_0010", pool=pool))
+    """
+
+    def __init__(self, cache_base, remote_base, remote_fs: FsBackend, local_fs: Optional[FsBackend] = None):
+        self.cache_base = cache_base
+        self.remote_base = remote_base
+        self.remote_fs = remote_fs
+        self.local_fs = get_fs(local_fs)
+        self.state_path = cache_base / ".tools" / CHECKOUT_STATE_NAME
+
+    # ---- state ----
+
+    def load_state(self) -> dict:
+        """{"remote": str, "shots": {shot: [roots]}, "files": {path: [size, remote mtime]}}"""
+        empty = {"remote": str(self.remote_base), "shots": {}, "files": {}}
+        try:
+            state = json.loads(self.local_fs.read_bytes(self.state_path).decode("utf-8"))
+        except FileNotFoundError:
+            return empty
+        except ValueError as e:
+            print(f"WARNING: ignoring unreadable checkout state {self.state_path}: {e}")
+            return empty
+        return state if state.get("remote") == str(self.remote_base) else empty
+
+    def save_state(self, state: dict):
+        self.local_fs.mkdir_many([self.state_path.parent])
+        self.local_fs.write_bytes_atomic(self.state_path, json.dumps(state, sort_keys=True).encode("utf-8"))
+
+    def shots(self) -> List[str]:
+        """Shots checked out in this cache."""
+        return sorted(self.load_state()["shots"])
+
+    # ---- checkout ----
+
+    def checkout(self, shot_name: str, pool: Optional[SftpChannelPool] = None,
+                 progress: Optional[Callable[[int, int], None]] = None) -> CheckoutResult:
+        """
+        Fetch (or refresh) a shot's publish folder and every asset publish it references.
+
+        References are followed through the fetched files, so assets referenced by an asset
+        (an assembly referencing a geo publish) come along too.
+
+        Args:
+            shot_name: A shot of the remote show, as listed by get_shot_names
+            pool: Channels to list and download on in parallel
+            progress: Called as progress(done, total) after each downloaded file
+
+        Raises:
+            ValueError: If the shot does not exist on the server
+        """
+        if shot_name not in get_shot_names(self.remote_base, fs=self.remote_fs):
+            raise ValueError(f"Shot '{shot_name}' not found in {self.remote_base}")
+
+        state = self.load_state()
+        files: Dict[str, list] = state["files"]
+        result = CheckoutResult()
+        channel = pool.channel if pool is not None else single_channel(self.remote_fs)
+        workers = pool.size if pool is not None else 1
+
+        roots: List[str] = []
+        pending = [shot_publish_root(shot_name)]
+        try:
+            while pending:
+                roots.extend(pending)
+                remote_files = list_files(channel, self.remote_base, pending, workers)
+                self._fetch(remote_files, files, channel, workers, result, progress)
+                self._remove_missing(pending, remote_files, files, result)
+
+                # Follow the references of the files of this round to the next round's asset folders
+                referenced = set()
+                for path in remote_files:
+                    if path.endswith(REFERENCING_EXTENSIONS):
+                        referenced |= find_asset_references(relative_join(self.cache_base, path), self.local_fs, path)
+                pending = sorted({asset_publish_root(*asset) for asset in referenced} - set(roots))
+
+            state["shots"][shot_name] = roots
+            self._prune_unreferenced(state, result)
+        finally:
+            # Files fetched before a failure are not fetched again
+            self.save_state(state)
+        result.roots = roots
+        return result
+
+    def refresh(self, pool: Optional[SftpChannelPool] = None) -> List[Tuple[str, CheckoutResult]]:
+        """Refresh every checked out shot."""
+        return [(shot_name, self.checkout(shot_name, pool=pool)) for shot_name in self.shots()]
+
+    def _fetch(self, remote_files: Dict[str, tuple], files: Dict[str, list], channel: Callable, workers: int,
+               result: CheckoutResult, progress: Optional[Callable[[int, int], None]]):
+        # Download files that are new or changed since they were fetched (or modified in the cache)
+        to_fetch = []
+        for path, (size, mtime) in sorted(remote_files.items()):
+            local_path = relative_join(self.cache_base, path)
+            if files.get(path) == [size, mtime]:
+                try:
+                    local = self.local_fs.stat(local_path)
+                    if (local.size, local.mtime) == (size, mtime):
+                        result.unchanged += 1
+                        continue
+                except FileNotFoundError:
+                    pass
+            to_fetch.append(path)
+
+        def download(path: str):
+            with get_scheduler().transfer(BULK, job="checkout"), channel() as remote_fs:
+                transfer_file(remote_fs, relative_join(self.remote_base, path),
+                              self.local_fs, relative_join(self.cache_base, path))
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jade-checkout") as executor:
+            for done, (path, _) in enumerate(zip(to_fetch, executor.map(download, to_fetch)), 1):
+                size, mtime = remote_files[path]
+                files[path] = [size, mtime]
+                result.downloaded.append(path)
+                result.downloaded_size += size
+                if progress:
+                    progress(done, len(to_fetch))
+
+    def _remove_missing(self, roots: List[str], remote_files: Dict[str, tuple], files: Dict[str, list],
+                        result: CheckoutResult):
+        # Files fetched before under these roots that are gone from the server
+        prefixes = tuple(root + "/" for root in roots)
+        for path in [path for path in files if path.startswith(prefixes) and path not in remote_files]:
+            self._remove(path, files, result)
+
+    def _prune_unreferenced(self, state: dict, result: CheckoutResult):
+        # Files of asset publishes no checked out shot references any more
+        prefixes = tuple(root + "/" for roots in state["shots"].values() for root in roots)
+        for path in [path for path in state["files"] if not path.startswith(prefixes)]:
+            self._remove(path, state["files"], result)
+
+    def _remove(self, path: str, files: Dict[str, list], result: CheckoutResult):
+        try:
+            self.local_fs.remove(relative_join(self.cache_base, path))
+        except FileNotFoundError:
+            pass
+        del files[path]
+        result.removed.append(path)
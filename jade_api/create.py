@@ -2,7 +2,8 @@
 
 from pathlib import Path
 from jade_api.info import LocalUser
-from typing import Dict
+from jade_api.fs import FsBackend, FsEntry, get_fs
+from typing import Dict, List, Optional
 import re
 
 # create dictionary of file structure, what folders you want within each folder
@@ -28,23 +29,31 @@ DIR_CONFIG = {
 }
 
 
-def create_show(user: LocalUser):
+def create_show(user: LocalUser, fs: Optional[FsBackend] = None):
     root_dir = Path(user.collab_path) #path of where directory is located is imported from localuser class from info.py
-    root_dir.mkdir(parents=True, exist_ok=True)
-    create_paths(root_dir, DIR_CONFIG)
+    get_fs(fs).mkdir_many([root_dir])
+    create_paths(root_dir, DIR_CONFIG, fs=fs)
 
 # recursively check through file structure in DIR_CONFIG to make new directory if it does not exist
 # because it is based on what is in the dictionary, the code itself will work even if the file structure
 # is later changed
-def create_paths(root_dir, dir_config: Dict): # path of where the directory is located, dictionary of directory
+def create_paths(root_dir, dir_config: Dict, fs: Optional[FsBackend] = None): # path of where the directory is located, dictionary of directory
+    # all folders are collected first (parents before children) and created in one backend call
+    get_fs(fs).mkdir_many(list_config_paths(root_dir, dir_config))
+
+
+def list_config_paths(root_dir, dir_config: Dict) -> List[Path]:
+    """Return every folder described by dir_config under root_dir, parents before children."""
+    paths = []
     for dir_this_level, sub_dirs in dir_config.items():
         new_path : Path = root_dir / dir_this_level # connect new directory level to root
-        new_path.mkdir(exist_ok=True) # check if directory exists
-        create_paths(root_dir=new_path, dir_config=sub_dirs) # run create path function in the next directory level
+        paths.append(new_path)
+        paths.extend(list_config_paths(new_path, sub_dirs)) # list the next directory level
+    return paths
 
 
 
-def create_new_asset(asset_name: str, asset_type: str, asset_base_path: Path):
+def create_new_asset(asset_name: str, asset_type: str, asset_base_path: Path, fs: Optional[FsBackend] = None):
     """
     Create a new asset directory structure for char, prop, or set.
     
@@ -52,6 +61,7 @@ def create_new_asset(asset_name: str, asset_type: str, asset_base_path: Path):
         asset_name: Name of the asset (e.g., "lion", "stone", "forest")
         asset_type: Type of asset ("char", "prop", or "set")
         asset_base_path: Path to the assets folder (prod/assets)
+        fs: Filesystem backend, local when None
     
     Raises:
         ValueError: If asset_type is not "char", "prop", or "set"
@@ -104,20 +114,23 @@ def create_new_asset(asset_name: str, asset_type: str, asset_base_path: Path):
     # shot structures not used here
     
     # Create publish and working directories
+    paths = []
     for mode in ["working"]:
         asset_path = asset_base_path / mode / asset_type / asset_name
-        asset_path.mkdir(parents=True, exist_ok=True)
-        create_paths(asset_path, asset_working_structure)
+        paths.append(asset_path)
+        paths.extend(list_config_paths(asset_path, asset_working_structure))
 
     for mode in ["publish"]:
         asset_path = asset_base_path / mode / asset_type / asset_name
-        asset_path.mkdir(parents=True, exist_ok=True)
-        create_paths(asset_path, asset_publish_structure)
+        paths.append(asset_path)
+        paths.extend(list_config_paths(asset_path, asset_publish_structure))
+
+    get_fs(fs).mkdir_many(paths)
 
 
 
 
-def create_new_shot(sequence_num: float, shot_num: float, shot_base_path: Path):
+def create_new_shot(sequence_num: float, shot_num: float, shot_base_path: Path, fs: Optional[FsBackend] = None):
     """
     Create a new shot directory structure under working and publish folders.
     
@@ -125,6 +138,7 @@ def create_new_shot(sequence_num: float, shot_num: float, shot_base_path: Path):
         sequence_num: Sequence number (e.g., 1 for seq_010, 4 for seq_040)
         shot_num: Shot number (e.g., 1 for shot_0010, 25 for shot_0250)
         shot_base_path: Path to the sequences folder (prod/sequences)
+        fs: Filesystem backend, local when None
     """
     # Format sequence and shot numbers with decimal slots (multiply by 10)
     # This reserves the last digit for decimal inserts (e.g., seq 1 -> 010, shot 1 -> 0010)
@@ -151,20 +165,24 @@ def create_new_shot(sequence_num: float, shot_num: float, shot_base_path: Path):
         "camera": {},
     }
     
+    paths = []
     # Create working directory structure (prod/sequences/working/seq_xxx_shot_xxx/...)
     for mode in ["working"]:
         shot_path = shot_base_path / shot_name / mode
-        shot_path.mkdir(parents=True, exist_ok=True)
-        create_paths(shot_path, SHOT_WORKING_STRUCTURE)
+        paths.append(shot_path)
+        paths.extend(list_config_paths(shot_path, SHOT_WORKING_STRUCTURE))
     
     # Create publish directory structure (prod/sequences/publish/seq_xxx_shot_xxx/...)
     for mode in ["publish"]:
         shot_path = shot_base_path / shot_name / mode
-        shot_path.mkdir(parents=True, exist_ok=True)
-        create_paths(shot_path, SHOT_PUBLISH_STRUCTURE)
+        paths.append(shot_path)
+        paths.extend(list_config_paths(shot_path, SHOT_PUBLISH_STRUCTURE))
 
+    get_fs(fs).mkdir_many(paths)
 
-def create_new_shot_asset(shot_name: str, shot_asset_name: str, shot_base_path: Path):
+
+def create_new_shot_asset(shot_name: str, shot_asset_name: str, shot_base_path: Path,
+                          fs: Optional[FsBackend] = None):
     """
     Create a new shot-specific asset structure.
 
@@ -172,6 +190,7 @@ def create_new_shot_asset(shot_name: str, shot_asset_name: str, shot_base_path:
         shot_name: The name of the shot (e.g., 'seq_010_shot_0010')
         asset_name: The name of the specific asset to create
         shot_base_path: Path to the sequences folder (prod/sequences)
+        fs: Filesystem backend, local when None
     """
 
     # Define the specific internal structures for shot-based assets
@@ -190,19 +209,19 @@ def create_new_shot_asset(shot_name: str, shot_asset_name: str, shot_base_path:
     # Create the Working directories
     # Path: prod/sequences/<shot_name>/working/<asset_name>/export
     working_path = shot_base_path / shot_name / "working"
-    working_path.mkdir(parents=True, exist_ok=True)
-    create_paths(working_path, SHOT_ASSET_WORKING_STRUCTURE)
+    paths = [working_path] + list_config_paths(working_path, SHOT_ASSET_WORKING_STRUCTURE)
 
     # Create the Publish directories
     # Path: prod/sequences/<shot_name>/publish/<asset_name>
     publish_path = shot_base_path / shot_name / "publish"
-    publish_path.mkdir(parents=True, exist_ok=True)
-    create_paths(publish_path, SHOT_ASSET_PUBLISH_STRUCTURE)
+    paths += [publish_path] + list_config_paths(publish_path, SHOT_ASSET_PUBLISH_STRUCTURE)
+
+    get_fs(fs).mkdir_many(paths)
 
 
 
 def find_highest_version_file(export_path: Path, asset_name: str, department: str, file_extension: None,
-                              is_folder_search: bool = False):
+                              is_folder_search: bool = False, fs: Optional[FsBackend] = None):
     """
     Identifies the file or folder with the highest numerical version in the given directory.
     Pattern: <asset_name>_<department>_v<numerical_version>_<user_initials>.<file_extension>
@@ -210,9 +229,23 @@ def find_highest_version_file(export_path: Path, asset_name: str, department: st
     The file_extension should include the leading dot, e.g., '.usd'.
     If is_folder_search is True, file_extension is ignored and we look for folders.
     """
-    if not export_path.is_dir():
+    try:
+        # one listing gives names and types, no per-item stat
+        entries = get_fs(fs).scandir(export_path)
+    except (FileNotFoundError, NotADirectoryError):
         return None
 
+    return pick_highest_version(entries, export_path, asset_name, department, file_extension, is_folder_search)
+
+
+def pick_highest_version(entries: List[FsEntry], export_path: Path, asset_name: str, department: str,
+                         file_extension: None, is_folder_search: bool = False):
+    """
+    find_highest_version_file on a listing that is already known (e.g. from the show catalog).
+
+    Returns:
+        export_path / <highest versioned name>, or None
+    """
     # Create file prefix
     name_prefix = f"{asset_name}_{department}_v"
 
@@ -223,12 +256,15 @@ def find_highest_version_file(export_path: Path, asset_name: str, department: st
     ext_suffix = file_extension if file_extension and file_extension.startswith(
         '.') else f".{file_extension}" if file_extension else ""
 
-    for item_path in export_path.iterdir():
+    # The regex captures the version number (digits between 'v' and the next '_')
+    version_pattern = re.compile(f"{re.escape(name_prefix)}(\\d+)_")
+
+    for entry in entries:
 
         # Check if the item type matches what we are looking for
-        if (is_folder_search and item_path.is_dir()) or (not is_folder_search and item_path.is_file()):
+        if entry.is_dir == is_folder_search:
 
-            item_name = item_path.name
+            item_name = entry.name
 
             # Check for prefix
             if item_name.startswith(name_prefix):
@@ -237,14 +273,9 @@ def find_highest_version_file(export_path: Path, asset_name: str, department: st
                 if not is_folder_search and not item_name.endswith(ext_suffix):
                     continue
 
-                try:
-                    # The regex captures the version number (digits between 'v' and the next '_')
-                    match = re.search(f"{re.escape(name_prefix)}(\\d+)_", item_name)
-                    if match:
-                        version = int(match.group(1))
-                        versioned_items.append((version, item_path))
-                except Exception:
-                    continue
+                match = version_pattern.search(item_name)
+                if match:
+                    versioned_items.append((int(match.group(1)), export_path / item_name))
 
     if not versioned_items:
         return None
@@ -0,0 +1,228 @@
+#Replication of publishes to the farm cache (JADE_FARM), so render nodes read from farm storage
+#
+# The farm cache has the same layout as the show. After a publish its publish folder is queued; a
+# background thread makes the farm copy of the folder match it. Publishing the same folder again while
+# it is queued replicates it once. On the same volume files are hardlinked (or reflinked), elsewhere
+# they are copied; every copy is read back and its checksum compared before it replaces the farm file.
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from jade_api.fs import FsBackend, get_fs
+from jade_api.hashing import copy_with_hash, hash_file
+from jade_api.info import LocalUser
+from jade_api.scheduler import BULK, get_scheduler
+
+# Farm files being written, renamed over the real name once verified
+FARM_PARTIAL_SUFFIX = ".jade-farm.tmp"
+
+# Replicators of this process, one per (show, farm cache)
+_REPLICATORS: Dict[Tuple[str, str], "FarmReplicator"] = {}
+_REPLICATORS_GUARD = threading.Lock()
+
+
+class FarmResult:
+    """
+    What replicating one or more publish folders did.
+
+    Attributes:
+        linked: Files hardlinked into the farm cache (same volume)
+        copied: Files copied and verified
+        removed: Farm files and folders removed because they are no longer published
+        unchanged: Farm files that already matched
+    """
+
+    def __init__(self):
+        self.linked = 0
+        self.copied = 0
+        self.removed = 0
+        self.unchanged = 0
+
+    def add(self, other: "FarmResult"):
+        self.linked += other.linked
+        self.copied += other.copied
+        self.removed += other.removed
+        self.unchanged += other.unchanged
+
+    def __str__(self):
+        return (f"{self.linked} linked, {self.copied} copied, {self.removed} removed, "
+                f"{self.unchanged} up to date")
+
+
+class FarmReplicator:
+    """
+    Background queue replicating publish folders of a show to the farm cache.
+
+    Only local (or mounted network) shows are replicated: the files are linked or copied by path.
+    """
+
+    def __init__(self, base_path, farm_path, fs: Optional[FsBackend] = None):
+        """
+        Args:
+            base_path: Show base folder
+            farm_path: Show base folder on the farm storage
+        """
+        self.base_path = Path(base_path)
+        self.farm_path = Path(farm_path)
+        self.fs = get_fs(fs)
+        self.fs.mkdir_many([self.farm_path])
+        self.same_volume = self.fs.supports_links and os.stat(self.base_path).st_dev == os.stat(self.farm_path).st_dev
+        # Folders waiting for replication, relative to the base folder; a folder is queued once
+        self._pending: "OrderedDict[str, None]" = OrderedDict()
+        self._busy = False
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.failed: List[Tuple[str, str]] = []
+
+    def enqueue(self, publish_folder):
+        """Queue a publish folder (absolute, under the base folder) for replication."""
+        relative_path = Path(publish_folder).relative_to(self.base_path).as_posix()
+        with self._condition:
+            self._pending[relative_path] = None
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="jade-farm", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the queue is empty. Returns False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending)
+                relative_path, _ = self._pending.popitem(last=False)
+                self._busy = True
+            try:
+                with get_scheduler().transfer(BULK, job="farm"):
+                    self.replicate_folder(relative_path)
+            except OSError as e:
+                print(f"WARNING: farm replication of {relative_path} failed: {e}")
+                self.failed.append((relative_path, str(e)))
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+    # ---- replication ----
+
+    def replicate_folder(self, relative_path: str) -> FarmResult:
+        """
+        Make the farm copy of a folder match the show folder now (without the queue).
+
+        Args:
+            relative_path: Folder relative to the base folder ("prod/sequences/seq_010_shot_0010/publish/light")
+        """
+        result = FarmResult()
+        source_dir = self.base_path / relative_path
+        farm_dir = self.farm_path / relative_path
+        try:
+            sources = {entry.name: entry for entry in self.fs.scandir(source_dir)}
+        except FileNotFoundError:
+            sources = {}
+        try:
+            farm_entries = {entry.name: entry for entry in self.fs.scandir(farm_dir)}
+        except FileNotFoundError:
+            if not sources:
+                return result
+            farm_entries = {}
+            self.fs.mkdir_many([farm_dir])
+
+        for name, entry in sources.items():
+            if entry.is_dir:
+                result.add(self.replicate_folder(f"{relative_path}/{name}"))
+                continue
+            farm_entry = farm_entries.get(name)
+            if farm_entry is not None and not farm_entry.is_dir and \
+                    (farm_entry.size, farm_entry.mtime) == (entry.size, entry.mtime):
+                result.unchanged += 1
+                continue
+            if farm_entry is not None and farm_entry.is_dir:
+                self.fs.rmtree(farm_entry.path)
+            if self._replicate_file(entry.path, farm_dir / name):
+                result.linked += 1
+            else:
+                result.copied += 1
+
+        # Unpublished files (and leftovers of interrupted copies) go away
+        for name, farm_entry in farm_entries.items():
+            if name in sources:
+                continue
+            if farm_entry.is_dir:
+                self.fs.rmtree(farm_entry.path)
+            else:
+                self.fs.remove(farm_entry.path)
+            result.removed += 1
+        if not sources:
+            self.fs.rmdir(farm_dir)
+        return result
+
+    def _replicate_file(self, source, destination) -> bool:
+        # Returns True when destination is a hardlink of source, False for a verified copy
+        partial = destination.parent / f".{destination.name}{FARM_PARTIAL_SUFFIX}"
+        if self.fs.exists(partial):
+            self.fs.remove(partial)
+
+        if self.same_volume:
+            self.fs.link(source, partial)
+            if self.fs.link_count(partial) > 1:
+                self.fs.rename(partial, destination)
+                return True
+            # Reflinked or copied: check the data like any copy
+            expected = hash_file(source, self.fs)
+        else:
+            expected = copy_with_hash(source, partial, self.fs)
+
+        if hash_file(partial, self.fs) != expected:
+            self.fs.remove(partial)
+            raise OSError(f"Checksum mismatch replicating {source} to {destination}")
+        self.fs.rename(partial, destination)
+        return False
+
+    def publish_folders(self) -> List[str]:
+        """Every publish folder of the show (asset and shot), relative to the base folder."""
+        folders = ["prod/asset/publish"]
+        try:
+            shots = self.fs.scandir(self.base_path / "prod" / "sequences")
+        except FileNotFoundError:
+            shots = []
+        folders.extend(f"prod/sequences/{entry.name}/publish" for entry in shots
+                       if entry.is_dir and self.fs.is_dir(entry.path / "publish"))
+        return folders
+
+    def replicate_all(self) -> FarmResult:
+        """Replicate every publish folder now, catching up on publishes made while nothing was running."""
+        result = FarmResult()
+        for relative_path in self.publish_folders():
+            result.add(self.replicate_folder(relative_path))
+        return result
+
+
+def farm_replicator(base_path, fs: Optional[FsBackend] = None) -> Optional[FarmReplicator]:
+    """The shared replicator of a show when JADE_FARM is set and the show is local, None otherwise."""
+    farm_path = LocalUser().farm_path
+    fs = get_fs(fs)
+    if not farm_path or fs.name != "local":
+        return None
+    key = (str(base_path), farm_path)
+    with _REPLICATORS_GUARD:
+        replicator = _REPLICATORS.get(key)
+        if replicator is None:
+            try:
+                replicator = _REPLICATORS[key] = FarmReplicator(base_path, farm_path, fs)
+            except OSError as e:
+                print(f"WARNING: farm cache {farm_path} unavailable, publishes are not replicated: {e}")
+                return None
+        return replicator
+
+
+def replicate_publish(base_path, publish_folder, fs: Optional[FsBackend] = None):
+    """Queue a publish folder for the farm cache (no-op without JADE_FARM)."""
+    replicator = farm_replicator(base_path, fs)
+    if replicator is not None:
+        replicator.enqueue(publish_folder)
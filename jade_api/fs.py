@@ -0,0 +1,669 @@
+#Filesystem backends: the same create / scan / publish code runs on a local share, an SFTP server or in memory
+#
+# Every backend takes Path / PurePath / str paths. Local paths are used as they are,
+# SFTP and in-memory paths are treated as POSIX paths ('/' separators).
+
+import errno
+import os
+import posixpath
+import shutil
+import stat
+import sys
+import threading
+import time
+from io import BytesIO
+from pathlib import PurePath, PurePosixPath
+from typing import Callable, Iterable, List, Optional
+
+# Chunk size for streaming copies between backends
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Linux ioctl cloning a whole file on copy-on-write filesystems (btrfs, XFS with reflink=1)
+FICLONE = 0x40049409
+
+
+class FsEntry:
+    """
+    One directory entry returned by FsBackend.scandir() / stat().
+
+    Attributes:
+        name: Entry name (no folder)
+        path: Full path of the entry, as given to the backend
+        is_dir: True for folders
+        size: Size in bytes (0 for folders)
+        mtime: Modification time in seconds since the epoch
+    """
+    __slots__ = ("name", "path", "is_dir", "size", "mtime")
+
+    def __init__(self, name: str, path, is_dir: bool, size: int = 0, mtime: float = 0.0):
+        self.name = name
+        self.path = path
+        self.is_dir = is_dir
+        self.size = size
+        self.mtime = mtime
+
+    @property
+    def is_file(self) -> bool:
+        return not self.is_dir
+
+    def __repr__(self):
+        kind = "dir" if self.is_dir else f"{self.size} bytes"
+        return f"FsEntry({self.name!r}, {kind})"
+
+
+class FsBackend:
+    """
+    Interface shared by all backends. Missing paths raise FileNotFoundError,
+    like the os module, whatever the backend.
+    """
+    name = "base"
+
+    # True when link() makes real hardlinks and link_count() reports them
+    supports_links = False
+
+    # True when symlink() is available (it may still fail, e.g. on Windows without the privilege)
+    supports_symlinks = False
+
+    def scandir(self, path) -> List[FsEntry]:
+        """List a folder with type, size and mtime of every entry (one round trip where possible)."""
+        raise NotImplementedError
+
+    def stat(self, path) -> FsEntry:
+        raise NotImplementedError
+
+    def mkdir_many(self, paths: Iterable):
+        """Create every folder in paths, including missing parents. Existing folders are fine."""
+        raise NotImplementedError
+
+    def copy(self, src, dst):
+        """Copy a file within this backend, keeping its mtime. dst is overwritten."""
+        raise NotImplementedError
+
+    def link(self, src, dst):
+        """
+        Make dst share src's data where the backend can (hardlink, else copy-on-write clone),
+        copy otherwise. dst must not exist.
+        """
+        self.copy(src, dst)
+
+    def link_count(self, path) -> int:
+        """Number of names sharing path's data (always 1 on backends without hardlinks)."""
+        return 1
+
+    def symlink(self, target: str, path):
+        """Make path a symbolic link to target (a path relative to path's folder). path must not exist."""
+        raise NotImplementedError
+
+    def rename(self, src, dst):
+        """Move src to dst, replacing dst if it exists."""
+        raise NotImplementedError
+
+    def remove(self, path):
+        raise NotImplementedError
+
+    def rmdir(self, path):
+        raise NotImplementedError
+
+    def open(self, path, mode: str = "rb"):
+        """
+        Open a file in binary mode ('rb', 'wb', 'ab' or 'xb'). 'xb' creates the file atomically and raises
+        FileExistsError if it exists, also between machines sharing the folder (lock files).
+        """
+        raise NotImplementedError
+
+    def set_mtime(self, path, mtime: float):
+        raise NotImplementedError
+
+    def sync(self, f):
+        """Push what was written to a file opened with open() to the storage before going on."""
+        f.flush()
+
+    # ---- helpers built on the methods above, backends may override them with faster versions ----
+
+    def exists(self, path) -> bool:
+        try:
+            self.stat(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def is_dir(self, path) -> bool:
+        try:
+            return self.stat(path).is_dir
+        except FileNotFoundError:
+            return False
+
+    def is_file(self, path) -> bool:
+        try:
+            return not self.stat(path).is_dir
+        except FileNotFoundError:
+            return False
+
+    def listdir(self, path) -> List[str]:
+        return [entry.name for entry in self.scandir(path)]
+
+    def mkdir(self, path):
+        self.mkdir_many([path])
+
+    def copytree(self, src, dst):
+        """Copy the folder src to dst (dst must not exist yet)."""
+        self.mkdir_many([dst])
+        for entry in self.scandir(src):
+            target = join(dst, entry.name)
+            if entry.is_dir:
+                self.copytree(entry.path, target)
+            else:
+                self.copy(entry.path, target)
+
+    def rmtree(self, path):
+        for entry in self.scandir(path):
+            if entry.is_dir:
+                self.rmtree(entry.path)
+            else:
+                self.remove(entry.path)
+        self.rmdir(path)
+
+    def read_bytes(self, path) -> bytes:
+        with self.open(path, "rb") as f:
+            return f.read()
+
+    def write_bytes(self, path, data: bytes):
+        with self.open(path, "wb") as f:
+            f.write(data)
+
+    def write_bytes_atomic(self, path, data: bytes):
+        """Write a temporary file next to path and rename it over path, so readers never see half a file."""
+        tmp_path = join(getattr(path, "parent", posixpath.dirname(str(path))),
+                        f"{posixpath.basename(str(path))}.{os.getpid()}.{threading.get_ident()}.tmp")
+        self.write_bytes(tmp_path, data)
+        self.rename(tmp_path, path)
+
+
+# Per-thread callable told the size of every chunk a streaming copy moves (the transfer scheduler's meter)
+_chunk_hooks = threading.local()
+
+
+def set_chunk_hook(hook: Optional[Callable[[int], None]]) -> Optional[Callable[[int], None]]:
+    """Set the chunk hook of the current thread, returning the previous one."""
+    previous = getattr(_chunk_hooks, "hook", None)
+    _chunk_hooks.hook = hook
+    return previous
+
+
+def chunk_hook() -> Optional[Callable[[int], None]]:
+    return getattr(_chunk_hooks, "hook", None)
+
+
+def join(folder, name: str):
+    """Join a child name onto a path of any backend, keeping the path type."""
+    if isinstance(folder, str):
+        return posixpath.join(folder, name)
+    return folder / name
+
+
+# ======================== LOCAL ========================
+
+class _LocalEntry(FsEntry):
+    # is_dir comes from the directory listing itself (no extra call on most filesystems).
+    # size and mtime need a stat, so it is only made the first time one of them is read.
+    __slots__ = ("_dir_entry", "_stat")
+
+    def __init__(self, dir_entry: os.DirEntry, path):
+        self.name = dir_entry.name
+        self.path = path
+        self.is_dir = dir_entry.is_dir()
+        self._dir_entry = dir_entry
+        self._stat = None
+
+    def _get_stat(self):
+        if self._stat is None:
+            self._stat = self._dir_entry.stat()
+        return self._stat
+
+    @property
+    def size(self) -> int:
+        return 0 if self.is_dir else self._get_stat().st_size
+
+    @property
+    def mtime(self) -> float:
+        return self._get_stat().st_mtime
+
+
+class LocalFs(FsBackend):
+    """The local filesystem / mounted share (NFS, SMB)."""
+    name = "local"
+    supports_links = True
+    supports_symlinks = True
+
+    def scandir(self, path) -> List[FsEntry]:
+        with os.scandir(path) as it:
+            return [_LocalEntry(item, join(path, item.name)) for item in it]
+
+    def stat(self, path) -> FsEntry:
+        st = os.stat(path)
+        is_dir = stat.S_ISDIR(st.st_mode)
+        return FsEntry(os.path.basename(str(path)), path, is_dir, 0 if is_dir else st.st_size, st.st_mtime)
+
+    def exists(self, path) -> bool:
+        return os.path.exists(path)
+
+    def is_dir(self, path) -> bool:
+        return os.path.isdir(path)
+
+    def is_file(self, path) -> bool:
+        return os.path.isfile(path)
+
+    def listdir(self, path) -> List[str]:
+        return os.listdir(path)
+
+    def mkdir_many(self, paths: Iterable):
+        for path in paths:
+            try:
+                os.mkdir(path)
+            except FileExistsError:
+                if not os.path.isdir(path):
+                    raise
+            except FileNotFoundError:
+                os.makedirs(path, exist_ok=True)
+
+    def copy(self, src, dst):
+        if chunk_hook() is None:
+            # Kernel copy (copy_file_range / sendfile), the data never comes up to Python
+            shutil.copy2(src, dst)
+            return
+        # A metered transfer (see jade_api.scheduler): streamed so every chunk is reported
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            _stream(fsrc, fdst)
+        shutil.copystat(src, dst)
+
+    def link(self, src, dst):
+        try:
+            os.link(src, dst)
+        except OSError as e:
+            # Other volume, or a filesystem without hardlinks (some SMB shares)
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.EMLINK):
+                raise
+            if not _reflink(src, dst):
+                self.copy(src, dst)
+
+    def link_count(self, path) -> int:
+        return os.stat(path).st_nlink
+
+    def symlink(self, target: str, path):
+        os.symlink(target, path)
+
+    def copytree(self, src, dst):
+        shutil.copytree(src, dst, copy_function=self.copy)
+
+    def rename(self, src, dst):
+        os.replace(src, dst)
+
+    def remove(self, path):
+        os.unlink(path)
+
+    def rmdir(self, path):
+        os.rmdir(path)
+
+    def rmtree(self, path):
+        shutil.rmtree(path)
+
+    def open(self, path, mode: str = "rb"):
+        return open(path, mode)
+
+    def set_mtime(self, path, mtime: float):
+        os.utime(path, (mtime, mtime))
+
+    def sync(self, f):
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _reflink(src, dst) -> bool:
+    # Copy-on-write clone of src (shares its blocks until one side is written), False when unsupported
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    except OSError:
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+
+LOCAL_FS = LocalFs()
+
+
+def get_fs(fs: Optional[FsBackend] = None) -> FsBackend:
+    """Return fs, or the local filesystem when None (the default of every jade_api function)."""
+    return fs if fs is not None else LOCAL_FS
+
+
+# ======================== SFTP ========================
+
+def _posix(path) -> str:
+    if isinstance(path, PurePath):
+        return path.as_posix()
+    return str(path).replace("\\", "/")
+
+
+class SftpFs(FsBackend):
+    """
+    A remote show over SFTP, through the paramiko SFTPClient returned by sftp_connect().
+    SFTP has no server-side copy, so copy() streams the file through this client.
+    """
+    name = "sftp"
+
+    def __init__(self, sftp_client):
+        self.sftp = sftp_client
+
+    def _entry(self, name: str, path, attr) -> FsEntry:
+        is_dir = stat.S_ISDIR(attr.st_mode or 0)
+        return FsEntry(name, path, is_dir, 0 if is_dir else (attr.st_size or 0), float(attr.st_mtime or 0))
+
+    def scandir(self, path) -> List[FsEntry]:
+        # listdir_attr is one round trip for the names, types, sizes and mtimes of a folder
+        try:
+            attrs = self.sftp.listdir_attr(_posix(path))
+        except IOError as e:
+            raise _to_os_error(e, path)
+        entries = []
+        for attr in attrs:
+            name, entry_path = attr.filename, join(path, attr.filename)
+            if stat.S_ISLNK(attr.st_mode or 0):
+                # Pointer publishes: the listing describes the symlink, readers get what it points at
+                try:
+                    attr = self.sftp.stat(_posix(entry_path))
+                except IOError:
+                    pass
+            entries.append(self._entry(name, entry_path, attr))
+        return entries
+
+    def stat(self, path) -> FsEntry:
+        try:
+            attr = self.sftp.stat(_posix(path))
+        except IOError as e:
+            raise _to_os_error(e, path)
+        return self._entry(posixpath.basename(_posix(path)), path, attr)
+
+    def mkdir_many(self, paths: Iterable):
+        for path in paths:
+            self._mkdir(_posix(path))
+
+    def _mkdir(self, remote: str):
+        try:
+            self.sftp.mkdir(remote)
+            return
+        except IOError:
+            pass
+        # mkdir failed: either it already exists or a parent is missing
+        try:
+            if stat.S_ISDIR(self.sftp.stat(remote).st_mode or 0):
+                return
+            raise FileExistsError(errno.EEXIST, "Not a folder", remote)
+        except FileNotFoundError:
+            parent = posixpath.dirname(remote.rstrip("/"))
+            if not parent or parent == remote:
+                raise
+            self._mkdir(parent)
+            try:
+                self.sftp.mkdir(remote)
+            except IOError:
+                # Created meanwhile by another channel (parallel transfers share parents)
+                if not stat.S_ISDIR(self.sftp.stat(remote).st_mode or 0):
+                    raise
+
+    def copy(self, src, dst):
+        src_entry = self.stat(src)
+        with self.open(src, "rb") as fsrc, self.open(dst, "wb") as fdst:
+            _stream(fsrc, fdst)
+        self.set_mtime(dst, src_entry.mtime)
+
+    def rename(self, src, dst):
+        try:
+            self.sftp.posix_rename(_posix(src), _posix(dst))
+        except IOError:
+            # Servers without the posix-rename extension refuse to overwrite
+            if self.exists(dst):
+                self.remove(dst)
+            self.sftp.rename(_posix(src), _posix(dst))
+
+    def remove(self, path):
+        try:
+            self.sftp.remove(_posix(path))
+        except IOError as e:
+            raise _to_os_error(e, path)
+
+    def rmdir(self, path):
+        try:
+            self.sftp.rmdir(_posix(path))
+        except IOError as e:
+            raise _to_os_error(e, path)
+
+    def open(self, path, mode: str = "rb"):
+        try:
+            # paramiko only opens files for writing with "w", "a" or "+" in the mode
+            f = self.sftp.open(_posix(path), mode.replace("b", "").replace("x", "wx"))
+        except IOError as e:
+            # Servers report an exclusive create of an existing file as a generic failure
+            if "x" in mode and not isinstance(e, FileNotFoundError) and self.exists(path):
+                raise FileExistsError(errno.EEXIST, "File exists", str(path))
+            raise _to_os_error(e, path)
+        if "r" in mode:
+            f.prefetch()
+        else:
+            f.set_pipelined(True)
+        return f
+
+    def set_mtime(self, path, mtime: float):
+        self.sftp.utime(_posix(path), (mtime, mtime))
+
+
+def _to_os_error(e: IOError, path) -> OSError:
+    # paramiko raises FileNotFoundError for ENOENT already, other errors come as plain IOError
+    if isinstance(e, FileNotFoundError):
+        return e
+    if getattr(e, "errno", None) == errno.ENOENT:
+        return FileNotFoundError(errno.ENOENT, "No such file or directory", str(path))
+    return e
+
+
+# ======================== IN-MEMORY ========================
+
+class _MemFile:
+    __slots__ = ("data", "mtime")
+
+    def __init__(self, data: bytes = b"", mtime: float = None):
+        self.data = data
+        self.mtime = time.time() if mtime is None else mtime
+
+
+class _MemDir:
+    __slots__ = ("children", "mtime")
+
+    def __init__(self):
+        self.children = {}
+        self.mtime = time.time()
+
+
+class _MemWriter(BytesIO):
+    # Buffers writes and stores them in the file node on close
+    def __init__(self, fs: "MemoryFs", path, initial: bytes = b""):
+        super().__init__(initial)
+        self.seek(0, 2)
+        self._fs = fs
+        self._path = path
+
+    def close(self):
+        if not self.closed:
+            self._fs._store(self._path, self.getvalue())
+        super().close()
+
+
+class MemoryFs(FsBackend):
+    """
+    A show held entirely in memory. Used by the benchmarks to measure algorithmic
+    cost without any I/O, and by tools that want a scratch tree.
+    Folder mtimes are updated when entries are added or removed, like on disk.
+    """
+    name = "memory"
+
+    def __init__(self):
+        self.root = _MemDir()
+        self._lock = threading.RLock()
+
+    def _parts(self, path):
+        return [part for part in PurePosixPath(_posix(path)).parts if part not in ("/", "")]
+
+    def _node(self, path):
+        node = self.root
+        for part in self._parts(path):
+            if not isinstance(node, _MemDir) or part not in node.children:
+                raise FileNotFoundError(errno.ENOENT, "No such file or directory", str(path))
+            node = node.children[part]
+        return node
+
+    def _parent(self, path):
+        parts = self._parts(path)
+        if not parts:
+            raise FileExistsError(errno.EEXIST, "Root folder", str(path))
+        parent = self._node("/" + "/".join(parts[:-1]))
+        if not isinstance(parent, _MemDir):
+            raise NotADirectoryError(errno.ENOTDIR, "Not a folder", str(path))
+        return parent, parts[-1]
+
+    def scandir(self, path) -> List[FsEntry]:
+        with self._lock:
+            node = self._node(path)
+            if not isinstance(node, _MemDir):
+                raise NotADirectoryError(errno.ENOTDIR, "Not a folder", str(path))
+            return [self._entry(name, join(path, name), child) for name, child in node.children.items()]
+
+    def _entry(self, name, path, node) -> FsEntry:
+        if isinstance(node, _MemDir):
+            return FsEntry(name, path, True, 0, node.mtime)
+        return FsEntry(name, path, False, len(node.data), node.mtime)
+
+    def stat(self, path) -> FsEntry:
+        with self._lock:
+            parts = self._parts(path)
+            return self._entry(parts[-1] if parts else "", path, self._node(path))
+
+    def mkdir_many(self, paths: Iterable):
+        with self._lock:
+            for path in paths:
+                node = self.root
+                for part in self._parts(path):
+                    child = node.children.get(part)
+                    if child is None:
+                        child = node.children[part] = _MemDir()
+                        node.mtime = time.time()
+                    elif not isinstance(child, _MemDir):
+                        raise FileExistsError(errno.EEXIST, "Not a folder", str(path))
+                    node = child
+
+    def _store(self, path, data: bytes, mtime: float = None):
+        with self._lock:
+            parent, name = self._parent(path)
+            if isinstance(parent.children.get(name), _MemDir):
+                raise IsADirectoryError(errno.EISDIR, "Is a folder", str(path))
+            if name not in parent.children:
+                parent.mtime = time.time()
+            parent.children[name] = _MemFile(data, mtime)
+
+    def copy(self, src, dst):
+        with self._lock:
+            node = self._node(src)
+            if isinstance(node, _MemDir):
+                raise IsADirectoryError(errno.EISDIR, "Is a folder", str(src))
+            # bytes are immutable, so the copy can share them
+            self._store(dst, node.data, node.mtime)
+
+    def rename(self, src, dst):
+        with self._lock:
+            src_parent, src_name = self._parent(src)
+            if src_name not in src_parent.children:
+                raise FileNotFoundError(errno.ENOENT, "No such file or directory", str(src))
+            dst_parent, dst_name = self._parent(dst)
+            dst_parent.children[dst_name] = src_parent.children.pop(src_name)
+            src_parent.mtime = dst_parent.mtime = time.time()
+
+    def remove(self, path):
+        with self._lock:
+            parent, name = self._parent(path)
+            node = parent.children.get(name)
+            if node is None:
+                raise FileNotFoundError(errno.ENOENT, "No such file or directory", str(path))
+            if isinstance(node, _MemDir):
+                raise IsADirectoryError(errno.EISDIR, "Is a folder", str(path))
+            del parent.children[name]
+            parent.mtime = time.time()
+
+    def rmdir(self, path):
+        with self._lock:
+            parent, name = self._parent(path)
+            node = parent.children.get(name)
+            if node is None:
+                raise FileNotFoundError(errno.ENOENT, "No such file or directory", str(path))
+            if not isinstance(node, _MemDir):
+                raise NotADirectoryError(errno.ENOTDIR, "Not a folder", str(path))
+            if node.children:
+                raise OSError(errno.ENOTEMPTY, "Folder not empty", str(path))
+            del parent.children[name]
+            parent.mtime = time.time()
+
+    def rmtree(self, path):
+        with self._lock:
+            parent, name = self._parent(path)
+            if not isinstance(parent.children.get(name), _MemDir):
+                raise FileNotFoundError(errno.ENOENT, "No such folder", str(path))
+            del parent.children[name]
+            parent.mtime = time.time()
+
+    def open(self, path, mode: str = "rb"):
+        if "r" in mode:
+            node = self._node(path)
+            if isinstance(node, _MemDir):
+                raise IsADirectoryError(errno.EISDIR, "Is a folder", str(path))
+            return BytesIO(node.data)
+        initial = b""
+        with self._lock:
+            if "x" in mode and self.exists(path):
+                raise FileExistsError(errno.EEXIST, "File exists", str(path))
+            if "a" in mode and self.exists(path):
+                initial = self._node(path).data
+            # Create the (empty) file right away, like open() on disk
+            self._store(path, initial)
+        return _MemWriter(self, path, initial)
+
+    def set_mtime(self, path, mtime: float):
+        with self._lock:
+            self._node(path).mtime = mtime
+
+
+# ======================== BETWEEN BACKENDS ========================
+
+def _stream(fsrc, fdst, buffer_size: int = COPY_BUFFER_SIZE):
+    hook = chunk_hook()
+    while True:
+        chunk = fsrc.read(buffer_size)
+        if not chunk:
+            break
+        if hook is not None:
+            hook(len(chunk))
+        fdst.write(chunk)
+
+
+def copy_between(src_fs: FsBackend, src, dst_fs: FsBackend, dst):
+    """
+    Copy one file from src_fs to dst_fs (e.g., upload local -> SFTP), keeping its mtime.
+    Within a single backend this is the same as src_fs.copy(src, dst).
+    """
+    if src_fs is dst_fs:
+        src_fs.copy(src, dst)
+        return
+    src_entry = src_fs.stat(src)
+    with src_fs.open(src, "rb") as fsrc, dst_fs.open(dst, "wb") as fdst:
+        _stream(fsrc, fdst)
+    dst_fs.set_mtime(dst, src_entry.mtime)
@@ -0,0 +1,297 @@
+#Counts filesystem metadata calls (stat, mkdir, listdir, open...) per action
+#
+# On the NFS filer every metadata call is a network round trip, so the number of calls
+# matters more than CPU time. trace_fs_ops() temporarily wraps the os / builtins
+# functions that pathlib and shutil go through and counts every call.
+
+import builtins
+import datetime
+import functools
+import io
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from jade_api.profiling import wrap_gui_actions
+
+# Set JADE_FS_TRACE=1 to report metadata calls per GUI action,
+# JADE_FS_TRACE_LATENCY=<seconds> to add a simulated delay to every call
+FS_TRACE_ENV_VAR = "JADE_FS_TRACE"
+FS_TRACE_LATENCY_ENV_VAR = "JADE_FS_TRACE_LATENCY"
+
+# op name -> (module, attribute) that is wrapped while tracing.
+# pathlib (Path.stat/exists/is_dir/iterdir/mkdir/unlink/open), os.path and shutil all
+# look these up at call time, so wrapping the module attribute catches them.
+# The entries os.scandir returns are wrapped too, so their stat() calls are counted as "stat".
+TRACED_OPS = {
+    "stat": (os, "stat"),
+    "lstat": (os, "lstat"),
+    "mkdir": (os, "mkdir"),
+    "listdir": (os, "listdir"),
+    "scandir": (os, "scandir"),
+    "open": (builtins, "open"),
+    "io_open": (io, "open"),
+    "os_open": (os, "open"),
+    "unlink": (os, "unlink"),
+    "remove": (os, "remove"),
+    "rmdir": (os, "rmdir"),
+    "rename": (os, "rename"),
+    "replace": (os, "replace"),
+    "link": (os, "link"),
+    "symlink": (os, "symlink"),
+    "chmod": (os, "chmod"),
+    "utime": (os, "utime"),
+}
+
+# Reported under one name: every kind of open is "open", os.remove is "unlink"
+_OP_ALIASES = {"io_open": "open", "os_open": "open", "remove": "unlink"}
+
+
+class FsBudgetExceeded(Exception):
+    """Raised when a traced block makes more metadata calls than its budget allows."""
+
+
+class FsOpCounter:
+    """
+    Metadata call counts for one traced block.
+
+    Attributes:
+        action: Name of the traced action (e.g., "publish_asset")
+        counts: op name -> number of calls
+        latency: Simulated seconds added to every call
+    """
+
+    def __init__(self, action: str = "", latency: float = 0.0, thread: Optional[int] = None):
+        self.action = action
+        self.latency = latency
+        # Only calls made by this thread are counted (threading.get_ident()), every thread's when None
+        self.thread = thread
+        self.counts: Dict[str, int] = {}
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def add(self, op: str):
+        self.counts[op] = self.counts.get(op, 0) + 1
+
+    def report(self) -> str:
+        """One line summary: 'publish_asset: 14 ops (stat 9, open 2, mkdir 1, ...) in 0.012s'"""
+        details = ", ".join(f"{op} {count}" for op, count in sorted(self.counts.items(), key=lambda x: -x[1]))
+        return f"{self.action or 'trace'}: {self.total} ops ({details}) in {self.elapsed:.3f}s"
+
+
+# Active counters. Wrappers are installed while at least one trace is active.
+_active_counters: List[FsOpCounter] = []
+_originals: Dict[str, Callable] = {}
+_lock = threading.RLock()
+_local = threading.local()
+
+
+def _count(op: str):
+    # The busy flag stops the counting code itself from being counted if it touches the filesystem
+    if getattr(_local, "busy", False):
+        return
+    _local.busy = True
+    try:
+        latency = 0.0
+        thread = threading.get_ident()
+        with _lock:
+            for counter in _active_counters:
+                if counter.thread is None or counter.thread == thread:
+                    counter.add(op)
+                    latency = max(latency, counter.latency)
+        if latency:
+            time.sleep(latency)
+    finally:
+        _local.busy = False
+
+
+def _make_wrapper(op: str, original: Callable) -> Callable:
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        _count(op)
+        return original(*args, **kwargs)
+    return wrapper
+
+
+class _TracedDirEntry:
+    # os.DirEntry is implemented in C and cannot be patched, so scandir hands out this proxy instead.
+    # The entry caches its stat, so only the first stat() per follow_symlinks value is a call to the
+    # filesystem. is_dir()/is_file() come from the listing itself, except for a symlink they follow.
+    __slots__ = ("_entry", "_stat_done")
+
+    def __init__(self, entry: os.DirEntry):
+        self._entry = entry
+        self._stat_done = set()
+
+    def __getattr__(self, name):
+        return getattr(self._entry, name)
+
+    def __fspath__(self):
+        return self._entry.__fspath__()
+
+    def __repr__(self):
+        return repr(self._entry)
+
+    def _counted_stat(self, follow_symlinks: bool):
+        if follow_symlinks not in self._stat_done:
+            self._stat_done.add(follow_symlinks)
+            _count("stat")
+
+    def stat(self, *, follow_symlinks: bool = True):
+        self._counted_stat(follow_symlinks and self._entry.is_symlink())
+        return self._entry.stat(follow_symlinks=follow_symlinks)
+
+    def is_dir(self, *, follow_symlinks: bool = True):
+        if follow_symlinks and self._entry.is_symlink():
+            self._counted_stat(True)
+        return self._entry.is_dir(follow_symlinks=follow_symlinks)
+
+    def is_file(self, *, follow_symlinks: bool = True):
+        if follow_symlinks and self._entry.is_symlink():
+            self._counted_stat(True)
+        return self._entry.is_file(follow_symlinks=follow_symlinks)
+
+
+class _TracedScandir:
+    # Iterator and context manager, like the one os.scandir returns
+    def __init__(self, iterator):
+        self._iterator = iterator
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return _TracedDirEntry(next(self._iterator))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._iterator.close()
+
+
+def _make_scandir_wrapper(original: Callable) -> Callable:
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        _count("scandir")
+        return _TracedScandir(original(*args, **kwargs))
+    return wrapper
+
+
+def _install():
+    for key, (module, attr) in TRACED_OPS.items():
+        original = getattr(module, attr)
+        _originals[key] = original
+        if key == "scandir":
+            setattr(module, attr, _make_scandir_wrapper(original))
+        else:
+            setattr(module, attr, _make_wrapper(_OP_ALIASES.get(key, key), original))
+
+
+def _uninstall():
+    for key, (module, attr) in TRACED_OPS.items():
+        setattr(module, attr, _originals.pop(key))
+
+
+@contextmanager
+def trace_fs_ops(action: str = "", latency: float = 0.0, budget: Optional[int] = None,
+                 all_threads: bool = False):
+    """
+    Count filesystem metadata calls made inside the block.
+
+    Usage:
+        with trace_fs_ops("publish_asset", budget=20) as ops:
+            publish_asset(base_path, "char", "lion", "geo")
+        print(ops.report())
+
+    Args:
+        action: Name used in the report
+        latency: Simulated seconds added to every call (e.g., 0.002 for a busy NFS filer)
+        budget: Maximum total number of calls. FsBudgetExceeded is raised on exit if exceeded.
+        all_threads: Also count the calls of other threads (worker pools started by the block, but also
+            anything else the process runs meanwhile). By default only the calling thread is counted.
+
+    Traces can be nested.
+    """
+    counter = FsOpCounter(action, latency, None if all_threads else threading.get_ident())
+    with _lock:
+        if not _active_counters:
+            _install()
+        _active_counters.append(counter)
+    try:
+        yield counter
+    finally:
+        with _lock:
+            _active_counters.remove(counter)
+            if not _active_counters:
+                _uninstall()
+        counter.elapsed = time.perf_counter() - counter.started
+
+    if budget is not None and counter.total > budget:
+        raise FsBudgetExceeded(f"{counter.report()} exceeds the budget of {budget} metadata ops")
+
+
+def fs_tracing_enabled() -> bool:
+    """Return True if JADE_FS_TRACE is set."""
+    return os.environ.get(FS_TRACE_ENV_VAR, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def fs_traced(action_name: str, func: Callable, base_path_getter: Callable[[], Optional[Path]],
+              latency: float = 0.0) -> Callable:
+    """Wrap func so every call is traced and its report appended to <base_path>/.tools/fs_trace_log.txt"""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with trace_fs_ops(action_name, latency=latency) as counter:
+            result = func(*args, **kwargs)
+        _write_report(base_path_getter(), counter)
+        return result
+
+    return wrapper
+
+
+def _write_report(base_path: Optional[Path], counter: FsOpCounter):
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    line = f"[{timestamp}] {counter.report()}"
+    print(line)
+    if not base_path or not Path(base_path).is_dir():
+        return
+    try:
+        log_dir = Path(base_path) / ".tools"
+        log_dir.mkdir(exist_ok=True)
+        with open(log_dir / "fs_trace_log.txt", "a") as f:
+            f.write(line + "\n")
+    except Exception as e:
+        # Same rule as log_action: tracing must not crash the app
+        print(f"ERROR writing fs trace: {e}")
+
+
+def install_gui_fs_tracing(window, force: bool = False) -> bool:
+    """
+    Count metadata calls of every JADEGui action handler when JADE_FS_TRACE is set.
+    Reports go to stdout and <base folder>/.tools/fs_trace_log.txt.
+
+    Returns:
+        True if the hooks were installed.
+    """
+    if not (force or fs_tracing_enabled()):
+        return False
+
+    latency = float(os.environ.get(FS_TRACE_LATENCY_ENV_VAR, "0") or 0)
+
+    def base_path_getter():
+        return getattr(window, "base_path", None)
+
+    wrap_gui_actions(window, lambda action_name, func: fs_traced(action_name, func, base_path_getter, latency))
+    print("Filesystem tracing enabled: reports are written to <base folder>/.tools/fs_trace_log.txt")
+    return True
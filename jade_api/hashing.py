@@ -0,0 +1,318 @@
+#Streaming content hashes and the publish index that lets identical republishes be skipped
+#
+# .tools/publish_index/ maps every published file (relative to the base folder) to the source
+# it came from, with the source size, mtime and blake2b hash at publish time, one log per publish folder.
+# .tools/publish_history.jsonl lists every working file and folder ever published.
+
+import hashlib
+import json
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from jade_api.fs import FsBackend, FsEntry, chunk_hook, get_fs
+
+# Large reads keep hashing at disk / network speed on multi-GB USD layers
+HASH_BUFFER_SIZE = 8 * 1024 * 1024
+
+HASH_DIGEST_SIZE = 32
+
+PUBLISH_INDEX_DIR_NAME = "publish_index"
+INDEX_LOG_SUFFIX = ".jsonl"
+
+# Single index of older shows, still read for files without a record in their folder's log
+PUBLISH_INDEX_NAME = "publish_index.json"
+
+# A log is rewritten with only its current records once it has this many lines
+INDEX_COMPACT_LINES = 2000
+
+PUBLISH_HISTORY_NAME = "publish_history.jsonl"
+
+_INDEX_LOCKS: Dict[str, threading.Lock] = {}
+_INDEX_LOCKS_GUARD = threading.Lock()
+
+# Shows found without a single index: nothing writes one any more, so it is not looked for again
+_NO_LEGACY_INDEX: Set[str] = set()
+
+
+def new_hasher():
+    return hashlib.blake2b(digest_size=HASH_DIGEST_SIZE)
+
+
+def target_file_name(target: str, suffix: str) -> str:
+    """File name for a target folder: readable, plus a hash so different targets never share a name."""
+    digest = new_hasher()
+    digest.update(target.encode("utf-8"))
+    return f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', target)}-{digest.hexdigest()[:12]}{suffix}"
+
+
+def _read_chunks(f, buffer_size: int):
+    # Reuse one buffer when the file object supports readinto (local files, SFTP, memory).
+    # Callers size the buffer to the file so small files do not allocate HASH_BUFFER_SIZE.
+    # Every chunk is reported to the chunk hook of the thread (bandwidth metering of scheduled transfers).
+    hook = chunk_hook()
+    if hasattr(f, "readinto"):
+        buffer = bytearray(buffer_size)
+        view = memoryview(buffer)
+        while True:
+            count = f.readinto(buffer)
+            if not count:
+                return
+            if hook is not None:
+                hook(count)
+            yield view[:count]
+    else:
+        for chunk in iter(lambda: f.read(buffer_size), b""):
+            if hook is not None:
+                hook(len(chunk))
+            yield chunk
+
+
+def hash_file(path, fs: Optional[FsBackend] = None, buffer_size: int = HASH_BUFFER_SIZE) -> str:
+    """Hex blake2b digest of a file, read in buffer_size chunks."""
+    fs = get_fs(fs)
+    buffer_size = min(buffer_size, fs.stat(path).size + 1)
+    hasher = new_hasher()
+    with fs.open(path, "rb") as f:
+        for chunk in _read_chunks(f, buffer_size):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def copy_with_hash(src, dst, fs: Optional[FsBackend] = None, buffer_size: int = HASH_BUFFER_SIZE,
+                   source: Optional[FsEntry] = None, exclusive: bool = False) -> str:
+    """
+    Copy src to dst in a single read pass, hashing the data on the way. dst gets src's mtime.
+
+    Args:
+        source: Entry of src when the caller already has it (saves a stat)
+        exclusive: Create dst with 'xb': FileExistsError instead of writing through an existing file
+
+    Returns:
+        Hex blake2b digest of the copied data
+    """
+    fs = get_fs(fs)
+    source = source or fs.stat(src)
+    buffer_size = min(buffer_size, source.size + 1)
+    hasher = new_hasher()
+    with fs.open(src, "rb") as fsrc, fs.open(dst, "xb" if exclusive else "wb") as fdst:
+        for chunk in _read_chunks(fsrc, buffer_size):
+            hasher.update(chunk)
+            fdst.write(chunk)
+    fs.set_mtime(dst, source.mtime)
+    return hasher.hexdigest()
+
+
+class PublishIndex:
+    """
+    Records of what every published file was published from.
+
+    Each record: {"source": <relative source path>, "size": int, "mtime": float, "blake2b": hex,
+    "published_mtime": float}. published_mtime is the mtime the published file had when recorded
+    (the source mtime for copies, the object's mtime for links into the object store).
+
+    The records of each publish folder are a log of their own, .tools/publish_index/<folder>.jsonl, one
+    {"key", "record"} line per change (record null when forgotten); the last line of a key wins. A log is
+    only appended to by the publish holding the lease of its folder (see jade_api.locks), so publishes
+    on different machines never lose each other's records and a flush costs one append, whatever the
+    size of the show. Logs are read once per PublishIndex when first needed; recorded entries are kept
+    pending until flush() (or the end of a with block). The single .tools/publish_index.json of older
+    shows is still read for files without a record in their log.
+
+    A record whose source differs from the one it replaces is also appended to the publish history on
+    flush, so the source stays protected from retention after a later publish replaced it.
+    """
+
+    def __init__(self, base_path, fs: Optional[FsBackend] = None):
+        self.base_path = base_path
+        self.fs = get_fs(fs)
+        self.root = base_path / ".tools" / PUBLISH_INDEX_DIR_NAME
+        self.legacy_path = base_path / ".tools" / PUBLISH_INDEX_NAME
+        self._logs: Dict[str, Dict[str, Optional[dict]]] = {}
+        self._log_lines: Dict[str, int] = {}
+        self._legacy: Optional[Dict[str, dict]] = None
+        self._pending: Dict[str, Optional[dict]] = {}
+        self._published: List[Tuple[object, object]] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def log_path(self, target: str):
+        """Log of a publish folder (relative to the base folder)."""
+        return self.root / target_file_name(target, INDEX_LOG_SUFFIX)
+
+    def _read_log(self, path) -> Tuple[Dict[str, Optional[dict]], int]:
+        # ({key: record or None}, number of lines)
+        try:
+            lines = self.fs.read_bytes(path).decode("utf-8").splitlines()
+        except FileNotFoundError:
+            return {}, 0
+        records = {}
+        for line in lines:
+            if not line:
+                continue
+            try:
+                change = json.loads(line)
+                records[change["key"]] = change["record"]
+            except (ValueError, KeyError):
+                # Torn by a crash while appending
+                continue
+        return records, len(lines)
+
+    def _log(self, target: str) -> Dict[str, Optional[dict]]:
+        if target not in self._logs:
+            self._logs[target], self._log_lines[target] = self._read_log(self.log_path(target))
+        return self._logs[target]
+
+    def _legacy_records(self) -> Dict[str, dict]:
+        if self._legacy is None:
+            absent_key = f"{self.fs.name}:{self.legacy_path}"
+            try:
+                if absent_key in _NO_LEGACY_INDEX:
+                    raise FileNotFoundError(self.legacy_path)
+                self._legacy = json.loads(self.fs.read_bytes(self.legacy_path).decode("utf-8"))
+            except FileNotFoundError:
+                _NO_LEGACY_INDEX.add(absent_key)
+                self._legacy = {}
+            except ValueError as e:
+                print(f"WARNING: ignoring unreadable publish index {self.legacy_path}: {e}")
+                self._legacy = {}
+        return self._legacy
+
+    def key(self, path) -> str:
+        """Index key of a path inside the base folder: prod/asset/publish/char/lion/geo/lion_geo.usd"""
+        return path.relative_to(self.base_path).as_posix()
+
+    def get(self, published_path) -> Optional[dict]:
+        """Record of a published file, None if it was never recorded."""
+        key = self.key(published_path)
+        if key in self._pending:
+            return self._pending[key]
+        log = self._log(key.rsplit("/", 1)[0])
+        if key in log:
+            return log[key]
+        return self._legacy_records().get(key)
+
+    def records(self) -> Dict[str, dict]:
+        """Every record (index key -> record) of the show, pending changes included. Reads every log."""
+        records = dict(self._legacy_records())
+        try:
+            logs = self.fs.scandir(self.root)
+        except FileNotFoundError:
+            logs = []
+        for log in logs:
+            if log.name.endswith(INDEX_LOG_SUFFIX):
+                records.update(self._read_log(log.path)[0])
+        records.update(self._pending)
+        return {key: record for key, record in records.items() if record is not None}
+
+    def record(self, published_path, source_path, size: int, mtime: float, digest: str,
+               published_mtime: Optional[float] = None):
+        """Store (or replace) the record of a published file. Written on flush()."""
+        previous = self.get(published_path)
+        if previous is None or previous["source"] != self.key(source_path):
+            self._published.append((source_path, published_path))
+        self._pending[self.key(published_path)] = {
+            "source": self.key(source_path), "size": size, "mtime": mtime, "blake2b": digest,
+            "published_mtime": mtime if published_mtime is None else published_mtime,
+        }
+
+    def forget(self, published_path):
+        """Drop the record of a published file. Written on flush()."""
+        self._pending[self.key(published_path)] = None
+
+    def flush(self):
+        """Append the pending records to the logs of their publish folders (the caller holds their leases)."""
+        if self._published:
+            PublishHistory(self.base_path, self.fs).append_many(self._published)
+            self._published = []
+        if not self._pending:
+            return
+        changes: Dict[str, Dict[str, Optional[dict]]] = {}
+        for key, record in self._pending.items():
+            changes.setdefault(key.rsplit("/", 1)[0], {})[key] = record
+        for target, target_changes in changes.items():
+            # Every change starts on a new line, so a line torn by a crash never swallows the next one
+            data = b"".join(b"\n" + json.dumps({"key": key, "record": record}, sort_keys=True).encode("utf-8")
+                            for key, record in target_changes.items())
+            path = self.log_path(target)
+            with _index_lock(self.fs, path):
+                try:
+                    with self.fs.open(path, "ab") as f:
+                        f.write(data)
+                except FileNotFoundError:
+                    self.fs.mkdir_many([self.root])
+                    with self.fs.open(path, "ab") as f:
+                        f.write(data)
+                if target in self._logs:
+                    self._logs[target].update(target_changes)
+                    self._log_lines[target] += 2 * len(target_changes)
+                    if self._log_lines[target] > INDEX_COMPACT_LINES:
+                        self._compact(target)
+        self._pending = {}
+
+    def _compact(self, target: str):
+        # Rewrite a long log with only the last line of every key
+        records, _ = self._read_log(self.log_path(target))
+        data = b"".join(json.dumps({"key": key, "record": record}, sort_keys=True).encode("utf-8") + b"\n"
+                        for key, record in sorted(records.items()))
+        self.fs.write_bytes_atomic(self.log_path(target), data)
+        self._logs[target], self._log_lines[target] = records, len(records)
+
+
+def _index_lock(fs: FsBackend, path) -> threading.Lock:
+    # One lock per log, shared by every PublishIndex of this process (batch publishes run in threads)
+    with _INDEX_LOCKS_GUARD:
+        return _INDEX_LOCKS.setdefault(f"{fs.name}:{path}", threading.Lock())
+
+
+class PublishHistory:
+    """
+    Working files and folders ever published (file publishes through PublishIndex, tex folders, assembly
+    .textures and frame caches), one line per publish: {"source": <relative source>, "destination":
+    <relative published file or folder>, "published": float}. Lines are only ever appended, so a source
+    stays recorded after a later publish replaced it and retention never takes a version that was published.
+    """
+
+    def __init__(self, base_path, fs: Optional[FsBackend] = None):
+        self.base_path = base_path
+        self.fs = get_fs(fs)
+        self.path = base_path / ".tools" / PUBLISH_HISTORY_NAME
+
+    def append(self, source_folder, publish_folder):
+        """Record that source_folder is being published to publish_folder."""
+        self.append_many([(source_folder, publish_folder)])
+
+    def append_many(self, publishes: Iterable[Tuple[object, object]]):
+        """Record several (source, destination) publishes in one append."""
+        published = time.time()
+        data = b"".join(json.dumps({"source": source.relative_to(self.base_path).as_posix(),
+                                    "destination": destination.relative_to(self.base_path).as_posix(),
+                                    "published": published}).encode("utf-8") + b"\n"
+                        for source, destination in publishes)
+        try:
+            with self.fs.open(self.path, "ab") as f:
+                f.write(data)
+        except FileNotFoundError:
+            self.fs.mkdir_many([self.path.parent])
+            with self.fs.open(self.path, "ab") as f:
+                f.write(data)
+
+    def sources(self) -> Set[str]:
+        """Every source recorded, relative to the base folder."""
+        try:
+            lines = self.fs.read_bytes(self.path).decode("utf-8").splitlines()
+        except FileNotFoundError:
+            return set()
+        sources = set()
+        for line in lines:
+            try:
+                sources.add(json.loads(line)["source"])
+            except (ValueError, KeyError):
+                # Torn by a crash while appending
+                continue
+        return sources
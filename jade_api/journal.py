@@ -0,0 +1,199 @@
+#Write-ahead journal of multi-step publishes, so a crash midway is repaired without rescanning the show
+#
+# Before an asset publish touches its publish folder, every planned step is written to
+# <base>/.tools/journal/<id>.jsonl; each completed step appends one line and the journal is removed once
+# the publish finished. A journal left behind is an interrupted publish. Finding them only lists
+# .tools/journal, and repairing one only reads its own lines (see publish.recover_publishes).
+# What a step replaces is moved aside (renamed next to itself, recorded in the journal first) until the
+# publish finished, so an interrupted publish can be rolled back to the previous publish whole.
+# Every line is synced to disk before the step it describes runs.
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import List, Optional, Set
+
+from jade_api.fs import FsBackend, get_fs
+
+JOURNAL_DIR_NAME = "journal"
+JOURNAL_SUFFIX = ".jsonl"
+ASIDE_SUFFIX = ".aside"
+
+# A journal from another machine whose last step is older than this belongs to a crashed publish
+STALE_JOURNAL_SECONDS = 600
+
+# Journals of publishes running in this process, never recovered from under them
+_ACTIVE: Set[str] = set()
+_ACTIVE_GUARD = threading.Lock()
+
+
+def pid_alive(pid: int) -> bool:
+    """True if a process of this machine with that pid exists."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        # Exists but belongs to someone else, or the platform cannot tell (Windows)
+        return True
+    return True
+
+
+class JournalEntry:
+    """
+    Journal of one publish in progress.
+
+    Attributes:
+        journal_id: Name of the journal file (without suffix)
+        header: {"id", "host", "pid", "created", "target", "steps": [...]} as written by begin()
+        done: Indexes of the completed steps
+        asides: Paths moved aside so far, in order (see aside_path)
+    """
+
+    def __init__(self, journal: "PublishJournal", journal_id: str, header: dict, done: Optional[Set[int]] = None,
+                 asides: Optional[List[Path]] = None):
+        self.journal = journal
+        self.journal_id = journal_id
+        self.header = header
+        self.done: Set[int] = done if done is not None else set()
+        self.asides: List[Path] = asides if asides is not None else []
+
+    @property
+    def path(self) -> Path:
+        return self.journal.root / f"{self.journal_id}{JOURNAL_SUFFIX}"
+
+    @property
+    def steps(self) -> List[dict]:
+        return self.header["steps"]
+
+    def mark(self, step_index: int):
+        """Record that a step completed."""
+        self.done.add(step_index)
+        self._append({"done": step_index})
+
+    def aside_path(self, path) -> Path:
+        """Where path waits while moved aside: .<name>.<journal id>.aside in the same folder (a rename away)."""
+        return path.parent / f".{path.name}.{self.journal_id}{ASIDE_SUFFIX}"
+
+    def mark_aside(self, path):
+        """Record that path is about to be moved to aside_path(path), before it is."""
+        self.asides.append(path)
+        self._append({"aside": path.relative_to(self.journal.base_path).as_posix()})
+
+    def _append(self, line: dict):
+        with self.journal.fs.open(self.path, "ab") as f:
+            f.write(json.dumps(line).encode("utf-8") + b"\n")
+            self.journal.fs.sync(f)
+
+    def commit(self):
+        """The publish finished: drop the journal."""
+        try:
+            self.journal.fs.remove(self.path)
+        except FileNotFoundError:
+            pass
+        with _ACTIVE_GUARD:
+            _ACTIVE.discard(self.journal_id)
+
+    def abandon(self):
+        """The publish failed midway: keep the journal for recovery."""
+        with _ACTIVE_GUARD:
+            _ACTIVE.discard(self.journal_id)
+
+    def is_abandoned(self, mtime: float) -> bool:
+        """True when the publish that wrote this journal is no longer running."""
+        with _ACTIVE_GUARD:
+            if self.journal_id in _ACTIVE:
+                return False
+        if self.header.get("host") == socket.gethostname():
+            pid = self.header.get("pid")
+            return pid == os.getpid() or not pid_alive(pid)
+        return mtime < time.time() - STALE_JOURNAL_SECONDS
+
+
+class PublishJournal:
+    """The journal folder of a show."""
+
+    def __init__(self, base_path, fs: Optional[FsBackend] = None):
+        self.base_path = base_path
+        self.fs = get_fs(fs)
+        self.root = base_path / ".tools" / JOURNAL_DIR_NAME
+
+    def begin(self, target: str, steps: List[dict]) -> JournalEntry:
+        """
+        Write the journal of a publish before its first step runs.
+
+        Args:
+            target: What is published, for reports (e.g. the publish folder relative to the base folder)
+            steps: JSON-serializable description of every step, in execution order
+        """
+        journal_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        header = {"id": journal_id, "host": socket.gethostname(), "pid": os.getpid(),
+                  "created": time.time(), "target": target, "steps": steps}
+        entry = JournalEntry(self, journal_id, header)
+        with _ACTIVE_GUARD:
+            _ACTIVE.add(journal_id)
+        # The header is written before the publish folder changes. The id is new, so the file is created
+        # exclusively; a header torn by a crash right then belongs to a publish that changed nothing.
+        data = json.dumps(header).encode("utf-8") + b"\n"
+        try:
+            with self.fs.open(entry.path, "xb") as f:
+                f.write(data)
+                self.fs.sync(f)
+        except FileNotFoundError:
+            self.fs.mkdir_many([self.root])
+            with self.fs.open(entry.path, "xb") as f:
+                f.write(data)
+                self.fs.sync(f)
+        return entry
+
+    def pending(self, include_running: bool = False) -> List[JournalEntry]:
+        """
+        Journals of interrupted publishes, oldest first.
+
+        Args:
+            include_running: Also return journals of publishes that may still be running
+        """
+        try:
+            files = self.fs.scandir(self.root)
+        except FileNotFoundError:
+            return []
+        entries = []
+        for file_entry in sorted(files, key=lambda e: e.name):
+            if file_entry.is_dir or not file_entry.name.endswith(JOURNAL_SUFFIX):
+                continue
+            entry = self._read(file_entry.path)
+            if entry is None:
+                # Header torn by a crash before the first step: nothing to repair
+                if file_entry.mtime < time.time() - STALE_JOURNAL_SECONDS:
+                    try:
+                        self.fs.remove(file_entry.path)
+                    except FileNotFoundError:
+                        pass
+                continue
+            if include_running or entry.is_abandoned(file_entry.mtime):
+                entries.append(entry)
+        return entries
+
+    def _read(self, path) -> Optional[JournalEntry]:
+        lines = self.fs.read_bytes(path).decode("utf-8").splitlines()
+        try:
+            header = json.loads(lines[0])
+        except (IndexError, ValueError):
+            return None
+        done = set()
+        asides = []
+        for line in lines[1:]:
+            try:
+                mark = json.loads(line)
+            except ValueError:
+                # A mark torn by the crash: that step runs again
+                continue
+            if "aside" in mark:
+                asides.append(self.base_path / mark["aside"])
+            elif "done" in mark:
+                done.add(mark["done"])
+        return JournalEntry(self, header["id"], header, done, asides)
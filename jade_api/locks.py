@@ -0,0 +1,251 @@
+#Lease locks on publish targets, so two artists publishing the same department never interleave
+#
+# A publish holds a lease on its publish folder: <base>/.tools/locks/<target>.lock, created exclusively
+# (atomic on local disks, network shares and SFTP) and holding the owner, host, pid and a renewal count.
+# Publishes of other targets never wait for each other. A publish of the same target waits until the
+# lease is released, or until it expired: the holder renews its lease while it runs, and a waiter that
+# sees no renewal for a whole lease duration (on its own monotonic clock, so clocks of different machines
+# never have to agree) takes it over. On the same machine the lease of a dead process is taken over at once.
+# A holder that finds its lease gone stops: PublishLease.check() raises PublishLeaseLost between steps.
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Optional
+
+from jade_api.fs import FsBackend, get_fs
+from jade_api.hashing import target_file_name
+from jade_api.info import LocalUser
+from jade_api.journal import pid_alive
+
+LOCKS_DIR_NAME = "locks"
+LOCK_SUFFIX = ".lock"
+
+# Lease duration; the holder renews it every third of it
+LEASE_SECONDS = 60
+
+# How long a publish waits for a conflicting publish before giving up
+LOCK_WAIT_SECONDS = 600
+
+# Polling of a held lease, starting at the first interval and growing to the second
+LOCK_POLL_SECONDS = (0.2, 2.0)
+
+
+class PublishLockTimeout(TimeoutError):
+    """
+    Raised when a publish target stays locked by another publish.
+
+    Attributes:
+        target: Publish target (folder relative to the base folder)
+        holder: Lease of the publish holding it ({"owner", "host", "pid", "renewal", ...})
+    """
+
+    def __init__(self, target: str, holder: dict):
+        self.target = target
+        self.holder = holder
+        super().__init__(f"{target} is being published by {holder.get('owner', 'someone')} "
+                         f"on {holder.get('host', 'another machine')}, try again when it finished")
+
+
+class PublishLeaseLost(RuntimeError):
+    """
+    Raised by PublishLease.check() when the lease expired or was taken over while held.
+
+    Attributes:
+        target: Publish target (folder relative to the base folder)
+    """
+
+    def __init__(self, target: str):
+        self.target = target
+        super().__init__(f"The publish lock of {target} was lost (expired or taken over), the publish was stopped")
+
+
+def lock_name(target: str) -> str:
+    """Lock file name of a target: readable, plus a hash so different targets never share a name."""
+    return target_file_name(target, LOCK_SUFFIX)
+
+
+class PublishLease:
+    """
+    Lease on one publish target.
+
+    Usage:
+        with PublishLease(base_path, "prod/asset/publish/char/lion/geo", fs):
+            ...  # nobody else publishes char/lion/geo meanwhile
+    """
+
+    def __init__(self, base_path, target: str, fs: Optional[FsBackend] = None,
+                 timeout: Optional[float] = LOCK_WAIT_SECONDS, lease_seconds: float = LEASE_SECONDS):
+        """
+        Args:
+            base_path: Show base folder
+            target: Publish folder relative to the base folder
+            timeout: Seconds to wait for a conflicting publish (None waits forever, 0 does not wait)
+            lease_seconds: Lease duration, renewed while held
+        """
+        self.base_path = base_path
+        self.target = target
+        self.fs = get_fs(fs)
+        self.timeout = timeout
+        self.lease_seconds = lease_seconds
+        self.path = base_path / ".tools" / LOCKS_DIR_NAME / lock_name(target)
+        self.token: Optional[str] = None
+        self.renewal = 0
+        # Set when the lease was found expired or taken over while held
+        self.lost = threading.Event()
+        self._stop_renewing: Optional[threading.Event] = None
+        # Keeps a renewal from writing the lease back after release() removed it
+        self._renew_guard = threading.Lock()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def _lease(self) -> dict:
+        return {"token": self.token, "renewal": self.renewal, "lease_seconds": self.lease_seconds,
+                "target": self.target, "owner": LocalUser().user_id, "host": socket.gethostname(),
+                "pid": os.getpid()}
+
+    def check(self):
+        """
+        Raise if the lease was lost. Called between the steps of a publish.
+
+        Raises:
+            PublishLeaseLost: If the lease expired or was taken over by another publish
+        """
+        if self.lost.is_set():
+            raise PublishLeaseLost(self.target)
+
+    def acquire(self):
+        """
+        Take the lease, waiting for a conflicting publish to finish.
+
+        Raises:
+            PublishLockTimeout: If the target is still locked after the timeout
+        """
+        self.token = uuid.uuid4().hex
+        self.renewal = 0
+        self.lost.clear()
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        interval, max_interval = LOCK_POLL_SECONDS
+        # Lease last seen (every renewal changes it), and when it was first seen on this machine's clock
+        observed, observed_at = None, 0.0
+        while True:
+            try:
+                with self.fs.open(self.path, "xb") as f:
+                    f.write(json.dumps(self._lease()).encode("utf-8"))
+                break
+            except FileExistsError:
+                pass
+            except FileNotFoundError:
+                # First publish of the show: the locks folder is only created when missing
+                self.fs.mkdir_many([self.path.parent])
+                continue
+            holder = self.holder()
+            if holder is None:
+                continue
+            if holder != observed:
+                observed, observed_at = holder, time.monotonic()
+            if _is_stale(holder, time.monotonic() - observed_at, self.lease_seconds):
+                self._break(holder)
+                observed = None
+                continue
+            if deadline is not None and time.monotonic() + interval > deadline:
+                self.token = None
+                raise PublishLockTimeout(self.target, holder)
+            time.sleep(interval)
+            interval = min(interval * 2, max_interval)
+
+        self._stop_renewing = threading.Event()
+        threading.Thread(target=self._renew, args=(self._stop_renewing, time.monotonic()),
+                         name="jade-lease", daemon=True).start()
+
+    def release(self):
+        """Give the lease back (no-op if it is not held, or was lost)."""
+        with self._renew_guard:
+            if self._stop_renewing is not None:
+                self._stop_renewing.set()
+                self._stop_renewing = None
+            if self.token is None:
+                return
+            holder = self.holder()
+            if holder is not None and holder.get("token") == self.token:
+                try:
+                    self.fs.remove(self.path)
+                except FileNotFoundError:
+                    pass
+            self.token = None
+
+    def holder(self) -> Optional[dict]:
+        """Current lease of the target, None if it is free."""
+        try:
+            data = self.fs.read_bytes(self.path)
+        except FileNotFoundError:
+            return None
+        try:
+            return json.loads(data.decode("utf-8"))
+        except ValueError:
+            # Created but not written yet (or its writer crashed right then): expires like any lease
+            return {"token": None}
+
+    def _break(self, stale: dict):
+        # Move the stale lease aside under a unique name (atomic), then check it still was the stale one:
+        # another waiter may have broken it and taken the lease, or its holder renewed it, between our
+        # read and the rename.
+        aside = self.path.parent / f"{self.path.name}.{uuid.uuid4().hex}.stale"
+        try:
+            self.fs.rename(self.path, aside)
+        except FileNotFoundError:
+            return
+        moved = self.fs.read_bytes(aside)
+        self.fs.remove(aside)
+        try:
+            if json.loads(moved.decode("utf-8")) == stale:
+                return
+        except ValueError:
+            return
+        try:
+            with self.fs.open(self.path, "xb") as f:
+                f.write(moved)
+        except FileExistsError:
+            print(f"WARNING: publish lock of {self.target} was taken over twice, two publishes may overlap")
+
+    def _renew(self, stop: threading.Event, renewed_at: float):
+        while not stop.wait(self.lease_seconds / 3):
+            with self._renew_guard:
+                if stop.is_set():
+                    return
+                try:
+                    holder = self.holder()
+                    if holder is None or holder.get("token") != self.token:
+                        print(f"WARNING: publish lock of {self.target} was lost (expired or removed)")
+                        self.lost.set()
+                        return
+                    self.renewal += 1
+                    self.fs.write_bytes_atomic(self.path, json.dumps(self._lease()).encode("utf-8"))
+                    renewed_at = time.monotonic()
+                except OSError as e:
+                    print(f"WARNING: could not renew the publish lock of {self.target}: {e}")
+                    # Waiters take over a lease that was not renewed for its whole duration
+                    if time.monotonic() - renewed_at >= self.lease_seconds:
+                        self.lost.set()
+                        return
+
+
+def _is_stale(lease: dict, unchanged_seconds: float, lease_seconds: float) -> bool:
+    # unchanged_seconds: how long this waiter has seen the lease without a renewal, on its own clock
+    if lease.get("host") == socket.gethostname() and lease.get("pid") is not None and not pid_alive(lease["pid"]):
+        return True
+    return unchanged_seconds > lease.get("lease_seconds", lease_seconds)
+
+
+def publish_lock(base_path, publish_folder, fs: Optional[FsBackend] = None,
+                 timeout: Optional[float] = LOCK_WAIT_SECONDS) -> PublishLease:
+    """Lease on a publish folder (absolute, under the base folder), to use in a with block."""
+    return PublishLease(base_path, publish_folder.relative_to(base_path).as_posix(), fs, timeout=timeout)
@@ -0,0 +1,193 @@
+#Merkle hashes of show subtrees, so two copies of a show are compared folder by folder instead of file by file
+#
+# A file's hash is the blake2b of its content; a folder's hash covers the names, types and hashes of its
+# children. Two folders with the same hash hold the same tree, so a comparison only descends where hashes
+# differ. Hashes are cached in <base>/.tools/merkle_cache.json; a file is only read again when its size
+# or mtime changed. Run update() where the data lives (a remote show updates its own cache) and compare
+# the caches.
+
+import json
+from typing import Dict, List, Optional, Tuple
+
+from jade_api.fs import FsBackend, get_fs, join
+from jade_api.hashing import hash_file, new_hasher
+
+MERKLE_CACHE_NAME = "merkle_cache.json"
+
+# Subtree hashed by default: the pipeline data, not .tools or show-level clutter
+DEFAULT_ROOT = "prod"
+
+# Differences reported by compare_trees
+ADDED = "added"
+REMOVED = "removed"
+MODIFIED = "modified"
+
+
+def _folder_hash(children: Dict[str, list]) -> str:
+    # children: name -> ["d" | "f", hash]; sorted so listing order does not matter
+    hasher = new_hasher()
+    for name in sorted(children):
+        kind, digest = children[name]
+        hasher.update(f"{kind} {name} {digest}\n".encode("utf-8"))
+    return hasher.hexdigest()
+
+
+class MerkleTree:
+    """
+    Cached Merkle hashes of a show folder.
+
+    Cache records, keyed by path relative to the base folder:
+        files:   {"size": int, "mtime": float, "hash": hex}
+        folders: {"hash": hex, "children": {name: ["d" | "f", hash]}}
+    """
+
+    def __init__(self, base_path, fs: Optional[FsBackend] = None):
+        self.base_path = base_path
+        self.fs = get_fs(fs)
+        self.path = base_path / ".tools" / MERKLE_CACHE_NAME
+        self._records: Optional[Dict[str, dict]] = None
+        # Files read again by the last update(), for reports
+        self.hashed_files = 0
+
+    @property
+    def records(self) -> Dict[str, dict]:
+        if self._records is None:
+            try:
+                self._records = json.loads(self.fs.read_bytes(self.path).decode("utf-8"))
+            except FileNotFoundError:
+                self._records = {}
+            except ValueError as e:
+                print(f"WARNING: ignoring unreadable Merkle cache {self.path}: {e}")
+                self._records = {}
+        return self._records
+
+    def save(self):
+        self.fs.mkdir_many([self.path.parent])
+        self.fs.write_bytes_atomic(self.path, json.dumps(self.records, sort_keys=True).encode("utf-8"))
+
+    def hash_of(self, relative_path: str = DEFAULT_ROOT) -> Optional[str]:
+        """Cached hash of a file or folder (as of the last update), None if it is not in the cache."""
+        record = self.records.get(relative_path)
+        return record["hash"] if record else None
+
+    def update(self, relative_path: str = DEFAULT_ROOT, save: bool = True) -> str:
+        """
+        Bring the cached hashes of a subtree up to date.
+
+        Every folder of the subtree is listed; only files whose size or mtime changed are read.
+
+        Args:
+            relative_path: Subtree relative to the base folder ("prod", "prod/asset/publish/char")
+            save: Write the cache file afterwards
+
+        Returns:
+            Hash of the subtree
+
+        Raises:
+            FileNotFoundError: If the subtree does not exist
+        """
+        self.hashed_files = 0
+        records = self.records
+        seen = set()
+        digest = self._update_folder(relative_path, records, seen)
+
+        # Drop records of files and folders that were deleted inside the subtree
+        prefix = relative_path + "/"
+        for key in [key for key in records if key.startswith(prefix) and key not in seen]:
+            del records[key]
+
+        # Cached ancestors embed the subtree hash
+        child_path = relative_path
+        while "/" in child_path:
+            parent_path, name = child_path.rsplit("/", 1)
+            parent = records.get(parent_path)
+            if parent is None:
+                break
+            parent["children"][name] = ["d", records[child_path]["hash"]]
+            parent["hash"] = _folder_hash(parent["children"])
+            child_path = parent_path
+        if save:
+            self.save()
+        return digest
+
+    def _update_folder(self, relative_path: str, records: Dict[str, dict], seen: set) -> str:
+        children = {}
+        for entry in self.fs.scandir(self._absolute(relative_path)):
+            child_path = f"{relative_path}/{entry.name}"
+            if entry.is_dir:
+                children[entry.name] = ["d", self._update_folder(child_path, records, seen)]
+                continue
+            record = records.get(child_path)
+            if record is None or (record["size"], record["mtime"]) != (entry.size, entry.mtime):
+                record = {"size": entry.size, "mtime": entry.mtime, "hash": hash_file(entry.path, self.fs)}
+                records[child_path] = record
+                self.hashed_files += 1
+            seen.add(child_path)
+            children[entry.name] = ["f", record["hash"]]
+
+        digest = _folder_hash(children)
+        records[relative_path] = {"hash": digest, "children": children}
+        seen.add(relative_path)
+        return digest
+
+    def _absolute(self, relative_path: str):
+        path = self.base_path
+        for name in relative_path.split("/"):
+            path = join(path, name)
+        return path
+
+    def children(self, relative_path: str) -> Dict[str, Tuple[str, str]]:
+        """Cached children of a folder: name -> ("d" | "f", hash). Empty for files and unknown paths."""
+        record = self.records.get(relative_path)
+        if not record or "children" not in record:
+            return {}
+        return {name: (kind, digest) for name, (kind, digest) in record["children"].items()}
+
+
+def compare_trees(left: MerkleTree, right: MerkleTree, relative_path: str = DEFAULT_ROOT
+                  ) -> List[Tuple[str, str]]:
+    """
+    Differences between two cached trees, descending only into folders whose hashes differ.
+
+    Both caches are used as they are; call update() on each side first if they may be out of date.
+
+    Args:
+        left: Reference tree (e.g. the local show)
+        right: Tree compared to it (e.g. the mirror)
+        relative_path: Subtree to compare
+
+    Returns:
+        Sorted (relative path, ADDED | REMOVED | MODIFIED) from left to right. A folder that exists on
+        one side only is reported once, not file by file. Empty when the trees match.
+    """
+    left_hash, right_hash = left.hash_of(relative_path), right.hash_of(relative_path)
+    if left_hash == right_hash:
+        return []
+    if left_hash is None:
+        return [(relative_path, ADDED)]
+    if right_hash is None:
+        return [(relative_path, REMOVED)]
+
+    differences = []
+    pending = [relative_path]
+    while pending:
+        folder = pending.pop()
+        left_children, right_children = left.children(folder), right.children(folder)
+        if not left_children and not right_children:
+            # A file on both sides (or a folder/file swap) with different hashes
+            differences.append((folder, MODIFIED))
+            continue
+        for name in left_children.keys() | right_children.keys():
+            path = f"{folder}/{name}"
+            left_child, right_child = left_children.get(name), right_children.get(name)
+            if left_child == right_child:
+                continue
+            if right_child is None:
+                differences.append((path, REMOVED))
+            elif left_child is None:
+                differences.append((path, ADDED))
+            elif left_child[0] == right_child[0] == "d":
+                pending.append(path)
+            else:
+                differences.append((path, MODIFIED))
+    return sorted(differences)
@@ -0,0 +1,121 @@
+#Speculative asset publish planning: plans are resolved in the background when the selection changes
+#
+# Resolving a publish (listing export folders, picking versions, checking the publish index) is most of
+# the wait after a click. PublishPlanner resolves the plan of the current selection on a background thread
+# and keeps it until one of the folders or files it was resolved from changes (a few stats, see
+# AssetPublishPlan.is_current), so the click only runs the precomputed plan.
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from jade_api.fs import FsBackend, get_fs
+from jade_api.publish import AssetPublishPlan, plan_asset_publish
+
+# (fs name, base folder, asset type key, asset name, department)
+PlanKey = Tuple[str, str, str, str, str]
+
+
+class PlanCache:
+    """Plans by selection, dropped once they are no longer current."""
+
+    def __init__(self):
+        self._plans: Dict[PlanKey, AssetPublishPlan] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: PlanKey, fs: FsBackend) -> Optional[AssetPublishPlan]:
+        with self._lock:
+            plan = self._plans.get(key)
+        if plan is None:
+            return None
+        if not plan.is_current(fs):
+            with self._lock:
+                if self._plans.get(key) is plan:
+                    del self._plans[key]
+            return None
+        return plan
+
+    def put(self, key: PlanKey, plan: AssetPublishPlan):
+        with self._lock:
+            self._plans[key] = plan
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+
+
+class PublishPlanner:
+    """
+    Resolves asset publish plans ahead of the click.
+
+    Usage:
+        planner = PublishPlanner()
+        future = planner.request(base_path, "char", "lion", "geo", fs)   # on selection change
+        ...
+        plan = planner.plan(base_path, "char", "lion", "geo", fs)        # on click
+        execute_asset_plan(plan, fs)
+    """
+
+    def __init__(self):
+        self.cache = PlanCache()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jade-plan")
+        self._futures: Dict[PlanKey, Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(base_path: Path, asset_type_key: str, asset_name: str, department: str,
+            fs: Optional[FsBackend] = None) -> PlanKey:
+        return get_fs(fs).name, str(base_path), asset_type_key, asset_name, department
+
+    def _resolve(self, key: PlanKey, base_path: Path, asset_type_key: str, asset_name: str, department: str,
+                 fs: FsBackend) -> AssetPublishPlan:
+        plan = self.cache.get(key, fs)
+        if plan is None:
+            plan = plan_asset_publish(base_path, asset_type_key, asset_name, department, fs=fs)
+            self.cache.put(key, plan)
+        return plan
+
+    def request(self, base_path: Path, asset_type_key: str, asset_name: str, department: str,
+                fs: Optional[FsBackend] = None) -> Future:
+        """
+        Resolve (or check the cached) plan of a selection in the background.
+
+        Returns:
+            Future of the AssetPublishPlan. Raises ValueError for departments without publish logic.
+        """
+        fs = get_fs(fs)
+        key = self.key(base_path, asset_type_key, asset_name, department, fs)
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None and not future.done():
+                return future
+            future = self._executor.submit(self._resolve, key, base_path, asset_type_key, asset_name, department, fs)
+            self._futures[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def _forget(self, key: PlanKey, future: Future):
+        with self._lock:
+            if self._futures.get(key) is future:
+                del self._futures[key]
+
+    def plan(self, base_path: Path, asset_type_key: str, asset_name: str, department: str,
+             fs: Optional[FsBackend] = None) -> AssetPublishPlan:
+        """
+        Plan of a selection for running now: the cached plan if still current, the background
+        resolution if one is running, else resolved here.
+
+        Raises:
+            ValueError: If there is no publish logic for the department
+        """
+        fs = get_fs(fs)
+        key = self.key(base_path, asset_type_key, asset_name, department, fs)
+        with self._lock:
+            future = self._futures.get(key)
+        if future is not None:
+            future.result()
+        return self._resolve(key, base_path, asset_type_key, asset_name, department, fs)
+
+    def stop(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,451 @@
+#Pointer publishes (JADE_PUBLISH_MODE=pointer): versions are kept, the published name points at one
+#
+# In pointer mode a publish no longer overwrites publish/.../lion_geo.usd. The version is written once to
+# publish/.../.versions/<version>/lion_geo.usd and lion_geo.usd is atomically repointed to it: a relative
+# symlink where the filesystem has them, a hardlink otherwise (a copy on backends without links, SFTP).
+# .versions/pointers.json records every version of every published file and the current one, so going
+# back to an older version is also a repoint, whatever the file size, and older publishes stay available.
+# A folder publish (tex folder, assembly .textures, frame cache) is pointed the same way, as a whole: the
+# version folder is kept as .versions/<folder name>/<source folder name>/ next to the publish folder, with
+# its own pointers.json, and the publish folder itself becomes a relative symlink to it (a copy where
+# symlinks are not available). Switching versions is one rename, whatever the number of files.
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from jade_api.fs import FsBackend, get_fs
+from jade_api.hashing import PublishIndex, copy_with_hash, hash_file
+from jade_api.locks import publish_lock
+from jade_api.store import ObjectStore
+
+PUBLISH_MODE_ENV_VAR = "JADE_PUBLISH_MODE"
+POINTER_MODE = "pointer"
+
+# Hidden, so syncs and checkouts (which skip dot folders) only move the current versions
+VERSIONS_DIR_NAME = ".versions"
+POINTER_MANIFEST_NAME = "pointers.json"
+
+# Version files being written, renamed into place once complete
+VERSION_PARTIAL_SUFFIX = ".jade-version.tmp"
+
+# Manifest key of the folder publish of a publish folder. Not a valid file name, so never a published file.
+FOLDER_RECORD = "/"
+
+
+def pointer_mode_enabled() -> bool:
+    """Return True if pointer publishes were requested through JADE_PUBLISH_MODE."""
+    return os.environ.get(PUBLISH_MODE_ENV_VAR, "").strip().lower() == POINTER_MODE
+
+
+class PointerManifest:
+    """
+    Versions of the files of one publish folder: .versions/pointers.json
+
+    {"lion_geo.usd": {"current": "v003_ab",
+                      "versions": {"v003_ab": {"source": <relative source path>, "size": int, "mtime": float,
+                                               "blake2b": hex, "published": float}, ...}}}
+
+    The manifest of a folder publish (folder_manifest()) holds a single "/" record (FOLDER_RECORD):
+    {"/": {"current": "lion_tex_v003_ab",
+           "versions": {"lion_tex_v003_ab": {"source": <relative source folder>, "size": int,
+                                             "files": {published name: size}, "published": float}, ...}}}
+    Only written by publishes and rollbacks holding the publish lock of the folder.
+    """
+
+    def __init__(self, publish_dir, fs: Optional[FsBackend] = None, path=None):
+        """
+        Args:
+            publish_dir: Publish folder of the files
+            path: Manifest file, publish_dir/.versions/pointers.json when None
+        """
+        self.publish_dir = publish_dir
+        self.fs = get_fs(fs)
+        self.path = path or publish_dir / VERSIONS_DIR_NAME / POINTER_MANIFEST_NAME
+
+    def load(self) -> Dict[str, dict]:
+        try:
+            return json.loads(self.fs.read_bytes(self.path).decode("utf-8"))
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            print(f"WARNING: ignoring unreadable pointer manifest {self.path}: {e}")
+            return {}
+
+    def save(self, records: Dict[str, dict]):
+        self.fs.mkdir_many([self.path.parent])
+        self.fs.write_bytes_atomic(self.path, json.dumps(records, indent=1, sort_keys=True).encode("utf-8"))
+
+
+def version_path(destination, version: str):
+    """Where a version of a published file is kept: publish/.../.versions/<version>/<file name>"""
+    return destination.parent / VERSIONS_DIR_NAME / version / destination.name
+
+
+def unpublish(path, fs: Optional[FsBackend] = None):
+    """Remove a published name: a pointer, or a file or folder published by copy. Missing is fine."""
+    fs = get_fs(fs)
+    try:
+        fs.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        if not fs.is_dir(path):
+            raise
+        fs.rmtree(path)
+
+
+def _replace(fs: FsBackend, tmp_path, destination):
+    try:
+        fs.rename(tmp_path, destination)
+    except OSError:
+        # A folder published by copy before pointer mode: a rename cannot replace it
+        if not fs.is_dir(destination):
+            raise
+        fs.rmtree(destination)
+        fs.rename(tmp_path, destination)
+
+
+def repoint(destination, version_file, fs: Optional[FsBackend] = None):
+    """
+    Atomically make destination the version_file (readers see the old or the new version, never none).
+    """
+    fs = get_fs(fs)
+    tmp_path = destination.parent / f".{destination.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    unpublish(tmp_path, fs)
+    if fs.supports_symlinks:
+        try:
+            fs.symlink(Path(version_file).relative_to(destination.parent).as_posix(), tmp_path)
+            _replace(fs, tmp_path, destination)
+            return
+        except OSError:
+            # Windows without the symlink privilege, or a share that refuses them: hardlink instead
+            unpublish(tmp_path, fs)
+    fs.link(version_file, tmp_path)
+    _replace(fs, tmp_path, destination)
+
+
+def publish_version(base_path, source, destination, version: str, fs: Optional[FsBackend] = None,
+                    store: Optional[ObjectStore] = None, digest: Optional[str] = None,
+                    move_aside: Optional[Callable] = None) -> str:
+    """
+    Keep source as a version of destination and point destination at it.
+
+    Args:
+        base_path: Show base folder
+        source: Working file to publish
+        destination: Published name (publish/.../lion_geo.usd)
+        version: Version name, usually from the source file name ("v003_ab"). If that version already
+            holds different content (the working file was overwritten), "v003_ab-2" and so on are used.
+        store: Object store of the show (JADE_CAS): the version links to the stored content
+        digest: blake2b of source when already known
+        move_aside: Called with destination before it is replaced when it is not a kept version (a file
+            published by copy), instead of the repoint renaming over it; kept versions are pointed back at
+
+    Returns:
+        blake2b of the published content
+    """
+    fs = get_fs(fs)
+    source_entry = fs.stat(source)
+    manifest = PointerManifest(destination.parent, fs)
+    records = manifest.load()
+    versions = records.setdefault(destination.name, {"current": None, "versions": {}})["versions"]
+
+    name = version
+    suffix = 1
+    while True:
+        recorded = versions.get(name)
+        if recorded is None and not fs.exists(version_path(destination, name)):
+            break
+        if recorded is not None:
+            digest = digest or hash_file(source, fs)
+            if recorded["blake2b"] == digest:
+                break
+        suffix += 1
+        name = f"{version}-{suffix}"
+
+    version_file = version_path(destination, name)
+    if name not in versions:
+        fs.mkdir_many([version_file.parent])
+        if store is not None:
+            digest, _ = store.publish(source, version_file, digest)
+        else:
+            partial = version_file.parent / f".{version_file.name}{VERSION_PARTIAL_SUFFIX}"
+            digest = copy_with_hash(source, partial, fs)
+            fs.rename(partial, version_file)
+        versions[name] = {"source": Path(source).relative_to(base_path).as_posix(), "size": source_entry.size,
+                          "mtime": source_entry.mtime, "blake2b": digest, "published": time.time()}
+
+    if move_aside is not None and records[destination.name]["current"] is None:
+        move_aside(destination)
+    repoint(destination, version_file, fs)
+    records[destination.name]["current"] = name
+    manifest.save(records)
+    return versions[name]["blake2b"]
+
+
+def restore_version(destination, digest: str, fs: Optional[FsBackend] = None) -> bool:
+    """
+    Point a published file back at its kept version with that content (rolling back an interrupted publish).
+
+    Returns:
+        False if no kept version of destination has that content
+    """
+    fs = get_fs(fs)
+    manifest = PointerManifest(destination.parent, fs)
+    records = manifest.load()
+    record = records.get(destination.name)
+    if record is None:
+        return False
+    for name, info in record["versions"].items():
+        if info["blake2b"] == digest:
+            repoint(destination, version_path(destination, name), fs)
+            record["current"] = name
+            manifest.save(records)
+            return True
+    return False
+
+
+def detach_file(destination, fs: Optional[FsBackend] = None):
+    """Record that a published file no longer points at a kept version (removed, or published by copy)."""
+    fs = get_fs(fs)
+    manifest = PointerManifest(destination.parent, fs)
+    records = manifest.load()
+    record = records.get(destination.name)
+    if record is not None and record["current"] is not None:
+        record["current"] = None
+        manifest.save(records)
+
+
+def folder_versions_root(publish_dir):
+    """Where the versions of a folder publish are kept: publish/.../.versions/<folder name>/"""
+    return publish_dir.parent / VERSIONS_DIR_NAME / publish_dir.name
+
+
+def folder_version_dir(publish_dir, version: str):
+    """Where a version of a folder publish is kept: publish/.../.versions/<folder name>/<version>/"""
+    return folder_versions_root(publish_dir) / version
+
+
+def folder_manifest(publish_dir, fs: Optional[FsBackend] = None) -> PointerManifest:
+    """Manifest of a folder publish: publish/.../.versions/<folder name>/pointers.json"""
+    return PointerManifest(publish_dir, fs, folder_versions_root(publish_dir) / POINTER_MANIFEST_NAME)
+
+
+def _previous_dir(publish_dir):
+    # A real publish folder replaced by a switch waits here until the switch is recorded.
+    # Not a valid version name (versions are named after source folders).
+    return folder_versions_root(publish_dir) / ".previous"
+
+
+def folder_version(publish_dir, version: str, files: Dict[str, int],
+                   fs: Optional[FsBackend] = None) -> Tuple[str, bool]:
+    """
+    Version name for a folder publish, before anything is written.
+
+    Args:
+        publish_dir: Publish folder
+        version: Version name, the name of the source folder ("lion_tex_v003_ab")
+        files: {published name: size} the version will hold
+
+    Returns:
+        (version name, True if that version is already kept with the same files and only needs a switch).
+        A version name already holding other files (the working folder was changed) gets "-2" and so on.
+    """
+    fs = get_fs(fs)
+    versions = folder_manifest(publish_dir, fs).load().get(FOLDER_RECORD, {}).get("versions", {})
+    name = version
+    suffix = 1
+    while True:
+        recorded = versions.get(name)
+        if recorded is not None and recorded["files"] == files:
+            return name, True
+        if recorded is None and not fs.exists(folder_version_dir(publish_dir, name)):
+            return name, False
+        suffix += 1
+        name = f"{version}-{suffix}"
+
+
+def _switch_folder(publish_dir, version_dir, fs: FsBackend):
+    # Make publish_dir the version folder with one rename: a symlink replaces the previous symlink
+    # atomically. A real folder in the way (published by copy, or a copy of a version where symlinks are not
+    # available) is renamed to _previous_dir() first, so it can be put back until the switch is recorded.
+    tmp_path = publish_dir.parent / f".{publish_dir.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    unpublish(tmp_path, fs)
+    linked = False
+    if fs.supports_symlinks:
+        try:
+            fs.symlink(Path(version_dir).relative_to(publish_dir.parent).as_posix(), tmp_path)
+            linked = True
+        except OSError:
+            # Windows without the symlink privilege, or a share that refuses them
+            unpublish(tmp_path, fs)
+    if not linked:
+        fs.copytree(version_dir, tmp_path)
+    try:
+        fs.rename(tmp_path, publish_dir)
+    except OSError:
+        if not fs.is_dir(publish_dir):
+            raise
+        previous = _previous_dir(publish_dir)
+        unpublish(previous, fs)
+        fs.rename(publish_dir, previous)
+        fs.rename(tmp_path, publish_dir)
+
+
+def _point_folder(publish_dir, manifest: PointerManifest, records: Dict[str, dict], version: str, fs: FsBackend):
+    # Switch the publish folder to a kept version, then record it; the folder it replaced goes last
+    _switch_folder(publish_dir, folder_version_dir(publish_dir, version), fs)
+    records[FOLDER_RECORD]["current"] = version
+    manifest.save(records)
+    unpublish(_previous_dir(publish_dir), fs)
+
+
+def publish_folder_version(base_path, source_folder, publish_dir, version: str, fs: Optional[FsBackend] = None):
+    """
+    Point a publish folder at a folder version written to folder_version_dir() and record it.
+
+    Args:
+        base_path: Show base folder
+        source_folder: Working version folder the version was published from
+        publish_dir: Publish folder
+        version: Name from folder_version()
+    """
+    fs = get_fs(fs)
+    manifest = folder_manifest(publish_dir, fs)
+    records = manifest.load()
+    record = records.setdefault(FOLDER_RECORD, {"current": None, "versions": {}})
+    if version not in record["versions"]:
+        files = {entry.name: entry.size for entry in fs.scandir(folder_version_dir(publish_dir, version))}
+        record["versions"][version] = {"source": Path(source_folder).relative_to(base_path).as_posix(),
+                                       "size": sum(files.values()), "files": files, "published": time.time()}
+    _point_folder(publish_dir, manifest, records, version, fs)
+
+
+def folder_current(publish_dir, fs: Optional[FsBackend] = None) -> Optional[str]:
+    """Version a publish folder points at, None when it does not point at a kept version."""
+    return folder_manifest(publish_dir, fs).load().get(FOLDER_RECORD, {}).get("current")
+
+
+def restore_folder(publish_dir, version: str, previous: Optional[str], fs: Optional[FsBackend] = None):
+    """
+    Roll a publish folder back from an interrupted publish of version: it points at previous again, the
+    version it pointed at before. A version that was never recorded is removed.
+
+    Args:
+        previous: folder_current() before the publish. When None the folder did not point at a kept version,
+            and whatever was there before was moved aside by the publish (the caller puts it back): the
+            folder is removed.
+    """
+    fs = get_fs(fs)
+    manifest = folder_manifest(publish_dir, fs)
+    records = manifest.load()
+    record = records.setdefault(FOLDER_RECORD, {"current": None, "versions": {}})
+    aside = _previous_dir(publish_dir)
+    if fs.exists(aside):
+        # A switch that had to move a copy of the previous version out of the way
+        unpublish(publish_dir, fs)
+        fs.rename(aside, publish_dir)
+    elif previous is not None:
+        _switch_folder(publish_dir, folder_version_dir(publish_dir, previous), fs)
+    else:
+        unpublish(publish_dir, fs)
+    if record["current"] != previous:
+        record["current"] = previous
+        manifest.save(records)
+    discard_folder_version(publish_dir, version, fs, records)
+
+
+def discard_folder_version(publish_dir, version: str, fs: Optional[FsBackend] = None,
+                           records: Optional[Dict[str, dict]] = None):
+    """Remove the folder of a version an interrupted publish wrote but never recorded (recorded ones stay)."""
+    fs = get_fs(fs)
+    if records is None:
+        records = folder_manifest(publish_dir, fs).load()
+    if version not in records.get(FOLDER_RECORD, {}).get("versions", {}):
+        unpublish(folder_version_dir(publish_dir, version), fs)
+
+
+def detach_folder(publish_dir, fs: Optional[FsBackend] = None) -> bool:
+    """
+    Record that a publish folder no longer points at a kept version: it is replaced by a publish by copy.
+    The versions stay kept.
+
+    Returns:
+        True if the folder pointed at a version. A copy must not write into it: the folder is replaced first.
+    """
+    fs = get_fs(fs)
+    manifest = folder_manifest(publish_dir, fs)
+    records = manifest.load()
+    record = records.get(FOLDER_RECORD)
+    if record is None or record["current"] is None:
+        return False
+    record["current"] = None
+    manifest.save(records)
+    return True
+
+
+def _versions_record(destination, fs: FsBackend) -> Tuple[Optional[dict], bool]:
+    # (manifest record of a published file, or of the folder publish of a publish folder, is a folder)
+    record = PointerManifest(destination.parent, fs).load().get(destination.name)
+    if record is None and fs.is_dir(destination):
+        return folder_manifest(destination, fs).load().get(FOLDER_RECORD), True
+    return record, False
+
+
+def publish_versions(destination, fs: Optional[FsBackend] = None) -> List[Tuple[str, dict, bool]]:
+    """
+    Versions kept for a published file, or for the folder publish of a publish folder, oldest first.
+
+    Returns:
+        [(version, {"source", "size", "published", ...}, is current), ...]
+    """
+    record, _ = _versions_record(destination, get_fs(fs))
+    if record is None:
+        return []
+    versions = sorted(record["versions"].items(), key=lambda item: item[1]["published"])
+    return [(name, info, name == record["current"]) for name, info in versions]
+
+
+def rollback_publish(base_path, destination, version: str, fs: Optional[FsBackend] = None):
+    """
+    Point a published file, or a publish folder holding a folder publish, back at one of its kept
+    versions (or forward again).
+
+    Args:
+        base_path: Show base folder
+        destination: Published name (publish/.../lion_geo.usd) or publish folder (publish/.../tex)
+        version: A version listed by publish_versions()
+
+    Raises:
+        KeyError: If the version was never published
+        PublishLockTimeout: If the folder is being published
+    """
+    fs = get_fs(fs)
+    _, is_folder = _versions_record(destination, fs)
+    if is_folder:
+        with publish_lock(base_path, destination, fs):
+            manifest = folder_manifest(destination, fs)
+            records = manifest.load()
+            record = records.get(FOLDER_RECORD)
+            if record is None or version not in record["versions"]:
+                raise KeyError(f"No version {version} of {destination}")
+            _point_folder(destination, manifest, records, version, fs)
+        return
+    with publish_lock(base_path, destination.parent, fs):
+        manifest = PointerManifest(destination.parent, fs)
+        records = manifest.load()
+        record = records.get(destination.name)
+        if record is None or version not in record["versions"]:
+            raise KeyError(f"No version {version} of {destination}")
+        info = record["versions"][version]
+        repoint(destination, version_path(destination, version), fs)
+        record["current"] = version
+        manifest.save(records)
+        # The publish index describes the current version, so the next publish compares against it
+        with PublishIndex(base_path, fs) as index:
+            index.record(destination, base_path / info["source"], info["size"], info["mtime"], info["blake2b"],
+                         fs.stat(destination).mtime)
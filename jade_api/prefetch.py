@@ -0,0 +1,151 @@
+#Background prefetch of the selected shot: its version index, publish tree and the asset publishes it uses
+#
+# Selecting a shot in a form says which publishes the artist will probably open next. ShotPrefetcher warms
+# the catalog listings (export versions of every department, the shot's publish/ tree and the referenced
+# asset publishes) and, in remote mode, downloads those publishes into the RemoteCache and pins them.
+# One low priority thread does the work; selecting another shot cancels the previous prefetch.
+
+import os
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+from jade_api.batch import resolve_shot_publishes
+from jade_api.cache import RemoteCache
+from jade_api.catalog import ShowCatalog
+from jade_api.checkout import REFERENCING_EXTENSIONS, asset_publish_root, find_asset_references, shot_publish_root
+from jade_api.fs import LOCAL_FS
+from jade_api.pointers import VERSIONS_DIR_NAME
+from jade_api.scheduler import PREFETCH
+from jade_api.sync import relative_join
+
+# Nice value of the prefetch thread (Linux sets it per thread)
+PREFETCH_NICENESS = 10
+
+
+def _lower_thread_priority():
+    if sys.platform.startswith("linux"):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), PREFETCH_NICENESS)
+        except OSError:
+            pass
+
+
+class PrefetchCancelled(Exception):
+    """The selection changed before the prefetch finished."""
+
+
+class ShotPrefetcher:
+    """
+    Warms the catalog (and the remote cache) for one shot at a time.
+
+    Usage:
+        prefetcher = ShotPrefetcher(catalog, cache=remote_cache)
+        shot_combo.currentIndexChanged.connect(lambda: prefetcher.prefetch(shot_combo.currentText()))
+        ...
+        prefetcher.stop()
+    """
+
+    def __init__(self, catalog: ShowCatalog, cache: Optional[RemoteCache] = None):
+        """
+        Args:
+            catalog: Show catalog shared with the GUI
+            cache: Cache of the remote show in remote mode; None only warms the catalog
+        """
+        self.catalog = catalog
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jade-prefetch",
+                                            initializer=_lower_thread_priority)
+        self._lock = threading.Lock()
+        self._shot_name: Optional[str] = None
+        self._cancel: Optional[threading.Event] = None
+
+    def prefetch(self, shot_name: str) -> Optional[Future]:
+        """
+        Start prefetching a shot, cancelling the prefetch of the previous selection.
+
+        Returns:
+            Future of the prefetched folders (relative to the base folder), None if the shot is
+            already being prefetched
+        """
+        with self._lock:
+            if shot_name == self._shot_name and not self._cancel.is_set():
+                return None
+            if self._cancel is not None:
+                self._cancel.set()
+            cancel = self._cancel = threading.Event()
+            self._shot_name = shot_name
+        return self._executor.submit(self._run, shot_name, cancel)
+
+    def cancel(self):
+        with self._lock:
+            if self._cancel is not None:
+                self._cancel.set()
+            self._shot_name = None
+
+    def stop(self):
+        """Cancel the current prefetch and let the thread exit."""
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, shot_name: str, cancel: threading.Event) -> List[str]:
+        try:
+            return self._prefetch(shot_name, cancel)
+        except PrefetchCancelled:
+            return []
+        except OSError as e:
+            print(f"WARNING: prefetch of {shot_name} stopped: {e}")
+            return []
+
+    def _prefetch(self, shot_name: str, cancel: threading.Event) -> List[str]:
+        if cancel.is_set():
+            raise PrefetchCancelled()
+        # Version index: the export listings of every department and the publish folders they compare to
+        resolve_shot_publishes(self.catalog, [shot_name])
+
+        roots: List[str] = []
+        pending = [shot_publish_root(shot_name)]
+        while pending:
+            roots.extend(pending)
+            referenced = set()
+            for root in pending:
+                for relative_path, entry in self._walk(root, cancel):
+                    referenced |= self._fetch(relative_path, entry)
+            if self.cache is not None:
+                # Keep what is already downloaded while the rest comes in
+                self.cache.pin(relative_join(self.catalog.base_path, root) for root in roots)
+            pending = sorted({asset_publish_root(*asset) for asset in referenced} - set(roots))
+        return roots
+
+    def _walk(self, root: str, cancel: threading.Event):
+        # (relative path, entry) of every file under root, from the catalog listings
+        folders = [root]
+        while folders:
+            folder = folders.pop()
+            if cancel.is_set():
+                raise PrefetchCancelled()
+            try:
+                entries = self.catalog.listing(relative_join(self.catalog.base_path, folder))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            for entry in entries:
+                if entry.is_dir and entry.name == VERSIONS_DIR_NAME:
+                    # Older pointer publishes: only the current versions are opened
+                    continue
+                if entry.is_dir:
+                    folders.append(f"{folder}/{entry.name}")
+                else:
+                    if cancel.is_set():
+                        raise PrefetchCancelled()
+                    yield f"{folder}/{entry.name}", entry
+
+    def _fetch(self, relative_path: str, entry) -> set:
+        # Download a publish into the cache; asset publishes it references
+        if self.cache is not None:
+            local_path = self.cache.fetch(entry.path, entry, priority=PREFETCH)
+            if relative_path.endswith(REFERENCING_EXTENSIONS):
+                return find_asset_references(local_path, LOCAL_FS, relative_path)
+        elif relative_path.endswith(REFERENCING_EXTENSIONS):
+            return find_asset_references(entry.path, self.catalog.fs, relative_path)
+        return set()
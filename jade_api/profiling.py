@@ -0,0 +1,146 @@
+#Opt-in profiling of GUI actions so slow sessions can be reported with evidence
+
+import cProfile
+import datetime
+import functools
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+# Set JADE_PROFILE=1 (or "true"/"yes"/"on") before launching the GUI to turn profiling on
+PROFILE_ENV_VAR = "JADE_PROFILE"
+
+# Set while an action is being profiled: handlers call other wrapped actions (refresh_tree), and only
+# one cProfile can be active at a time (Python 3.12+ raises, older versions lose the outer profile)
+_local = threading.local()
+
+
+def profiling_enabled() -> bool:
+    """Return True if profiling was requested through the JADE_PROFILE environment variable."""
+    return os.environ.get(PROFILE_ENV_VAR, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_profile_dir(base_path: Optional[Path]) -> Path:
+    """
+    Return the folder profiles are written to: <base_path>/.tools/profiles.
+    Falls back to ./.tools/profiles when no valid base path is selected yet.
+    """
+    root = Path(base_path) if base_path and Path(base_path).is_dir() else Path.cwd()
+    profile_dir = root / ".tools" / "profiles"
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    return profile_dir
+
+
+def profile_call(action_name: str, func: Callable, base_path_getter: Callable[[], Optional[Path]], *args, **kwargs):
+    """
+    Run func under cProfile and dump the result as
+    <profile_dir>/<action_name>_<YYYYmmdd_HHMMSS_ffffff>.pstats.
+
+    The file can be opened with `python -m pstats <file>` or snakeviz.
+    Profiling errors never stop the wrapped action from running. A call made while another action
+    is being profiled just runs; it is part of the outer action's profile.
+    """
+    if getattr(_local, "active", False):
+        return func(*args, **kwargs)
+    profiler = cProfile.Profile()
+    _local.active = True
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        _local.active = False
+        try:
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", action_name)
+            profile_file = get_profile_dir(base_path_getter()) / f"{safe_name}_{timestamp}.pstats"
+            profiler.dump_stats(str(profile_file))
+            print(f"Profile written to {profile_file}")
+        except Exception as e:
+            # Same rule as log_action: a failed profile dump must not crash the app
+            print(f"ERROR writing profile: {e}")
+
+
+def profiled(action_name: str, func: Callable, base_path_getter: Callable[[], Optional[Path]]) -> Callable:
+    """Wrap func so every call is profiled under action_name."""
+    if getattr(func, "_jade_profiled", False):
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # _set_action is the dispatcher, so name its profile after the action being selected
+        name = action_name
+        if func.__name__ == "_set_action" and args:
+            name = f"{action_name}.{args[0]}"
+        return profile_call(name, func, base_path_getter, *args, **kwargs)
+
+    wrapper._jade_profiled = True
+    return wrapper
+
+
+def wrap_gui_actions(window, wrap: Callable[[str, Callable], Callable]):
+    """
+    Replace the JADEGui action handlers with wrap(action_name, handler).
+
+    Wrapped on the window: _set_action and refresh_tree of the directory viewer.
+    Wrapped on every form attribute of the window: all handle_* methods.
+    Must be called after the window's init_ui so the forms exist. Because the
+    buttons were connected to the bound methods before wrapping, the forms'
+    handlers are re-connected through the wrapped attribute where possible.
+    """
+    # 1. Action dispatcher. Buttons call it through a lambda, so replacing the attribute is enough.
+    window._set_action = wrap("set_action", window._set_action)
+
+    # 2. Directory viewer refresh (called by every handler after create/publish)
+    viewer = getattr(window, "directory_viewer", None)
+    if viewer is not None and hasattr(viewer, "refresh_tree"):
+        viewer.refresh_tree = wrap("refresh_tree", viewer.refresh_tree)
+
+    # 3. All handle_* methods on the forms
+    for form in list(vars(window).values()):
+        if not hasattr(form, "main_window"):
+            continue
+        for attr_name in dir(type(form)):
+            if not attr_name.startswith("handle_"):
+                continue
+            original = getattr(form, attr_name)
+            wrapped = wrap(f"{type(form).__name__}.{attr_name}", original)
+            setattr(form, attr_name, wrapped)
+            _reconnect_buttons(form, original, wrapped)
+
+
+def install_gui_profiling(window, force: bool = False) -> bool:
+    """
+    Wrap the JADEGui action handlers with cProfile when profiling is enabled.
+
+    Args:
+        window: the JADEGui main window
+        force: install even if JADE_PROFILE is not set
+
+    Returns:
+        True if the hooks were installed.
+    """
+    if not (force or profiling_enabled()):
+        return False
+
+    def base_path_getter():
+        return getattr(window, "base_path", None)
+
+    wrap_gui_actions(window, lambda action_name, func: profiled(action_name, func, base_path_getter))
+
+    print("Profiling enabled: profiles are written to <base folder>/.tools/profiles")
+    return True
+
+
+def _reconnect_buttons(form, original: Callable, wrapped: Callable):
+    # Qt keeps a reference to the bound method that was connected in init_ui,
+    # so move any button connected to the original handler over to the wrapper.
+    for widget in list(vars(form).values()):
+        clicked = getattr(widget, "clicked", None)
+        if clicked is None:
+            continue
+        try:
+            clicked.disconnect(original)
+        except (TypeError, RuntimeError):
+            continue
+        clicked.connect(wrapped)
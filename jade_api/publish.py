@@ -0,0 +1,859 @@
+#Publish the highest working version of an asset or shot department into its publish folder
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from jade_api.create import find_highest_version_file
+from jade_api.farm import replicate_publish
+from jade_api.fs import FsBackend, FsEntry, get_fs
+from jade_api.hashing import PublishHistory, PublishIndex, copy_with_hash, hash_file
+from jade_api.journal import JournalEntry, PublishJournal
+from jade_api.locks import PublishLockTimeout, publish_lock
+from jade_api.pointers import (
+    detach_file, detach_folder, discard_folder_version, folder_current, folder_version, folder_version_dir,
+    pointer_mode_enabled, publish_folder_version, publish_version, restore_folder, restore_version, unpublish
+)
+from jade_api.scheduler import INTERACTIVE, scheduled
+from jade_api.sequences import FileSequence, collapse_sequences, display_name, find_sequences, format_size
+from jade_api.store import ObjectStore
+
+# department -> list of (source extension, publish extension, item type)
+ASSET_DEPARTMENT_MAP = {
+    "geo": [(".usd", ".usd", "file")],
+    "rig": [(".ma", ".ma", "file")],
+    "assembly": [
+        (".geo.usdc", ".geo.usdc", "file"),
+        (".mtl.usdc", ".mtl.usdc", "file"),
+        (".payload.usdc", ".payload.usdc", "file"),
+        (".usd", ".usd", "file"),
+        (None, ".textures", "folder")
+    ],
+    "tex": [
+        (".png", ".png", "file"),
+        (None, ".textures", "folder")
+    ]
+}
+
+# Shot departments that export versioned folders of frame caches:
+# working/fx/export/seq_010_shot_0010_fx_v003_sg/seq_010_shot_0010_fx_v003_sg.1001.bgeo.sc
+SEQUENCE_DEPARTMENTS = ("fx", "charfx")
+
+# Parallel per-frame copies in a sequence publish. Frame caches are many mid-sized files,
+# so keeping several requests in flight is what saturates the share.
+PUBLISH_WORKERS = 16
+
+# Strips "_v001_sg" from texture names when publishing: lion_baseColor_v001_sg.1001.png -> lion_baseColor.1001.png
+VERSION_AND_INITIALS_PATTERN = re.compile(r'_v\d+_[a-zA-Z]+')
+
+
+class MissingFramesError(ValueError):
+    """
+    Raised by publish_shot_sequence when frames are missing and nothing was published.
+
+    Attributes:
+        missing: {sequence name: [missing frame numbers]}
+    """
+
+    def __init__(self, missing: Dict[str, List[int]]):
+        self.missing = missing
+        details = "; ".join(f"{name}: {len(frames)} missing ({_frame_list(frames)})"
+                            for name, frames in missing.items())
+        super().__init__(f"Missing frames, nothing was published. {details}")
+
+
+def _frame_list(frames: List[int], limit: int = 10) -> str:
+    shown = ", ".join(str(frame) for frame in frames[:limit])
+    return shown + (", ..." if len(frames) > limit else "")
+
+
+def get_asset_source_dir(base_path: Path, asset_type_key: str, asset_name: str, department: str) -> Path:
+    """Return prod/asset/working/<type>/<asset>/<department>/export"""
+    return base_path / "prod" / "asset" / "working" / asset_type_key / asset_name / department / "export"
+
+
+def get_asset_publish_dir(base_path: Path, asset_type_key: str, asset_name: str, department: str) -> Path:
+    """Return prod/asset/publish/<type>/<asset>/<department>"""
+    return base_path / "prod" / "asset" / "publish" / asset_type_key / asset_name / department
+
+
+def get_shot_source_dir(base_path: Path, shot_name: str, department: str) -> Path:
+    """Return prod/sequences/<shot>/working/<department>/export"""
+    return base_path / "prod" / "sequences" / shot_name / "working" / department / "export"
+
+
+def get_shot_publish_dir(base_path: Path, shot_name: str, department: str) -> Path:
+    """Return prod/sequences/<shot>/publish/<department>"""
+    return base_path / "prod" / "sequences" / shot_name / "publish" / department
+
+
+def _current_record(index: PublishIndex, source_entry: FsEntry, destination: Path, fs: FsBackend
+                    ) -> Tuple[Optional[dict], Optional[FsEntry]]:
+    # (index record, published entry) when destination is still the file recorded and has the source's
+    # size, (None, None) otherwise
+    record = index.get(destination)
+    if record is None or record["size"] != source_entry.size:
+        return None, None
+    try:
+        published = fs.stat(destination)
+    except FileNotFoundError:
+        return None, None
+    published_mtime = record.get("published_mtime", record["mtime"])
+    if (published.size, published.mtime) != (record["size"], published_mtime):
+        return None, None
+    return record, published
+
+
+def publish_file(base_path: Path, source: Path, destination: Path, fs: Optional[FsBackend] = None,
+                 index: Optional[PublishIndex] = None, store: Optional[ObjectStore] = None,
+                 move_aside: Optional[Callable[[Path], None]] = None) -> bool:
+    """
+    Copy source to destination unless destination already holds the same content.
+
+    The publish index remembers the size, mtime and hash of what was published. When the source
+    size and mtime match the record nothing is read at all; when only the metadata differs the
+    source is hashed and the copy is still skipped if the content is the same. A real copy hashes
+    the data in the same read pass and updates the record.
+
+    Args:
+        index: Shared index when publishing several files; the caller flushes it.
+            When None the record is written before returning.
+        store: Object store of the show (JADE_CAS): destination becomes a link to the stored content
+            instead of a copy
+        move_aside: Called with a published destination before it is replaced, instead of removing it
+            (journaled publishes keep it until they finished, see execute_asset_plan)
+
+    With JADE_PUBLISH_MODE=pointer the source is kept as a version under .versions/ and destination
+    is repointed to it (see jade_api.pointers) instead of being replaced.
+
+    Returns:
+        True if the file was (re)published, False if the publish was already identical
+    """
+    fs = get_fs(fs)
+    if index is None:
+        with PublishIndex(base_path, fs) as index:
+            return publish_file(base_path, source, destination, fs=fs, index=index, store=store)
+
+    source_entry = fs.stat(source)
+    digest = None
+
+    record, published = _current_record(index, source_entry, destination, fs)
+    if record is not None:
+        if record["source"] == index.key(source) and record["mtime"] == source_entry.mtime:
+            return False
+        digest = hash_file(source, fs)
+        if digest == record["blake2b"]:
+            index.record(destination, source, source_entry.size, source_entry.mtime, digest, published.mtime)
+            return False
+
+    if pointer_mode_enabled():
+        match = VERSION_AND_INITIALS_PATTERN.search(source.name)
+        version = match.group(0).lstrip("_") if match else f"{source_entry.mtime:.0f}"
+        digest = publish_version(base_path, source, destination, version, fs=fs, store=store, digest=digest,
+                                 move_aside=move_aside)
+        index.record(destination, source, source_entry.size, source_entry.mtime, digest,
+                     fs.stat(destination).mtime)
+        return True
+
+    replace = move_aside or (lambda path: _remove_if_exists(fs, path))
+    if store is not None:
+        if move_aside is not None and index.get(destination) is not None:
+            move_aside(destination)
+        digest, _ = store.publish(source, destination, digest)
+        index.record(destination, source, source_entry.size, source_entry.mtime, digest,
+                     fs.stat(destination).mtime)
+        return True
+
+    # Never write through an existing file, it may be a hardlink shared with other publishes. A destination
+    # with a record is removed first; one without is usually new, and the exclusive create tells.
+    if index.get(destination) is not None:
+        replace(destination)
+    try:
+        digest = copy_with_hash(source, destination, fs, source=source_entry, exclusive=True)
+    except FileExistsError:
+        replace(destination)
+        digest = copy_with_hash(source, destination, fs, source=source_entry, exclusive=True)
+    index.record(destination, source, source_entry.size, source_entry.mtime, digest)
+    return True
+
+
+def _remove_if_exists(fs: FsBackend, path: Path):
+    try:
+        fs.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _copy_item(fs: FsBackend, store: Optional[ObjectStore], source: Path, destination: Path):
+    # Texture folder files: linked into the object store when it is enabled, copied otherwise
+    if store is not None:
+        store.publish(source, destination)
+    else:
+        fs.copy(source, destination)
+
+
+# Steps of an asset publish plan
+PUBLISH = "publish"        # publish_file: copied unless the publish already holds the same content
+CLEAR = "clear"            # replace the destination folder by an empty folder (the old one is moved aside)
+REMOVE_TREE = "remove"     # move the destination folder aside if it exists
+COPY_ITEM = "copy"         # copy (or link into the object store) one folder item
+COPY_TREE = "copytree"     # copy a whole folder
+REPOINT = "repoint"        # switch a publish folder to the folder version named by label (pointer mode)
+REPORT = "report"          # add a line to the published list
+
+# What a PUBLISH step is expected to do, from the publish index (the hash decides for VERIFY)
+EXPECT_COPY = "copy"
+EXPECT_SKIP = "unchanged"
+EXPECT_VERIFY = "verify"
+
+
+class PlanStep:
+    """
+    One step of an AssetPublishPlan.
+
+    Attributes:
+        action: PUBLISH, CLEAR, REMOVE_TREE, COPY_ITEM, COPY_TREE, REPOINT or REPORT
+        source: File or folder read by the step (None for CLEAR / REMOVE_TREE / REPORT)
+        destination: File or folder written or removed (None for REPORT)
+        size: Bytes the step copies (0 when nothing is expected to be copied)
+        label: Published name (PUBLISH), folder version (REPOINT) or report line (REPORT)
+        expected: EXPECT_COPY, EXPECT_SKIP or EXPECT_VERIFY for PUBLISH steps
+        previous: Folder version the destination pointed at before a REPOINT step (None when it did not
+            point at a kept version), set when the plan runs so a rollback can point it back
+    """
+    __slots__ = ("action", "source", "destination", "size", "label", "expected", "previous")
+
+    def __init__(self, action: str, source=None, destination=None, size: int = 0, label: str = "",
+                 expected: str = EXPECT_COPY, previous: Optional[str] = None):
+        self.action = action
+        self.source = source
+        self.destination = destination
+        self.size = size
+        self.label = label
+        self.expected = expected
+        self.previous = previous
+
+    def to_json(self, base_path: Path) -> dict:
+        """Journal form of the step, paths relative to the base folder."""
+        return {"action": self.action, "label": self.label, "size": self.size, "expected": self.expected,
+                "previous": self.previous,
+                "source": None if self.source is None else self.source.relative_to(base_path).as_posix(),
+                "destination": None if self.destination is None
+                else self.destination.relative_to(base_path).as_posix()}
+
+    @classmethod
+    def from_json(cls, data: dict, base_path: Path) -> "PlanStep":
+        return cls(data["action"],
+                   None if data["source"] is None else base_path / data["source"],
+                   None if data["destination"] is None else base_path / data["destination"],
+                   size=data["size"], label=data["label"], expected=data["expected"],
+                   previous=data.get("previous"))
+
+    def __str__(self):
+        if self.action == PUBLISH:
+            return f"{self.label} <- {self.source.name} ({self.expected})"
+        if self.action == REPORT:
+            return self.label
+        target = self.destination.name if self.destination is not None else ""
+        return f"{self.action} {target}"
+
+
+class AssetPublishPlan:
+    """
+    Everything an asset publish will do, resolved without writing anything.
+
+    Attributes:
+        steps: PlanSteps in execution order
+        source_file_details: Names of the versions that will be published
+        source_folders: Working version folders published whole (tex, assembly .textures)
+        stamps: Size and mtime of every folder and file the plan was resolved from, None if missing
+    """
+
+    def __init__(self, base_path: Path, asset_type_key: str, asset_name: str, department: str):
+        self.base_path = base_path
+        self.asset_type_key = asset_type_key
+        self.asset_name = asset_name
+        self.department = department
+        self.destination_dir = get_asset_publish_dir(base_path, asset_type_key, asset_name, department)
+        self.steps: List[PlanStep] = []
+        self.source_file_details: List[str] = []
+        self.source_folders: List[Path] = []
+        self.stamps: Dict[Path, Optional[Tuple[int, float]]] = {}
+
+    def stamp(self, path: Path, fs: FsBackend, entry: Optional[FsEntry] = None):
+        """Remember the size and mtime of path (or entry, when already listed)."""
+        if entry is None:
+            try:
+                entry = fs.stat(path)
+            except FileNotFoundError:
+                self.stamps[path] = None
+                return
+        self.stamps[path] = (entry.size, entry.mtime)
+
+    def is_current(self, fs: Optional[FsBackend] = None) -> bool:
+        """True while none of the folders and files the plan was resolved from changed."""
+        fs = get_fs(fs)
+        for path, stamp in self.stamps.items():
+            try:
+                entry = fs.stat(path)
+                current = (entry.size, entry.mtime)
+            except FileNotFoundError:
+                current = None
+            if current != stamp:
+                return False
+        return True
+
+    @property
+    def total_bytes(self) -> int:
+        """Bytes expected to be copied."""
+        return sum(step.size for step in self.steps)
+
+    def preview(self) -> str:
+        """Human readable summary, one line per published item."""
+        if not self.source_file_details:
+            return f"No versioned items found for {self.department}."
+        lines = [f"Sources: {', '.join(self.source_file_details)}"]
+        lines.extend(str(step) for step in self.steps if step.action in (PUBLISH, REPORT))
+        lines.append(f"{format_size(self.total_bytes)} to copy")
+        return "\n".join(lines)
+
+
+def _expected_publish(index: PublishIndex, source: Path, source_entry: FsEntry, destination: Path,
+                      fs: FsBackend) -> str:
+    # What publish_file will do, without hashing: EXPECT_SKIP, EXPECT_VERIFY or EXPECT_COPY
+    record, _ = _current_record(index, source_entry, destination, fs)
+    if record is None:
+        return EXPECT_COPY
+    if record["source"] == index.key(source) and record["mtime"] == source_entry.mtime:
+        return EXPECT_SKIP
+    return EXPECT_VERIFY
+
+
+def plan_asset_publish(base_path: Path, asset_type_key: str, asset_name: str,
+                       department: str, fs: Optional[FsBackend] = None) -> AssetPublishPlan:
+    """
+    Resolve the versions an asset department publish would use, and what it would copy.
+    Nothing is written; run the plan with execute_asset_plan().
+
+    Raises:
+        ValueError: If there is no publish logic for the department
+    """
+    target_extensions = ASSET_DEPARTMENT_MAP.get(department)
+    if not target_extensions:
+        raise ValueError(f"Publish logic not implemented for: {department}")
+    fs = get_fs(fs)
+
+    plan = AssetPublishPlan(base_path, asset_type_key, asset_name, department)
+    source_dir = get_asset_source_dir(base_path, asset_type_key, asset_name, department)
+    destination_dir = plan.destination_dir
+    identifier_name = asset_name
+    plan.stamp(source_dir, fs)
+    plan.stamp(destination_dir, fs)
+
+    # Special Case: TEX Department
+    if department == "tex":
+        highest_source_folder = find_highest_version_file(
+            source_dir, identifier_name, department, None, is_folder_search=True, fs=fs
+        )
+        if highest_source_folder:
+            plan.source_file_details.append(highest_source_folder.name)
+            plan.source_folders.append(highest_source_folder)
+            plan.stamp(highest_source_folder, fs)
+
+            # Published names (with source sizes) so the report can list sequences instead of every tile
+            items = []
+            for source_item in fs.scandir(highest_source_folder):
+                item_name = source_item.name
+                if not source_item.is_dir and VERSION_AND_INITIALS_PATTERN.search(item_name):
+                    items.append((source_item, VERSION_AND_INITIALS_PATTERN.sub('', item_name)))
+                else:
+                    items.append((source_item, item_name))
+
+            if pointer_mode_enabled():
+                # Written once to .versions/tex/<source folder>/, then the tex folder is switched to it
+                version, kept = folder_version(destination_dir, highest_source_folder.name,
+                                               {new_item_name: item.size for item, new_item_name in items}, fs)
+                target_dir = folder_version_dir(destination_dir, version)
+            else:
+                # Clear destination
+                plan.steps.append(PlanStep(CLEAR, destination=destination_dir))
+                version, kept, target_dir = None, False, destination_dir
+
+            published_entries = []
+            for source_item, new_item_name in items:
+                action = COPY_TREE if source_item.is_dir else COPY_ITEM
+                if not kept:
+                    plan.steps.append(PlanStep(action, highest_source_folder / source_item.name,
+                                               target_dir / new_item_name, size=source_item.size))
+                published_entries.append(FsEntry(new_item_name, destination_dir / new_item_name, source_item.is_dir,
+                                                 source_item.size, source_item.mtime))
+            if version is not None:
+                plan.steps.append(PlanStep(REPOINT, highest_source_folder, destination_dir, label=version))
+            published_entries.sort(key=lambda entry: (entry.is_dir, entry.name.lower()))
+            contents = ", ".join(display_name(item) for item in collapse_sequences(published_entries))
+            plan.steps.append(PlanStep(REPORT, label=f"TEX Folder: {len(published_entries)} items ({contents})"))
+
+    # Special Case: ASSEMBLY Department (Folder Logic)
+    elif department == "assembly":
+        highest_source_folder = find_highest_version_file(
+            source_dir, identifier_name, department, None, is_folder_search=True, fs=fs
+        )
+        if highest_source_folder:
+            plan.source_file_details.append(highest_source_folder.name)
+            plan.source_folders.append(highest_source_folder)
+            plan.stamp(highest_source_folder, fs)
+            dest_textures_path = destination_dir / ".textures"
+            if pointer_mode_enabled():
+                # Written once to .versions/.textures/<source folder>/, then .textures is switched to it
+                items = fs.scandir(highest_source_folder)
+                version, kept = folder_version(dest_textures_path, highest_source_folder.name,
+                                               {item.name: item.size for item in items}, fs)
+                if not kept:
+                    version_dir = folder_version_dir(dest_textures_path, version)
+                    plan.steps.extend(PlanStep(COPY_TREE if item.is_dir else COPY_ITEM, item.path,
+                                               version_dir / item.name, size=item.size) for item in items)
+                plan.steps.append(PlanStep(REPOINT, highest_source_folder, dest_textures_path, label=version))
+            else:
+                plan.steps.append(PlanStep(REMOVE_TREE, destination=dest_textures_path))
+                plan.steps.append(PlanStep(COPY_TREE, highest_source_folder, dest_textures_path))
+            plan.steps.append(PlanStep(REPORT, label="Assembly Folder: .textures"))
+
+    # Standard Publishing Loop (Files)
+    index = PublishIndex(base_path, fs)
+    for source_ext, publish_ext, item_type in target_extensions:
+        if item_type == "folder":
+            continue
+
+        highest_source_file = find_highest_version_file(source_dir, identifier_name, department, source_ext, fs=fs)
+        if not highest_source_file:
+            continue
+
+        plan.source_file_details.append(highest_source_file.name)
+        new_file_name = f"{identifier_name}_{department}{publish_ext}"
+        destination_file = destination_dir / new_file_name
+        source_entry = fs.stat(highest_source_file)
+        plan.stamp(highest_source_file, fs, source_entry)
+        plan.stamp(destination_file, fs)
+
+        expected = _expected_publish(index, highest_source_file, source_entry, destination_file, fs)
+        plan.steps.append(PlanStep(PUBLISH, highest_source_file, destination_file,
+                                   size=0 if expected == EXPECT_SKIP else source_entry.size,
+                                   label=new_file_name, expected=expected))
+    return plan
+
+
+@scheduled(INTERACTIVE)
+def execute_asset_plan(plan: AssetPublishPlan, fs: Optional[FsBackend] = None) -> Tuple[List[str], List[str]]:
+    """
+    Run a plan from plan_asset_publish(). Republishing an identical version is still skipped
+    (publish_file checks the content again), so a plan whose prediction went stale stays correct.
+
+    Returns:
+        (files_published, source_file_details), like publish_asset()
+
+    Raises:
+        PublishLockTimeout: If another publish of the same department did not finish in time
+        PublishLeaseLost: If the publish lock was lost midway (the publish stopped, its journal is kept)
+    """
+    fs = get_fs(fs)
+    destination_dir = plan.destination_dir
+    index = PublishIndex(plan.base_path, fs)
+    store = ObjectStore.for_publish(plan.base_path, fs)
+    files_published = []
+
+    # A publish of the same department by someone else finishes first
+    with publish_lock(plan.base_path, destination_dir, fs) as lease:
+        # Pointer mode folder publishes are written into their version folder first. The publish folder
+        # itself is only created when the plan found it missing.
+        folders = [folder_version_dir(step.destination, step.label) for step in plan.steps if step.action == REPOINT]
+        if plan.stamps.get(destination_dir) is None:
+            folders.insert(0, destination_dir)
+        fs.mkdir_many(folders)
+        for step in plan.steps:
+            if step.action == REPOINT:
+                step.previous = folder_current(step.destination, fs)
+        # Written ahead of the first step: an interrupted publish is repaired by recover_publishes()
+        journal = PublishJournal(plan.base_path, fs).begin(
+            destination_dir.relative_to(plan.base_path).as_posix(),
+            [step.to_json(plan.base_path) for step in plan.steps]
+        )
+        try:
+            # Before anything is published, so retention keeps the folder even if the publish is interrupted
+            history = PublishHistory(plan.base_path, fs)
+            for source_folder in plan.source_folders:
+                history.append(source_folder, destination_dir)
+            for step_index, step in enumerate(plan.steps):
+                # Someone took the department over (this machine stalled past the lease): stop, the journal
+                # lets recover_publishes() repair what was written
+                lease.check()
+                _run_step(step, plan.base_path, fs, index, store, files_published, journal)
+                if step.action != REPORT:
+                    journal.mark(step_index)
+            lease.check()
+            index.flush()
+        except BaseException:
+            journal.abandon()
+            raise
+        _finish(journal, plan.steps, fs)
+    if files_published:
+        replicate_publish(plan.base_path, destination_dir, fs)
+    return files_published, list(plan.source_file_details)
+
+
+def _run_step(step: PlanStep, base_path: Path, fs: FsBackend, index: PublishIndex, store: Optional[ObjectStore],
+              files_published: List[str], journal: JournalEntry, redo: bool = False):
+    # redo: the step may have run partly before a crash, clear what it left first
+    def move_aside(path: Path):
+        _move_aside(journal, path, fs)
+
+    if step.action == CLEAR:
+        # Also takes a folder pointing at a kept version out of the way, so the copy never writes into it
+        move_aside(step.destination)
+        fs.mkdir_many([step.destination])
+    elif step.action == REMOVE_TREE:
+        move_aside(step.destination)
+    elif step.action in (COPY_ITEM, COPY_TREE):
+        if redo:
+            fs.mkdir_many([step.destination.parent])
+            unpublish(step.destination, fs)
+        if step.action == COPY_ITEM:
+            _copy_item(fs, store, step.source, step.destination)
+        else:
+            fs.copytree(step.source, step.destination)
+    elif step.action == REPOINT:
+        if step.previous is None:
+            # Not pointing at a kept version (published by copy, or missing): a rollback puts it back
+            move_aside(step.destination)
+        publish_folder_version(base_path, step.source, step.destination, step.label, fs)
+    elif step.action == REPORT:
+        files_published.append(step.label)
+    elif step.action == PUBLISH:
+        # Republishing an identical version is skipped
+        copied = publish_file(base_path, step.source, step.destination, fs=fs, index=index, store=store,
+                              move_aside=move_aside)
+        files_published.append(step.label if copied else f"{step.label} (unchanged)")
+
+
+def _move_aside(journal: JournalEntry, path: Path, fs: FsBackend):
+    # Keep what a step replaces next to itself until the publish finished, so a rollback puts it back whole
+    aside = journal.aside_path(path)
+    if path in journal.asides:
+        if fs.exists(aside):
+            # Run again by recover_publishes(): path holds what the interrupted run wrote
+            unpublish(path, fs)
+            return
+    else:
+        journal.mark_aside(path)
+    try:
+        fs.rename(path, aside)
+    except FileNotFoundError:
+        pass
+
+
+def _finish(journal: JournalEntry, steps: List[PlanStep], fs: FsBackend):
+    # Every step ran: folders now published by copy no longer point at a kept version, what the steps
+    # replaced goes, then the journal
+    for step in steps:
+        if step.action in (CLEAR, REMOVE_TREE):
+            detach_folder(step.destination, fs)
+    for path in journal.asides:
+        unpublish(journal.aside_path(path), fs)
+    journal.commit()
+
+
+def _restore_asides(journal: JournalEntry, fs: FsBackend) -> List[Path]:
+    # Put back what the steps of an interrupted publish replaced, last first. Returns the paths put back.
+    restored = []
+    for path in reversed(journal.asides):
+        aside = journal.aside_path(path)
+        if not fs.exists(aside):
+            # Recorded, but the crash came before the rename: path was never replaced
+            continue
+        unpublish(path, fs)
+        fs.rename(aside, path)
+        restored.append(path)
+    return restored
+
+
+ROLLED_FORWARD = "rolled forward"
+PARTIAL_REMOVED = "partial publish removed"
+
+
+def recover_publishes(base_path: Path, fs: Optional[FsBackend] = None) -> List[Tuple[str, str]]:
+    """
+    Repair publishes interrupted by a crash, from their journals only (the show is not scanned).
+
+    An interrupted publish is rolled forward (its remaining steps run again) when every source it
+    still needs exists. Otherwise it is rolled back: what it wrote is removed and what its steps
+    replaced, kept aside until the publish finished, is put back, so the department holds its previous
+    publish whole (published files in pointer mode are pointed back at their previous version). The
+    department has to be published again.
+
+    Returns:
+        (publish folder relative to the base folder, ROLLED_FORWARD or PARTIAL_REMOVED) per journal
+    """
+    fs = get_fs(fs)
+    recovered = []
+    for entry in PublishJournal(base_path, fs).pending():
+        # A publish of the same target running elsewhere repairs it by replacing it; try again later
+        lock = publish_lock(base_path, base_path / entry.header["target"], fs, timeout=0)
+        try:
+            lock.acquire()
+        except PublishLockTimeout:
+            continue
+        try:
+            recovered.append(_recover(entry, base_path, fs))
+        finally:
+            lock.release()
+    return recovered
+
+
+def _holds_recorded_publish(index: PublishIndex, destination: Path, fs: FsBackend) -> bool:
+    # True if destination is still the file the publish index recorded for it
+    record = index.get(destination)
+    if record is None:
+        return False
+    published = fs.stat(destination)
+    return (published.size, published.mtime) == (record["size"], record.get("published_mtime", record["mtime"]))
+
+
+def _recover(entry: JournalEntry, base_path: Path, fs: FsBackend) -> Tuple[str, str]:
+    steps = [PlanStep.from_json(data, base_path) for data in entry.steps]
+    remaining = [(step_index, step) for step_index, step in enumerate(steps)
+                 if step_index not in entry.done and step.action != REPORT]
+    store = ObjectStore.for_publish(base_path, fs)
+    with PublishIndex(base_path, fs) as index:
+        if all(step.source is None or fs.exists(step.source) for _, step in remaining):
+            for step_index, step in remaining:
+                _run_step(step, base_path, fs, index, store, [], entry, redo=True)
+                entry.mark(step_index)
+            outcome = ROLLED_FORWARD
+        else:
+            # Steps run in order: the first one not marked done was running, the ones after it never ran
+            running = remaining[0][0] if remaining else None
+            # Folders switched (or being switched) point at their previous version again. Versions that were
+            # recorded stay kept, the others are removed with everything in them.
+            version_dirs = set()
+            for step_index, step in enumerate(steps):
+                if step.action != REPOINT:
+                    continue
+                version_dirs.add(folder_version_dir(step.destination, step.label))
+                if step_index in entry.done or step_index == running:
+                    restore_folder(step.destination, step.label, step.previous, fs)
+                else:
+                    discard_folder_version(step.destination, step.label, fs)
+            removed = []
+            for step_index, step in enumerate(steps):
+                if step_index not in entry.done and step_index != running:
+                    continue
+                if step.action not in (PUBLISH, COPY_ITEM, COPY_TREE) or not fs.exists(step.destination):
+                    continue
+                if step.action != PUBLISH and step.destination.parent in version_dirs:
+                    continue
+                if step.action == PUBLISH:
+                    # A publish that was skipped as unchanged (or never started) still holds the previous
+                    # publish, which the index on disk describes: only the index flush was lost
+                    if _holds_recorded_publish(index, step.destination, fs):
+                        continue
+                    # A pointer publish is pointed back at the version the index describes
+                    record = index.get(step.destination)
+                    if record is not None and restore_version(step.destination, record["blake2b"], fs):
+                        continue
+                    removed.append(step.destination)
+                unpublish(step.destination, fs)
+            # Then what the steps replaced goes back in place
+            restored = _restore_asides(entry, fs)
+            for destination in removed:
+                detach_file(destination, fs)
+                if destination not in restored:
+                    index.forget(destination)
+            outcome = PARTIAL_REMOVED
+    if outcome == ROLLED_FORWARD:
+        _finish(entry, steps, fs)
+    else:
+        entry.commit()
+    print(f"WARNING: interrupted publish of {entry.header['target']}: {outcome}")
+    return entry.header["target"], outcome
+
+
+@scheduled(INTERACTIVE)
+def publish_asset(base_path: Path, asset_type_key: str, asset_name: str,
+                  department: str, fs: Optional[FsBackend] = None) -> Tuple[List[str], List[str]]:
+    """
+    Publish the highest working version of an asset department.
+
+    Args:
+        base_path: Show base folder
+        asset_type_key: "char", "prop" or "set"
+        asset_name: Name of the asset (e.g., "lion")
+        department: "geo", "rig", "tex" or "assembly"
+        fs: Filesystem backend, local when None
+
+    Returns:
+        (files_published, source_file_details). Both lists are empty when no
+        versioned items were found.
+
+    Raises:
+        ValueError: If there is no publish logic for the department
+    """
+    plan = plan_asset_publish(base_path, asset_type_key, asset_name, department, fs=fs)
+    return execute_asset_plan(plan, fs=fs)
+
+
+@scheduled(INTERACTIVE)
+def publish_shot(base_path: Path, shot_name: str, department: str,
+                 fs: Optional[FsBackend] = None, source_file: Optional[Path] = None
+                 ) -> Optional[Tuple[Path, Path, bool]]:
+    """
+    Publish the highest versioned .usd of a shot department.
+    Final name: seq_010_shot_0010_light.usd
+
+    Args:
+        source_file: Version to publish when already resolved (batch publishing), looked up when None
+
+    Returns:
+        (source_file, published_file, copied), or None if no versioned .usd files exist.
+        copied is False when the publish already held identical content.
+
+    Raises:
+        PublishLockTimeout: If another publish of the same department did not finish in time
+    """
+    fs = get_fs(fs)
+    source_dir = get_shot_source_dir(base_path, shot_name, department)
+    destination_dir = get_shot_publish_dir(base_path, shot_name, department)
+
+    highest_file = source_file or find_highest_version_file(source_dir, shot_name, department, ".usd", fs=fs)
+    if not highest_file:
+        return None
+
+    dest_file = destination_dir / f"{shot_name}_{department}.usd"
+    with publish_lock(base_path, destination_dir, fs):
+        fs.mkdir_many([destination_dir])
+        copied = publish_file(base_path, highest_file, dest_file, fs=fs, store=ObjectStore.for_publish(base_path, fs))
+    replicate_publish(base_path, destination_dir, fs)
+    return highest_file, dest_file, copied
+
+
+@scheduled(INTERACTIVE)
+def publish_shot_sequence(base_path: Path, shot_name: str, department: str,
+                          frame_range: Optional[Tuple[int, int]] = None, link: bool = False,
+                          allow_missing: bool = False, workers: int = PUBLISH_WORKERS,
+                          fs: Optional[FsBackend] = None, source_folder: Optional[Path] = None
+                          ) -> Optional[Tuple[Path, Path, List[FileSequence]]]:
+    """
+    Publish the highest versioned frame-cache folder of a shot department (fx, charfx).
+    Frames are renamed like other publishes (seq_010_shot_0010_fx_v003_sg.1001.bgeo.sc ->
+    seq_010_shot_0010_fx.1001.bgeo.sc) and copied, or hardlinked, by a pool of workers.
+    The publish folder is replaced: it holds exactly the published frames afterwards.
+
+    Args:
+        base_path: Show base folder
+        shot_name: e.g. "seq_010_shot_0010"
+        department: Shot department, usually one of SEQUENCE_DEPARTMENTS
+        frame_range: (first, last) inclusive to publish part of the cache, None for all frames
+        link: Hardlink frames instead of copying them (falls back to a copy across volumes)
+        allow_missing: Publish even if frames are missing
+        workers: Number of parallel copies
+        fs: Filesystem backend, local when None
+        source_folder: Version folder to publish when already resolved, looked up when None
+
+    Returns:
+        (source_folder, publish_folder, published sequences), or None if no versioned folder exists
+
+    Raises:
+        MissingFramesError: If a sequence has holes in the requested frames and allow_missing is False
+        ValueError: If the version folder holds no frame sequence
+        PublishLockTimeout: If another publish of the same department did not finish in time
+        PublishLeaseLost: If the publish lock was lost midway (the remaining frames were not published)
+    """
+    fs = get_fs(fs)
+    source_dir = get_shot_source_dir(base_path, shot_name, department)
+    destination_dir = get_shot_publish_dir(base_path, shot_name, department)
+
+    highest_folder = source_folder or find_highest_version_file(
+        source_dir, shot_name, department, None, is_folder_search=True, fs=fs
+    )
+    if not highest_folder:
+        return None
+
+    entries = sorted((entry for entry in fs.scandir(highest_folder) if not entry.is_dir), key=lambda e: e.name)
+    sizes = {entry.name: entry.size for entry in entries}
+    sequences = find_sequences(entries)
+    if not sequences:
+        raise ValueError(f"No frame sequence found in {highest_folder}")
+
+    # 1. Pick the frames to publish and check them for holes before touching the publish folder
+    copies = []  # (source name, published name)
+    published = []
+    missing = {}
+    sequence_files = set()
+    for sequence in sequences:
+        frames = list(sequence.frames())
+        sequence_files.update(sequence.frame_name(frame) for frame in frames)
+        if frame_range:
+            first, last = frame_range
+            frames = [frame for frame in frames if first <= frame <= last]
+        else:
+            first, last = sequence.first, sequence.last
+        present = set(frames)
+        holes = [frame for frame in range(first, last + 1) if frame not in present]
+        if holes:
+            missing[sequence.name] = holes
+        if not frames:
+            continue
+
+        published_sequence = FileSequence(
+            VERSION_AND_INITIALS_PATTERN.sub('', sequence.head), sequence.sep, sequence.tail, sequence.padding,
+            frames, size=sum(sizes[sequence.frame_name(frame)] for frame in frames), mtime=sequence.mtime,
+        )
+        copies.extend((sequence.frame_name(frame), published_sequence.frame_name(frame)) for frame in frames)
+        published.append(published_sequence)
+
+    if missing and not allow_missing:
+        raise MissingFramesError(missing)
+
+    # Files next to the frames (cache descriptions, wrappers) are published with them
+    for entry in entries:
+        if entry.name not in sequence_files:
+            copies.append((entry.name, VERSION_AND_INITIALS_PATTERN.sub('', entry.name)))
+
+    # 2. Replace the publish folder contents, many requests in flight at once
+    link_or_copy = fs.link if link else fs.copy
+
+    def transfer(src, dst):
+        # Stops the remaining frames once the lease is lost (list() re-raises it)
+        lease.check()
+        link_or_copy(src, dst)
+
+    def clear(entry):
+        unpublish(destination_dir / entry.name, fs)
+
+    pointer_mode = pointer_mode_enabled()
+    with publish_lock(base_path, destination_dir, fs) as lease:
+        # Retention keeps every frame cache folder that was published
+        PublishHistory(base_path, fs).append(highest_folder, destination_dir)
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="jade-publish") as pool:
+            if not pointer_mode:
+                # A folder published in pointer mode before is replaced, the copy never writes into its version
+                if detach_folder(destination_dir, fs):
+                    unpublish(destination_dir, fs)
+                fs.mkdir_many([destination_dir])
+                # list() re-raises the first failure
+                list(pool.map(clear, fs.scandir(destination_dir)))
+                list(pool.map(lambda names: transfer(highest_folder / names[0], destination_dir / names[1]), copies))
+            else:
+                # Frames are written once to .versions/<department>/<source folder>/, then the publish folder
+                # is switched to it
+                version, kept = folder_version(destination_dir, highest_folder.name,
+                                               {published_name: sizes[name] for name, published_name in copies}, fs)
+                version_dir = folder_version_dir(destination_dir, version)
+                if not kept:
+                    fs.mkdir_many([version_dir])
+                    list(pool.map(lambda names: transfer(highest_folder / names[0], version_dir / names[1]), copies))
+        if pointer_mode:
+            lease.check()
+            publish_folder_version(base_path, highest_folder, destination_dir, version, fs)
+
+    replicate_publish(base_path, destination_dir, fs)
+    return highest_folder, destination_dir, published
@@ -0,0 +1,261 @@
+#Retention of working versions: old _vNNN_ exports are pruned, published ones are kept
+#
+# Export folders (working/.../export) hold every version an artist ever exported, which makes every
+# find_highest_version_file listing longer and fills the share. prune_working_versions keeps the newest
+# versions of each export folder, every version ever published (the publish index, the append-only
+# publish history of every file and folder publish and the pointer manifests of JADE_PUBLISH_MODE=pointer) and every
+# file without a version tag, and removes the rest. The show is listed level by level by a pool of workers;
+# the deletions are spread over the same pool and share one rate limit on metadata operations, so a prune
+# never saturates the file server.
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from jade_api.catalog import VERSION_TAG_PATTERN
+from jade_api.fs import FsBackend, FsEntry, get_fs, join
+from jade_api.hashing import PublishHistory, PublishIndex
+from jade_api.pointers import POINTER_MANIFEST_NAME, VERSIONS_DIR_NAME
+from jade_api.scheduler import TokenBucket
+from jade_api.sequences import format_size
+from jade_api.sync import relative_join, single_channel
+
+# Versions kept in every export folder, newest first
+KEEP_VERSIONS = 5
+
+# Folders listed and entries removed at once
+RETENTION_WORKERS = 16
+
+# Files and folders removed per second, all workers together
+DELETE_RATE = 200
+
+EXPORT_DIR_NAME = "export"
+
+# Walked for export folders and pointer manifests
+RETENTION_ROOT = "prod"
+
+
+class RetentionReport:
+    """
+    What a prune found (and did).
+
+    Attributes:
+        folders: Export folders scanned
+        kept: Versioned entries kept because they are among the newest (or modified recently)
+        published: Older versioned entries kept because they were published
+        candidates: (path relative to the base folder, entry, bytes) of every entry to remove
+        removed: Entries removed (0 on a dry run)
+        failed: (path, error) of entries that could not be removed
+    """
+
+    def __init__(self):
+        self.folders = 0
+        self.kept = 0
+        self.published = 0
+        self.candidates: List[Tuple[str, FsEntry, int]] = []
+        self.removed = 0
+        self.failed: List[Tuple[str, str]] = []
+
+    @property
+    def reclaimable(self) -> int:
+        return sum(size for _, _, size in self.candidates)
+
+    def __str__(self):
+        return (f"{len(self.candidates)} old versions ({format_size(self.reclaimable)}) in {self.folders} export "
+                f"folders, {self.kept} recent and {self.published} published versions kept, {self.removed} removed"
+                + (f", {len(self.failed)} failed" if self.failed else ""))
+
+
+def _scan(fs_channel: Callable, base, workers: int) -> Tuple[Dict[str, List[FsEntry]], List[str]]:
+    # ({export folder: listing}, [pointer manifest paths]), relative to the base folder
+    exports: Dict[str, List[FsEntry]] = {}
+    manifests: List[str] = []
+
+    def list_folder(path: str):
+        with fs_channel() as fs:
+            try:
+                return path, fs.scandir(relative_join(base, path))
+            except (FileNotFoundError, NotADirectoryError):
+                return path, []
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="jade-retention-list") as pool:
+        pending = [RETENTION_ROOT]
+        while pending:
+            next_level = []
+            for path, entries in pool.map(list_folder, pending):
+                if path.rsplit("/", 1)[-1] == EXPORT_DIR_NAME and "/working/" in f"/{path}/":
+                    exports[path] = entries
+                    continue
+                names = [entry.name for entry in entries if entry.is_dir]
+                if VERSIONS_DIR_NAME in names:
+                    # Pointer publishes of the files of the folder, and of every folder publish in it
+                    # (.versions/<folder name>/pointers.json); manifests that do not exist are skipped
+                    manifests.append(f"{path}/{VERSIONS_DIR_NAME}/{POINTER_MANIFEST_NAME}")
+                    manifests.extend(f"{path}/{VERSIONS_DIR_NAME}/{name}/{POINTER_MANIFEST_NAME}"
+                                     for name in names if name != VERSIONS_DIR_NAME)
+                next_level.extend(f"{path}/{name}" for name in names if not name.startswith("."))
+            pending = next_level
+    return exports, manifests
+
+
+def published_sources(base_path, manifests: List[str], fs: Optional[FsBackend] = None) -> Set[str]:
+    """
+    Working files and folders the show records as published, relative to the base folder: the source of
+    every current file publish (publish index), every file and folder ever published (publish history)
+    and the source of every kept pointer publish version.
+    """
+    fs = get_fs(fs)
+    sources = set()
+    sources.update(record["source"] for record in PublishIndex(base_path, fs).records().values())
+    sources.update(PublishHistory(base_path, fs).sources())
+    for manifest in manifests:
+        try:
+            records = json.loads(fs.read_bytes(relative_join(base_path, manifest)).decode("utf-8"))
+        except FileNotFoundError:
+            continue
+        except ValueError as e:
+            print(f"WARNING: ignoring unreadable pointer manifest {manifest}: {e}")
+            continue
+        for record in records.values():
+            sources.update(version["source"] for version in record["versions"].values())
+    return sources
+
+
+def _tree_stats(fs: FsBackend, path) -> Tuple[int, float]:
+    # (total size, newest mtime) of the files under a folder
+    total, newest = 0, 0.0
+    for entry in fs.scandir(path):
+        if entry.is_dir:
+            size, mtime = _tree_stats(fs, entry.path)
+        else:
+            size, mtime = entry.size, entry.mtime
+        total += size
+        newest = max(newest, mtime)
+    return total, newest
+
+
+def plan_retention(base_path, keep: int = KEEP_VERSIONS, fs: Optional[FsBackend] = None,
+                   fs_channel: Optional[Callable] = None, workers: int = RETENTION_WORKERS,
+                   older_than: Optional[float] = None) -> RetentionReport:
+    """
+    Find the working versions a prune would remove. Nothing is removed.
+
+    Args:
+        base_path: Show base folder
+        keep: Versions kept in every export folder (all files of a kept version stay)
+        older_than: Only versions last modified before this time (epoch seconds, the newest file
+            of a version folder) are candidates; more recent ones are counted as kept
+        fs_channel: Context manager factory lending a backend per call (SftpChannelPool.channel),
+            fs is shared by every worker when None
+        workers: Folders listed at once
+
+    Raises:
+        ValueError: If keep is less than 1 (the newest version is always kept)
+    """
+    if keep < 1:
+        raise ValueError("At least the newest version of every export folder is kept")
+    fs = get_fs(fs)
+    fs_channel = fs_channel or single_channel(fs)
+    report = RetentionReport()
+    exports, manifests = _scan(fs_channel, base_path, workers)
+    published = published_sources(base_path, manifests, fs)
+    # Version folders holding a published file are kept whole
+    published |= {source.rsplit("/", depth)[0] for source in published for depth in range(1, source.count("/"))}
+
+    folder_candidates = []
+    for folder, entries in sorted(exports.items()):
+        report.folders += 1
+        versions = {}
+        for entry in entries:
+            match = VERSION_TAG_PATTERN.search(entry.name)
+            if match:
+                versions.setdefault(int(match.group(1)), []).append(entry)
+        newest = sorted(versions, reverse=True)[:keep]
+        for version, version_entries in versions.items():
+            if version in newest:
+                report.kept += len(version_entries)
+                continue
+            for entry in version_entries:
+                relative_path = f"{folder}/{entry.name}"
+                if relative_path in published:
+                    report.published += 1
+                elif entry.is_dir:
+                    folder_candidates.append((relative_path, entry))
+                elif older_than is not None and entry.mtime >= older_than:
+                    report.kept += 1
+                else:
+                    report.candidates.append((relative_path, entry, entry.size))
+
+    def measure(candidate):
+        relative_path, entry = candidate
+        with fs_channel() as channel_fs:
+            return (relative_path, entry) + _tree_stats(channel_fs, relative_join(base_path, relative_path))
+
+    # Version folders (textures, frame caches) are measured in parallel too
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="jade-retention-size") as pool:
+        for relative_path, entry, size, newest in pool.map(measure, folder_candidates):
+            if older_than is not None and newest >= older_than:
+                report.kept += 1
+            else:
+                report.candidates.append((relative_path, entry, size))
+    report.candidates.sort(key=lambda candidate: candidate[0])
+    return report
+
+
+def _remove_tree(fs: FsBackend, path, bucket: TokenBucket, rate: float):
+    # rmtree with every removal metered
+    for entry in fs.scandir(path):
+        if entry.is_dir:
+            _remove_tree(fs, join(path, entry.name), bucket, rate)
+        else:
+            bucket.consume(1, rate)
+            fs.remove(join(path, entry.name))
+    bucket.consume(1, rate)
+    fs.rmdir(path)
+
+
+def apply_retention(base_path, report: RetentionReport, fs: Optional[FsBackend] = None,
+                    fs_channel: Optional[Callable] = None, workers: int = RETENTION_WORKERS,
+                    rate: float = DELETE_RATE) -> RetentionReport:
+    """
+    Remove the candidates of plan_retention() in parallel, at most rate removals per second.
+    Entries already gone are counted as removed; other failures are reported, not raised.
+    """
+    fs = get_fs(fs)
+    fs_channel = fs_channel or single_channel(fs)
+    bucket = TokenBucket()
+
+    def remove(candidate):
+        relative_path, entry, _ = candidate
+        path = relative_join(base_path, relative_path)
+        try:
+            with fs_channel() as channel_fs:
+                if entry.is_dir:
+                    _remove_tree(channel_fs, path, bucket, rate)
+                else:
+                    bucket.consume(1, rate)
+                    channel_fs.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            return relative_path, str(e)
+        return None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="jade-retention") as pool:
+        for failure in pool.map(remove, report.candidates):
+            if failure is None:
+                report.removed += 1
+            else:
+                print(f"WARNING: could not remove {failure[0]}: {failure[1]}")
+                report.failed.append(failure)
+    return report
+
+
+def prune_working_versions(base_path, keep: int = KEEP_VERSIONS, dry_run: bool = False,
+                           fs: Optional[FsBackend] = None, fs_channel: Optional[Callable] = None,
+                           workers: int = RETENTION_WORKERS, rate: float = DELETE_RATE) -> RetentionReport:
+    """Plan and (unless dry_run) apply the retention of a whole show. See plan_retention()."""
+    report = plan_retention(base_path, keep, fs=fs, fs_channel=fs_channel, workers=workers)
+    if not dry_run:
+        apply_retention(base_path, report, fs=fs, fs_channel=fs_channel, workers=workers, rate=rate)
+    return report
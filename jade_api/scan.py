@@ -0,0 +1,103 @@
+#Read-only helpers that scan the show folder structure (shared by the GUIs, benchmarks and tools)
+
+from pathlib import Path
+from typing import List, Optional
+
+from jade_api.fs import FsBackend, SftpFs, get_fs
+from jade_api.sequences import collapse_sequences, display_name
+
+# Display name in the GUI -> folder name on disk
+ASSET_TYPE_MAP = {"Character": "char", "Prop": "prop", "Set": "set"}
+
+
+def get_asset_types() -> List[str]:
+    """Return available asset types"""
+    return ["Character", "Prop", "Set"]
+
+
+def _list_dirs(fs: FsBackend, path) -> List[str]:
+    # Names of the sub-folders of path, empty if path does not exist
+    try:
+        return [entry.name for entry in fs.scandir(path) if entry.is_dir]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def get_asset_names(base_path: Path, asset_type: str, sftp_client=None, fs: Optional[FsBackend] = None) -> List[str]:
+    """
+    Get unique asset names for a given asset type from both publish and working dirs.
+    When an sftp_client (or an SftpFs backend) is given, base_path is the remote base folder.
+    """
+    if sftp_client is not None and fs is None:
+        fs = SftpFs(sftp_client)
+    fs = get_fs(fs)
+
+    # (base_path / "prod" / "asset" / mode / asset_type_key / asset_name)
+    asset_type_key = ASSET_TYPE_MAP.get(asset_type)
+
+    if not asset_type_key:
+        return []
+
+    asset_names = set()
+    for mode in ["publish", "working"]:
+        # One listing per folder returns names and types, so directories are filtered
+        # without a stat per entry (one round trip per folder over SFTP)
+        asset_names.update(_list_dirs(fs, base_path / "prod" / "asset" / mode / asset_type_key))
+
+    return sorted(list(asset_names))
+
+
+def get_shot_names(base_path: Path, fs: Optional[FsBackend] = None) -> List[str]:
+    """Get unique shot folder names from the sequences directory"""
+    sequences_dir = base_path / "prod" / "sequences"
+
+    # Looks for folders starting with 'seq_' (e.g., seq_010_shot_0010)
+    shot_names = [name for name in _list_dirs(get_fs(fs), sequences_dir) if name.startswith("seq_")]
+    return sorted(shot_names)
+
+
+def get_shot_departments(base_path: Path, shot_name: str, fs: Optional[FsBackend] = None) -> List[str]:
+    """Get all department folder names from a specific shot's working directory."""
+    # Construct the path to the working directory for the specific shot
+    working_dir = base_path / "prod" / "sequences" / shot_name / "working"
+
+    # Return names of all sub-directories inside 'working', ignoring hidden folders
+    depts = [name for name in _list_dirs(get_fs(fs), working_dir) if not name.startswith('.')]
+    return sorted(depts)
+
+
+def build_directory_tree(path: Path, prefix: str = "", fs: Optional[FsBackend] = None) -> str:
+    #  build tree visualization
+    fs = get_fs(fs)
+    tree = ""
+    try:
+        # Sort items: directories first, then files, both alphabetically
+        items = sorted(fs.scandir(path), key=lambda x: (not x.is_dir, x.name.lower()))
+    except (PermissionError, NotADirectoryError):
+        return tree
+    except FileNotFoundError:
+        return tree
+
+    # Filter out hidden files/dirs
+    items = [item for item in items if not item.name.startswith('.')]
+
+    # Separate directories and files, numbered files are shown as one sequence line
+    folders = [item for item in items if item.is_dir]
+    files = collapse_sequences([item for item in items if not item.is_dir])
+
+    # Render folders
+    for i, folder in enumerate(folders):
+        is_last_folder = (i == len(folders) - 1) and len(files) == 0
+        connector = "└── " if is_last_folder else "├── "
+        tree += f"{prefix}{connector}📁 {folder.name}\n"
+
+        extension = "    " if is_last_folder else "│   "
+        tree += build_directory_tree(path / folder.name, prefix + extension, fs=fs)
+
+    # Render files
+    for i, file in enumerate(files):
+        is_last = i == len(files) - 1
+        connector = "└── " if is_last else "├── "
+        tree += f"{prefix}{connector}📄 {display_name(file)}\n"
+
+    return tree
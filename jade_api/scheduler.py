@@ -0,0 +1,323 @@
+#Transfer scheduler: publishes, prefetches, syncs and farm replication share one link by priority
+#
+# Every transfer runs in a slot of its class. Classes are served most urgent first (interactive publish,
+# then prefetch, then bulk sync / replication), each with its own concurrency limit, and jobs of a class
+# take turns (the job with the fewest running transfers goes next). Bytes are metered per class through
+# token buckets: a class can be capped permanently (JADE_BULK_RATE), and background classes drop to a
+# trickle while a more urgent class is transferring, so a background sync never slows a publish click.
+# Processes of the same user see each other through marker files (<class>.<pid>, in the user's runtime
+# folder): a sync or checkout run from the command line also yields to a publish clicked in a GUI.
+
+import functools
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from jade_api.fs import set_chunk_hook
+from jade_api.journal import pid_alive
+
+# Transfer classes, most urgent first
+INTERACTIVE = "interactive"
+PREFETCH = "prefetch"
+BULK = "bulk"
+
+# Permanent cap of bulk transfers in MB/s (unset: only throttled while more urgent classes transfer)
+BULK_RATE_ENV_VAR = "JADE_BULK_RATE"
+
+# Transfers of the background classes running at once, whatever their class limits
+BACKGROUND_SLOTS = 8
+
+MB = 1024 * 1024
+
+# Marker files of the classes transferring in each process of the user
+TRANSFER_MARKERS_DIR_NAME = "transfers"
+
+# How long the markers of other processes, listed once, are trusted while metering chunks
+MARKER_CHECK_SECONDS = 0.5
+
+
+class TransferClass:
+    """
+    Scheduling parameters of one kind of transfer.
+
+    Attributes:
+        name: INTERACTIVE, PREFETCH or BULK
+        priority: Lower is more urgent
+        max_concurrent: Transfers of this class running at once
+        rate: Bandwidth cap in bytes/s, None for no cap
+        busy_rate: Cap in bytes/s while a more urgent class is transferring, None for no cap
+        background: Counts against BACKGROUND_SLOTS
+    """
+    __slots__ = ("name", "priority", "max_concurrent", "rate", "busy_rate", "background")
+
+    def __init__(self, name: str, priority: int, max_concurrent: int, rate: Optional[float] = None,
+                 busy_rate: Optional[float] = None, background: bool = True):
+        self.name = name
+        self.priority = priority
+        self.max_concurrent = max_concurrent
+        self.rate = rate
+        self.busy_rate = busy_rate
+        self.background = background
+
+
+def _bulk_rate() -> Optional[float]:
+    value = os.environ.get(BULK_RATE_ENV_VAR, "").strip()
+    if not value:
+        return None
+    try:
+        return float(value) * MB
+    except ValueError:
+        print(f"WARNING: ignoring {BULK_RATE_ENV_VAR}={value!r}, expected MB/s")
+        return None
+
+
+def default_classes() -> List[TransferClass]:
+    return [
+        TransferClass(INTERACTIVE, 0, max_concurrent=16, background=False),
+        TransferClass(PREFETCH, 1, max_concurrent=2, busy_rate=2 * MB),
+        TransferClass(BULK, 2, max_concurrent=BACKGROUND_SLOTS, rate=_bulk_rate(), busy_rate=1 * MB),
+    ]
+
+
+def transfer_markers_dir() -> Path:
+    """$XDG_RUNTIME_DIR/jade/transfers (cleared at logout), or transfers/ in the JADE cache folder."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR", "").strip()
+    if runtime_dir:
+        return Path(runtime_dir) / "jade" / TRANSFER_MARKERS_DIR_NAME
+    # Imported here: the cache meters its downloads through this module
+    from jade_api.cache import default_cache_dir
+    return default_cache_dir() / TRANSFER_MARKERS_DIR_NAME
+
+
+class TokenBucket:
+    """
+    Bandwidth meter: consume() blocks long enough to keep the average under the rate.
+
+    Callers may overdraw the bucket; the debt is paid by sleeping, so concurrent consumers
+    share the rate instead of polling for tokens.
+    """
+
+    def __init__(self, burst_seconds: float = 0.25):
+        self.burst_seconds = burst_seconds
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, count: int, rate: float):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(rate * self.burst_seconds, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            self._tokens -= count
+            debt = -self._tokens
+        if debt > 0:
+            time.sleep(debt / rate)
+
+
+class _Waiter:
+    __slots__ = ("transfer_class", "job", "order")
+
+    def __init__(self, transfer_class: TransferClass, job: str, order: int):
+        self.transfer_class = transfer_class
+        self.job = job
+        self.order = order
+
+
+class TransferScheduler:
+    """
+    Admits transfers by class priority and per-job fairness, and meters their bytes.
+
+    Usage:
+        with get_scheduler().transfer(BULK, job="sync"):
+            transfer_file(...)
+
+    Streaming copies in the block (fs.copy_between, hashing.copy_with_hash, hash_file) report every
+    chunk to the scheduler through the chunk hook of the thread.
+    """
+
+    def __init__(self, classes: Optional[List[TransferClass]] = None, background_slots: int = BACKGROUND_SLOTS,
+                 markers_dir: Optional[Path] = None):
+        """
+        Args:
+            markers_dir: Folder of the transfer markers shared with the user's other processes,
+                None to schedule this process alone
+        """
+        self.classes: Dict[str, TransferClass] = {c.name: c for c in (classes or default_classes())}
+        self.background_slots = background_slots
+        self.markers_dir = markers_dir
+        # Classes other processes were transferring: (monotonic time listed, class names)
+        self._others: Tuple[float, Set[str]] = (float("-inf"), set())
+        self._condition = threading.Condition()
+        self._active: Dict[str, int] = {name: 0 for name in self.classes}
+        self._active_jobs: Dict[Tuple[str, str], int] = {}
+        self._waiters: List[_Waiter] = []
+        self._order = itertools.count()
+        self._buckets = {name: TokenBucket() for name in self.classes}
+        # Slot held by the current thread, so nested transfer() blocks do not wait for themselves
+        self._local = threading.local()
+
+    # ---- admission ----
+
+    def _can_start(self, transfer_class: TransferClass) -> bool:
+        if self._active[transfer_class.name] >= transfer_class.max_concurrent:
+            return False
+        if not transfer_class.background:
+            return True
+        running = sum(self._active[c.name] for c in self.classes.values() if c.background)
+        return running < self.background_slots
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        # Most urgent class first; within a class the job with the fewest running transfers, then arrival
+        startable = [waiter for waiter in self._waiters if self._can_start(waiter.transfer_class)]
+        if not startable:
+            return None
+        return min(startable, key=lambda w: (w.transfer_class.priority,
+                                             self._active_jobs.get((w.transfer_class.name, w.job), 0), w.order))
+
+    def acquire(self, class_name: str, job: str = ""):
+        """Wait for a transfer slot. Pair with release()."""
+        transfer_class = self.classes[class_name]
+        with self._condition:
+            waiter = _Waiter(transfer_class, job, next(self._order))
+            self._waiters.append(waiter)
+            try:
+                self._condition.wait_for(lambda: self._next_waiter() is waiter)
+            finally:
+                self._waiters.remove(waiter)
+            self._active[class_name] += 1
+            if self._active[class_name] == 1:
+                self._mark(class_name, True)
+            self._active_jobs[(class_name, job)] = self._active_jobs.get((class_name, job), 0) + 1
+            # Other waiters may be startable too (another class with free slots)
+            self._condition.notify_all()
+
+    def release(self, class_name: str, job: str = ""):
+        with self._condition:
+            self._active[class_name] -= 1
+            if not self._active[class_name]:
+                self._mark(class_name, False)
+            key = (class_name, job)
+            self._active_jobs[key] -= 1
+            if not self._active_jobs[key]:
+                del self._active_jobs[key]
+            self._condition.notify_all()
+
+    @contextmanager
+    def transfer(self, class_name: str, job: str = "") -> Iterator[None]:
+        """
+        Run the block in a transfer slot of class_name, metering the bytes it streams.
+
+        Args:
+            class_name: INTERACTIVE, PREFETCH or BULK
+            job: What the transfer belongs to (a sync, a shot checkout); jobs of a class share its slots fairly
+        """
+        if getattr(self._local, "class_name", None) is not None:
+            # Already in a slot (a publish that syncs, a fill inside a prefetch): keep the outer one
+            yield
+            return
+        self.acquire(class_name, job)
+        self._local.class_name = class_name
+        previous_hook = set_chunk_hook(functools.partial(self.throttle, class_name))
+        try:
+            yield
+        finally:
+            set_chunk_hook(previous_hook)
+            self._local.class_name = None
+            self.release(class_name, job)
+
+    # ---- other processes ----
+
+    def _mark(self, class_name: str, active: bool):
+        # Create or remove the marker telling the user's other processes this one transfers class_name.
+        # Only classes something else yields to have one; one call each way, on the user's local disk.
+        if self.markers_dir is None:
+            return
+        priority = self.classes[class_name].priority
+        if all(c.priority <= priority for c in self.classes.values()):
+            return
+        marker = self.markers_dir / f"{class_name}.{os.getpid()}"
+        try:
+            if active:
+                try:
+                    os.close(os.open(marker, os.O_CREAT | os.O_WRONLY, 0o600))
+                except FileNotFoundError:
+                    self.markers_dir.mkdir(parents=True, exist_ok=True)
+                    os.close(os.open(marker, os.O_CREAT | os.O_WRONLY, 0o600))
+            else:
+                os.remove(marker)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"WARNING: could not update the transfer marker {marker}: {e}")
+
+    def _other_processes(self) -> Set[str]:
+        # Classes transferring in the user's other processes, listed at most every MARKER_CHECK_SECONDS
+        checked, classes = self._others
+        now = time.monotonic()
+        if self.markers_dir is None or now - checked < MARKER_CHECK_SECONDS:
+            return classes
+        classes = set()
+        try:
+            names = os.listdir(self.markers_dir)
+        except OSError:
+            names = []
+        for name in names:
+            class_name, _, pid = name.rpartition(".")
+            if class_name not in self.classes or not pid.isdigit() or int(pid) == os.getpid():
+                continue
+            if not pid_alive(int(pid)):
+                # Left by a process that crashed mid-transfer
+                try:
+                    os.remove(self.markers_dir / name)
+                except OSError:
+                    pass
+                continue
+            classes.add(class_name)
+        self._others = (now, classes)
+        return classes
+
+    # ---- bandwidth ----
+
+    def current_rate(self, class_name: str) -> Optional[float]:
+        """Cap in bytes/s that applies to class_name right now, None when uncapped."""
+        transfer_class = self.classes[class_name]
+        urgent = [c.name for c in self.classes.values() if c.priority < transfer_class.priority]
+        urgent_busy = (any(self._active[name] for name in urgent)
+                       or (bool(urgent) and not self._other_processes().isdisjoint(urgent)))
+        rates = [rate for rate in (transfer_class.rate, transfer_class.busy_rate if urgent_busy else None)
+                 if rate is not None]
+        return min(rates) if rates else None
+
+    def throttle(self, class_name: str, count: int):
+        """Account count bytes moved by a transfer of class_name, sleeping when over its rate."""
+        rate = self.current_rate(class_name)
+        if rate:
+            self._buckets[class_name].consume(count, rate)
+
+
+_SCHEDULER: Optional[TransferScheduler] = None
+_SCHEDULER_GUARD = threading.Lock()
+
+
+def get_scheduler() -> TransferScheduler:
+    """The scheduler shared by every transfer of this process (they share the same link)."""
+    global _SCHEDULER
+    with _SCHEDULER_GUARD:
+        if _SCHEDULER is None:
+            _SCHEDULER = TransferScheduler(markers_dir=transfer_markers_dir())
+        return _SCHEDULER
+
+
+def scheduled(class_name: str) -> Callable:
+    """Decorator running every call of a function in a transfer slot of class_name."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_scheduler().transfer(class_name, job=func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
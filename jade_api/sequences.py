@@ -0,0 +1,195 @@
+#Groups numbered files (frame ranges, UDIM tiles) into single sequence records
+#
+# lion_baseColor.1001.png ... lion_baseColor.1020.png -> lion_baseColor.<1001-1020>.png (20 files, 3.2 GB)
+# A sequence keeps its frames as ranges, so storing and rendering a folder is O(sequences), not O(files).
+
+import re
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from jade_api.fs import FsEntry
+
+# <head><. or _><frame digits><extension>: lion_v001_baseColor_sg.1001.png, smoke_0042.bgeo.sc, vel.12.vdb
+FRAME_PATTERN = re.compile(r"^(?P<head>.*?)(?P<sep>[._])(?P<frame>\d+)(?P<tail>(?:\.[A-Za-z][A-Za-z0-9]*)+)$")
+
+# Numbered files below this count stay as plain files
+MIN_SEQUENCE_LENGTH = 2
+
+
+def format_size(num_bytes: int) -> str:
+    """Human readable size: 3.2 GB"""
+    size = float(num_bytes)
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if size < 1024 or unit == "TB":
+            return f"{int(size)} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def _to_ranges(frames: List[int]) -> List[Tuple[int, int]]:
+    # Sorted unique frames -> inclusive (first, last) runs
+    ranges = []
+    for frame in frames:
+        if ranges and frame == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], frame)
+        else:
+            ranges.append((frame, frame))
+    return ranges
+
+
+class FileSequence:
+    """
+    A run of numbered files sharing a name and extension.
+
+    Attributes:
+        head: Name before the frame number ("lion_baseColor")
+        sep: Separator before the frame number ("." or "_")
+        tail: Extension after the frame number (".png", ".bgeo.sc")
+        padding: Digits of the frame number (4 for 1001 and 0042)
+        ranges: Inclusive (first, last) frame runs, sorted
+        count: Number of files
+        size: Total size in bytes
+        mtime: Newest modification time of the files
+    """
+    __slots__ = ("head", "sep", "tail", "padding", "ranges", "count", "size", "mtime")
+
+    is_dir = False
+
+    def __init__(self, head: str, sep: str, tail: str, padding: int, frames: List[int],
+                 size: int = 0, mtime: float = 0.0):
+        self.head = head
+        self.sep = sep
+        self.tail = tail
+        self.padding = padding
+        frames = sorted(set(frames))
+        self.ranges = _to_ranges(frames)
+        self.count = len(frames)
+        self.size = size
+        self.mtime = mtime
+
+    @property
+    def first(self) -> int:
+        return self.ranges[0][0]
+
+    @property
+    def last(self) -> int:
+        return self.ranges[-1][1]
+
+    def frames(self) -> Iterator[int]:
+        for first, last in self.ranges:
+            yield from range(first, last + 1)
+
+    def missing_frames(self) -> List[int]:
+        """Frames between first and last that have no file."""
+        missing = []
+        for (_, previous_last), (next_first, _) in zip(self.ranges, self.ranges[1:]):
+            missing.extend(range(previous_last + 1, next_first))
+        return missing
+
+    def frame_name(self, frame: int) -> str:
+        """File name of one frame: frame_name(1001) -> lion_baseColor.1001.png"""
+        return f"{self.head}{self.sep}{frame:0{self.padding}d}{self.tail}"
+
+    @property
+    def name(self) -> str:
+        """Collapsed name: lion_baseColor.<1001-1010,1012-1020>.png"""
+        frames = ",".join(
+            f"{first:0{self.padding}d}" if first == last else f"{first:0{self.padding}d}-{last:0{self.padding}d}"
+            for first, last in self.ranges
+        )
+        return f"{self.head}{self.sep}<{frames}>{self.tail}"
+
+    def __str__(self):
+        return f"{self.name} ({self.count} files, {format_size(self.size)})"
+
+    def __repr__(self):
+        return f"FileSequence({str(self)!r})"
+
+
+def parse_frame_range(text: str) -> Optional[Tuple[int, int]]:
+    """
+    Parse a frame range typed by a user: "1001-1100", "1001:1100" or a single "1050".
+
+    Returns:
+        (first, last) inclusive, or None for an empty string
+
+    Raises:
+        ValueError: If the text is not a range or first > last
+    """
+    text = text.strip()
+    if not text:
+        return None
+    match = re.fullmatch(r"(\d+)\s*(?:[-:]\s*(\d+))?", text)
+    if not match:
+        raise ValueError(f"Invalid frame range '{text}', expected e.g. 1001-1100")
+    first = int(match.group(1))
+    last = int(match.group(2)) if match.group(2) else first
+    if first > last:
+        raise ValueError(f"Invalid frame range '{text}': {first} is after {last}")
+    return first, last
+
+
+def parse_frame(name: str) -> Optional[Tuple[str, str, str, str]]:
+    """Split a numbered file name into (head, sep, frame digits, tail), None if it has no frame number."""
+    match = FRAME_PATTERN.match(name)
+    if not match:
+        return None
+    return match.group("head"), match.group("sep"), match.group("frame"), match.group("tail")
+
+
+def collapse_sequences(entries: List[FsEntry], min_length: int = MIN_SEQUENCE_LENGTH
+                       ) -> List[Union[FsEntry, FileSequence]]:
+    """
+    Replace runs of numbered files with FileSequence records.
+
+    Folders and files that are not part of a long enough sequence are returned as they are.
+    A sequence takes the place of its first file, so a sorted listing stays sorted.
+    Sizes are only read for files that end up in a sequence.
+
+    Args:
+        entries: Folder listing (FsEntry objects)
+        min_length: Smallest number of files reported as a sequence
+
+    Returns:
+        Mixed list of FsEntry and FileSequence
+    """
+    groups: Dict[Tuple[str, str, str], List[Tuple[int, int, FsEntry]]] = {}
+    for position, entry in enumerate(entries):
+        if entry.is_dir:
+            continue
+        parsed = parse_frame(entry.name)
+        if parsed:
+            head, sep, digits, tail = parsed
+            groups.setdefault((head, sep, tail), []).append((position, int(digits), entry))
+
+    sequences = {}
+    members = set()
+    for (head, sep, tail), files in groups.items():
+        if len(files) < min_length:
+            continue
+        padding = min(len(entry.name) - len(head) - len(sep) - len(tail) for _, _, entry in files)
+        sequence = FileSequence(
+            head, sep, tail, padding, [frame for _, frame, _ in files],
+            size=sum(entry.size for _, _, entry in files),
+            mtime=max(entry.mtime for _, _, entry in files),
+        )
+        sequences[files[0][0]] = sequence
+        members.update(position for position, _, _ in files)
+
+    if not sequences:
+        return list(entries)
+    collapsed = []
+    for position, entry in enumerate(entries):
+        if position in sequences:
+            collapsed.append(sequences[position])
+        elif position not in members:
+            collapsed.append(entry)
+    return collapsed
+
+
+def display_name(item: Union[FsEntry, FileSequence]) -> str:
+    """Tree label of a collapsed listing item: the file name, or the sequence with its count and size."""
+    return str(item) if isinstance(item, FileSequence) else item.name
+
+
+def find_sequences(entries: List[FsEntry], min_length: int = MIN_SEQUENCE_LENGTH) -> List[FileSequence]:
+    """Only the sequences found in a folder listing."""
+    return [item for item in collapse_sequences(entries, min_length) if isinstance(item, FileSequence)]
@@ -0,0 +1,184 @@
+#Content-addressed store of published data: publishes are hardlinks into .tools/objects/<ab>/<cdef...>
+#
+# Opt-in with JADE_CAS=1. Every published file is stored once under its blake2b digest, so the same
+# texture or USD layer published by several assets or versions takes the space (and copy time) of one.
+# An object whose only link is the store itself is no longer published anywhere and is removed by gc().
+
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
+from jade_api.fs import FsBackend, get_fs
+from jade_api.hashing import copy_with_hash, hash_file
+from jade_api.sequences import format_size
+
+CAS_ENV_VAR = "JADE_CAS"
+
+OBJECTS_DIR_NAME = "objects"
+
+# Partially written objects, renamed into place once complete
+TMP_DIR_NAME = "tmp"
+
+# Temp files older than this are left over from an interrupted publish, gc() removes them
+STALE_TMP_SECONDS = 3600
+
+
+def cas_enabled() -> bool:
+    """Return True if the content-addressed store was requested through JADE_CAS."""
+    return os.environ.get(CAS_ENV_VAR, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class StoreStats:
+    """
+    Space used by the store and by the publishes linked into it.
+
+    Attributes:
+        objects: Number of stored objects
+        stored_size: Bytes actually stored (each object once)
+        links: Number of published files linked to an object
+        published_size: Bytes the published files would take as separate copies
+    """
+    __slots__ = ("objects", "stored_size", "links", "published_size")
+
+    def __init__(self):
+        self.objects = 0
+        self.stored_size = 0
+        self.links = 0
+        self.published_size = 0
+
+    @property
+    def dedup_ratio(self) -> float:
+        """published_size / stored_size: 3.0 means every stored byte is published three times on average."""
+        return self.published_size / self.stored_size if self.stored_size else 1.0
+
+    def __str__(self):
+        return (f"{self.links} published files in {self.objects} objects: "
+                f"{format_size(self.published_size)} published, {format_size(self.stored_size)} stored "
+                f"(dedup ratio {self.dedup_ratio:.2f}x, {format_size(self.published_size - self.stored_size)} saved)")
+
+
+class ObjectStore:
+    """
+    Content-addressed objects of one show, keyed by blake2b digest.
+
+    Only usable on backends with hardlinks (fs.supports_links), since a publish is a link to its object.
+    Objects are never modified: publishing new data always replaces the published link.
+    """
+
+    def __init__(self, base_path, fs: Optional[FsBackend] = None):
+        self.base_path = base_path
+        self.fs = get_fs(fs)
+        if not self.fs.supports_links:
+            raise ValueError(f"The {self.fs.name} backend has no hardlinks, it cannot host an object store")
+        self.root = base_path / ".tools" / OBJECTS_DIR_NAME
+
+    @classmethod
+    def for_publish(cls, base_path, fs: Optional[FsBackend] = None) -> Optional["ObjectStore"]:
+        """The show's store when JADE_CAS is set and the backend supports it, None otherwise."""
+        if not cas_enabled():
+            return None
+        fs = get_fs(fs)
+        if not fs.supports_links:
+            print(f"WARNING: {CAS_ENV_VAR} is set but the {fs.name} backend has no hardlinks, publishing copies")
+            return None
+        return cls(base_path, fs)
+
+    def object_path(self, digest: str):
+        return self.root / digest[:2] / digest[2:]
+
+    def add(self, source, digest: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        Store the content of source.
+
+        Args:
+            source: File to store
+            digest: blake2b of source when already known, saves hashing it again
+
+        Returns:
+            (digest, True if a new object was written / False if the content was already stored)
+        """
+        fs = self.fs
+        # Hash first: content that is already stored is only read, never written
+        digest = digest or hash_file(source, fs)
+        object_path = self.object_path(digest)
+        if fs.exists(object_path):
+            return digest, False
+
+        tmp_dir = self.root / TMP_DIR_NAME
+        fs.mkdir_many([tmp_dir, object_path.parent])
+        tmp_path = tmp_dir / f"{digest}.{os.getpid()}.{threading.get_ident()}"
+        written = copy_with_hash(source, tmp_path, fs)
+        if written != digest:
+            fs.remove(tmp_path)
+            raise OSError(f"{source} changed while it was being stored")
+        fs.rename(tmp_path, object_path)
+        return digest, True
+
+    def publish(self, source, destination, digest: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        Store source and make destination a link to its object (replacing destination).
+
+        Returns:
+            (digest, True if a new object was written)
+        """
+        digest, added = self.add(source, digest)
+        if self.fs.exists(destination):
+            self.fs.remove(destination)
+        try:
+            self.fs.link(self.object_path(digest), destination)
+        except FileNotFoundError:
+            # gc() removed the object between add() and link(): store it again
+            digest, added = self.add(source)
+            self.fs.link(self.object_path(digest), destination)
+        return digest, added
+
+    def _objects(self):
+        # (path, size, link count) of every object
+        try:
+            prefixes = self.fs.scandir(self.root)
+        except FileNotFoundError:
+            return
+        for prefix in prefixes:
+            if not prefix.is_dir or prefix.name == TMP_DIR_NAME:
+                continue
+            for entry in self.fs.scandir(prefix.path):
+                if not entry.is_dir:
+                    yield entry.path, entry.size, self.fs.link_count(entry.path)
+
+    def stats(self) -> StoreStats:
+        """Count objects, links and the space saved. Reflinked or copied publishes are not counted."""
+        stats = StoreStats()
+        for _, size, link_count in self._objects():
+            stats.objects += 1
+            stats.stored_size += size
+            stats.links += link_count - 1
+            stats.published_size += size * (link_count - 1)
+        return stats
+
+    def gc(self, dry_run: bool = False) -> Tuple[int, int]:
+        """
+        Remove objects that are no longer published (their only link is the store) and stale temp files.
+
+        Returns:
+            (objects removed, bytes freed)
+        """
+        removed = freed = 0
+        for path, size, link_count in list(self._objects()):
+            if link_count > 1:
+                continue
+            if not dry_run:
+                self.fs.remove(path)
+            removed += 1
+            freed += size
+
+        if not dry_run:
+            tmp_dir = self.root / TMP_DIR_NAME
+            try:
+                leftovers = self.fs.scandir(tmp_dir)
+            except FileNotFoundError:
+                leftovers = []
+            for entry in leftovers:
+                if entry.mtime < time.time() - STALE_TMP_SECONDS:
+                    self.fs.remove(entry.path)
+        return removed, freed
@@ -0,0 +1,442 @@
+#Two-way synchronization of a local show folder with its SFTP remote
+#
+# Each side is compared with the state both sides had after the last sync (.tools/sync_state.json on the
+# local side), so a difference is known to be a local change (upload), a remote change (download) or
+# both (conflict). Only changed files are transferred, over a pool of SFTP channels sharing one SSH
+# connection. With use_merkle, identical subtrees are skipped using the Merkle caches of both sides.
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from queue import Queue
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from jade_api.fs import FsBackend, SftpFs, copy_between, get_fs, join
+from jade_api.merkle import DEFAULT_ROOT, MerkleTree, compare_trees
+from jade_api.scheduler import BULK, get_scheduler
+from jade_api.sequences import format_size
+
+SYNC_STATE_NAME = "sync_state.json"
+
+# SFTP channels (and transfer threads) used at once
+SYNC_CHANNELS = 8
+
+# Action kinds of a sync plan
+UPLOAD = "upload"
+DOWNLOAD = "download"
+DELETE_LOCAL = "delete_local"
+DELETE_REMOTE = "delete_remote"
+CONFLICT = "conflict"
+
+# Suffix of files being transferred, renamed into place once complete
+PARTIAL_SUFFIX = ".jade-sync.tmp"
+
+# (size, mtime) of a file
+FileState = Tuple[int, float]
+
+
+class SyncAction:
+    """
+    One step of a sync plan.
+
+    Attributes:
+        kind: UPLOAD, DOWNLOAD, DELETE_LOCAL, DELETE_REMOTE or CONFLICT
+        path: Path relative to both base folders ("prod/asset/publish/char/lion/geo/lion_geo.usd")
+        local: (size, mtime) of the local file, None if it does not exist
+        remote: (size, mtime) of the remote file, None if it does not exist
+    """
+    __slots__ = ("kind", "path", "local", "remote")
+
+    def __init__(self, kind: str, path: str, local: Optional[FileState], remote: Optional[FileState]):
+        self.kind = kind
+        self.path = path
+        self.local = local
+        self.remote = remote
+
+    @property
+    def size(self) -> int:
+        """Bytes to transfer."""
+        source = self.local if self.kind == UPLOAD else self.remote if self.kind == DOWNLOAD else None
+        return source[0] if source else 0
+
+    def __str__(self):
+        return f"{self.kind:<13} {self.path}"
+
+
+class SyncPlan:
+    """
+    Everything a sync would do.
+
+    Attributes:
+        actions: Transfers, deletions and conflicts, sorted by path
+        unchanged: (size, local mtime, remote mtime) of the files found identical, recorded as synced
+        gone: Files deleted on both sides since the last sync, dropped from the sync state
+    """
+
+    def __init__(self, actions: List[SyncAction], unchanged: Dict[str, list], gone: List[str]):
+        self.actions = sorted(actions, key=lambda action: action.path)
+        self.unchanged = unchanged
+        self.gone = gone
+
+    def of_kind(self, kind: str) -> List[SyncAction]:
+        return [action for action in self.actions if action.kind == kind]
+
+    @property
+    def conflicts(self) -> List[SyncAction]:
+        return self.of_kind(CONFLICT)
+
+    def summary(self) -> str:
+        """12 uploads (1.2 GB), 3 downloads (20.0 MB), 0 deletions, 1 conflicts"""
+        uploads, downloads = self.of_kind(UPLOAD), self.of_kind(DOWNLOAD)
+        deletions = len(self.of_kind(DELETE_LOCAL)) + len(self.of_kind(DELETE_REMOTE))
+        return (f"{len(uploads)} uploads ({format_size(sum(action.size for action in uploads))}), "
+                f"{len(downloads)} downloads ({format_size(sum(action.size for action in downloads))}), "
+                f"{deletions} deletions, {len(self.conflicts)} conflicts")
+
+
+class SftpChannelPool:
+    """
+    SFTP channels opened on the SSH connection of an existing client, one per transfer thread.
+
+    SFTP requests on one channel are answered in order, so a single client serializes every
+    transfer; separate channels on the same connection run side by side.
+    """
+
+    def __init__(self, sftp_client, size: int = SYNC_CHANNELS):
+        import paramiko
+
+        self.size = max(1, size)
+        transport = sftp_client.get_channel().get_transport()
+        self._clients = [sftp_client] + [paramiko.SFTPClient.from_transport(transport) for _ in range(self.size - 1)]
+        self._free: Queue = Queue()
+        for client in self._clients:
+            self._free.put(SftpFs(client))
+
+    @contextmanager
+    def channel(self) -> Iterator[SftpFs]:
+        """Borrow a channel (as an SftpFs) for one operation."""
+        fs = self._free.get()
+        try:
+            yield fs
+        finally:
+            self._free.put(fs)
+
+    def close(self):
+        # The first client belongs to the caller
+        for client in self._clients[1:]:
+            client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _is_synced(name: str) -> bool:
+    # Dot files/folders (.tools with its caches, partial transfers) stay on their side
+    return not name.startswith('.')
+
+
+def relative_join(base, relative_path: str):
+    """base / "prod/asset/publish" on any backend path type."""
+    for name in relative_path.split("/"):
+        base = join(base, name)
+    return base
+
+
+def transfer_file(src_fs: FsBackend, src, dst_fs: FsBackend, dst):
+    """
+    Copy a file between backends keeping its mtime. The data goes to a dot-prefixed partial file
+    renamed into place, so an interrupted transfer never leaves a truncated dst.
+    """
+    partial = join(dst.parent, f".{dst.name}{PARTIAL_SUFFIX}")
+    dst_fs.mkdir_many([dst.parent])
+    copy_between(src_fs, src, dst_fs, partial)
+    dst_fs.rename(partial, dst)
+
+
+def list_files(fs_channel: Callable, base, roots: List[str], workers: int = 1) -> Dict[str, FileState]:
+    """
+    (size, mtime) of every file under roots, skipping dot files and folders.
+
+    Args:
+        fs_channel: Context manager factory lending a backend for one call (SftpChannelPool.channel)
+        base: Base folder the roots are relative to
+        roots: Folders or files relative to base; missing ones are skipped
+        workers: Folders listed at once, level by level
+
+    Returns:
+        Relative file path -> (size, mtime)
+    """
+    files: Dict[str, FileState] = {}
+
+    def list_folder(path: str):
+        with fs_channel() as fs:
+            try:
+                return path, fs.scandir(relative_join(base, path))
+            except FileNotFoundError:
+                return path, []
+
+    def stat_root(path: str):
+        with fs_channel() as fs:
+            try:
+                return path, fs.stat(relative_join(base, path))
+            except FileNotFoundError:
+                return path, None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="jade-sync-list") as pool:
+        # Roots may be files (Merkle differences) or missing on this side
+        pending = []
+        for path, entry in pool.map(stat_root, roots):
+            if entry is None:
+                continue
+            if entry.is_dir:
+                pending.append(path)
+            else:
+                files[path] = (entry.size, entry.mtime)
+
+        while pending:
+            next_level = []
+            for path, entries in pool.map(list_folder, pending):
+                for entry in entries:
+                    if not _is_synced(entry.name):
+                        continue
+                    child = f"{path}/{entry.name}"
+                    if entry.is_dir:
+                        next_level.append(child)
+                    else:
+                        files[child] = (entry.size, entry.mtime)
+            pending = next_level
+    return files
+
+
+def single_channel(fs: FsBackend) -> Callable:
+    """fs_channel for list_files when there is no pool: always lends fs."""
+    @contextmanager
+    def channel():
+        yield fs
+    return channel
+
+
+def _plan_file(path: str, local: Optional[FileState], remote: Optional[FileState], synced: Optional[list],
+               propagate_deletes: bool, prefer: Optional[str]) -> Optional[SyncAction]:
+    # Decide what one file needs, None when it is in sync
+    if synced is None:
+        if local is not None and remote is not None:
+            return SyncAction(CONFLICT, path, local, remote)
+        return SyncAction(UPLOAD if remote is None else DOWNLOAD, path, local, remote)
+
+    size, local_mtime, remote_mtime = synced
+    local_changed = local != (size, local_mtime)
+    remote_changed = remote != (size, remote_mtime)
+    if not local_changed and not remote_changed:
+        return None
+
+    if local_changed and not remote_changed:
+        if local is None:
+            # Deleted here: delete there too, or bring it back
+            return SyncAction(DELETE_REMOTE if propagate_deletes else DOWNLOAD, path, local, remote)
+        return SyncAction(UPLOAD, path, local, remote)
+    if remote_changed and not local_changed:
+        if remote is None:
+            return SyncAction(DELETE_LOCAL if propagate_deletes else UPLOAD, path, local, remote)
+        return SyncAction(DOWNLOAD, path, local, remote)
+
+    # Both sides changed since the last sync
+    if local is None and remote is None:
+        return None
+    if prefer == "local" and local is not None:
+        return SyncAction(UPLOAD, path, local, remote)
+    if prefer == "remote" and remote is not None:
+        return SyncAction(DOWNLOAD, path, local, remote)
+    return SyncAction(CONFLICT, path, local, remote)
+
+
+class ShowSync:
+    """
+    Synchronizes a local show folder with the same show on an SFTP server.
+
+    Usage:
+        sync = ShowSync(local_base, remote_base, SftpFs(sftp_client))
+        with SftpChannelPool(sftp_client) as pool:
+            plan = sync.plan(pool=pool)
+            print(plan.summary())
+            sync.execute(plan, pool=pool)
+    """
+
+    def __init__(self, local_base, remote_base, remote_fs: FsBackend, local_fs: Optional[FsBackend] = None):
+        self.local_base = local_base
+        self.remote_base = remote_base
+        self.remote_fs = remote_fs
+        self.local_fs = get_fs(local_fs)
+        self.state_path = local_base / ".tools" / SYNC_STATE_NAME
+
+    # ---- sync state ----
+
+    def load_state(self) -> Dict[str, list]:
+        """path -> [size, local mtime, remote mtime] of every file as of the last sync with this remote."""
+        try:
+            state = json.loads(self.local_fs.read_bytes(self.state_path).decode("utf-8"))
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            print(f"WARNING: ignoring unreadable sync state {self.state_path}: {e}")
+            return {}
+        # A state recorded against another remote says nothing about this one
+        if state.get("remote") != str(self.remote_base):
+            return {}
+        return state.get("files", {})
+
+    def save_state(self, files: Dict[str, list]):
+        self.local_fs.mkdir_many([self.state_path.parent])
+        data = {"remote": str(self.remote_base), "files": files}
+        self.local_fs.write_bytes_atomic(self.state_path, json.dumps(data, sort_keys=True).encode("utf-8"))
+
+    def _remote_channel(self, pool: Optional[SftpChannelPool]):
+        return pool.channel if pool is not None else single_channel(self.remote_fs)
+
+    # ---- planning ----
+
+    def plan(self, relative_path: str = DEFAULT_ROOT, use_merkle: bool = False, propagate_deletes: bool = False,
+             prefer: Optional[str] = None, pool: Optional[SftpChannelPool] = None) -> SyncPlan:
+        """
+        Compare both sides and decide what to transfer.
+
+        Args:
+            relative_path: Subtree to sync, relative to both base folders
+            use_merkle: Skip subtrees whose Merkle hashes match. The local cache is updated; the remote
+                cache is used as it is, so the server has to keep it current (run_jade_cli.py merkle-update).
+            propagate_deletes: Delete files on one side that were deleted on the other since the last
+                sync. Off by default: deleted files are transferred back instead.
+            prefer: "local" or "remote" to resolve conflicts in favor of that side, None to report them
+            pool: Channels used to list the remote side in parallel
+
+        Returns:
+            The plan; nothing is transferred
+        """
+        state = self.load_state()
+        workers = pool.size if pool else 1
+        roots = [relative_path]
+        unchanged: Dict[str, list] = {}
+
+        if use_merkle:
+            local_tree = MerkleTree(self.local_base, self.local_fs)
+            remote_tree = MerkleTree(self.remote_base, self.remote_fs)
+            local_tree.update(relative_path)
+            if remote_tree.hash_of(relative_path) is None:
+                print(f"WARNING: no Merkle cache on the remote for {relative_path}, comparing every file")
+            else:
+                roots = [path for path, _ in compare_trees(local_tree, remote_tree, relative_path)]
+                unchanged = _identical_files(local_tree, remote_tree, relative_path, roots)
+
+        local_files = list_files(single_channel(self.local_fs), self.local_base, roots, workers)
+        remote_files = list_files(self._remote_channel(pool), self.remote_base, roots, workers)
+
+        actions, gone = [], []
+        for path in local_files.keys() | remote_files.keys() | set(_under(state, roots)):
+            local, remote = local_files.get(path), remote_files.get(path)
+            action = _plan_file(path, local, remote, state.get(path), propagate_deletes, prefer)
+            if action is None and local is None:
+                gone.append(path)
+            elif action is None:
+                unchanged[path] = [local[0], local[1], remote[1]]
+            elif action is not None and action.kind == CONFLICT and local == remote:
+                # Never synced before but already the same on both sides
+                unchanged[path] = [local[0], local[1], remote[1]]
+            elif action is not None:
+                actions.append(action)
+        return SyncPlan(actions, unchanged, gone)
+
+    # ---- transfers ----
+
+    def _transfer(self, action: SyncAction, remote_fs: FsBackend) -> Optional[list]:
+        # Run one action. Returns the new [size, local mtime, remote mtime], None when the file is gone.
+        local_path = relative_join(self.local_base, action.path)
+        remote_path = relative_join(self.remote_base, action.path)
+
+        if action.kind == DELETE_LOCAL:
+            self.local_fs.remove(local_path)
+            return None
+        if action.kind == DELETE_REMOTE:
+            remote_fs.remove(remote_path)
+            return None
+
+        if action.kind == UPLOAD:
+            src_fs, src, dst_fs, dst = self.local_fs, local_path, remote_fs, remote_path
+        else:
+            src_fs, src, dst_fs, dst = remote_fs, remote_path, self.local_fs, local_path
+        transfer_file(src_fs, src, dst_fs, dst)
+
+        local, remote = self.local_fs.stat(local_path), remote_fs.stat(remote_path)
+        return [local.size, local.mtime, remote.mtime]
+
+    def execute(self, plan: SyncPlan, pool: Optional[SftpChannelPool] = None,
+                progress: Optional[Callable[[int, int], None]] = None
+                ) -> List[Tuple[SyncAction, Optional[Exception]]]:
+        """
+        Run the transfers and deletions of a plan. Conflicts are left alone.
+
+        The sync state is updated for every action that succeeded (and for the unchanged files of
+        the plan), so a failed or interrupted sync is simply resumed by the next one.
+
+        Args:
+            plan: From plan()
+            pool: Channels to transfer on in parallel, the single remote_fs client when None
+            progress: Called as progress(done, total) from the calling thread after each action
+
+        Returns:
+            (action, exception or None) for every action that ran, in plan order
+        """
+        state = self.load_state()
+        state.update(plan.unchanged)
+        for path in plan.gone:
+            state.pop(path, None)
+        runnable = [action for action in plan.actions if action.kind != CONFLICT]
+        remote_channel = self._remote_channel(pool)
+
+        def run(action: SyncAction):
+            # Bulk class: yields the link to publishes and prefetches
+            with get_scheduler().transfer(BULK, job="sync"), remote_channel() as remote_fs:
+                return self._transfer(action, remote_fs)
+
+        results = []
+        try:
+            with ThreadPoolExecutor(max_workers=pool.size if pool else 1, thread_name_prefix="jade-sync") as executor:
+                futures = [executor.submit(run, action) for action in runnable]
+                for done, (action, future) in enumerate(zip(runnable, futures), 1):
+                    try:
+                        synced = future.result()
+                    except Exception as e:
+                        results.append((action, e))
+                    else:
+                        results.append((action, None))
+                        if synced is None:
+                            state.pop(action.path, None)
+                        else:
+                            state[action.path] = synced
+                    if progress:
+                        progress(done, len(runnable))
+        finally:
+            self.save_state(state)
+        return results
+
+
+def _under(paths, roots: List[str]) -> List[str]:
+    # Paths inside (or equal to) one of the roots
+    prefixes = tuple(root + "/" for root in roots)
+    return [path for path in paths if path in roots or path.startswith(prefixes)]
+
+
+def _identical_files(local_tree: MerkleTree, remote_tree: MerkleTree, relative_path: str,
+                     differing: List[str]) -> Dict[str, list]:
+    # Sync state of the files in subtrees whose hashes match, taken from both Merkle caches
+    unchanged = {}
+    for path in _under(local_tree.records, [relative_path]):
+        local = local_tree.records[path]
+        if "children" in local or _under([path], differing):
+            continue
+        remote = remote_tree.records.get(path)
+        if remote is not None and "children" not in remote:
+            unchanged[path] = [local["size"], local["mtime"], remote["mtime"]]
+    return unchanged
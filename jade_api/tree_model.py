@@ -0,0 +1,246 @@
+#Qt tree model of the show backed by ShowCatalog (lazy, pipeline folders only, collapsed export folders)
+#
+# Replaces QFileSystemModel, which watches and caches from the filesystem root. This model only
+# ever holds the rows the user expanded. Needs PyQt6, so it is not imported by jade_api/__init__.
+
+from typing import List, Optional
+
+from PyQt6.QtCore import QAbstractItemModel, QModelIndex, Qt
+from PyQt6.QtWidgets import QApplication, QStyle
+
+from jade_api.catalog import ShowCatalog, latest_versions
+from jade_api.fs import join
+from jade_api.sequences import FileSequence
+
+# Folders whose listings are collapsed to their newest versions
+VERSIONED_FOLDER_NAMES = {"export"}
+
+# Distinct versions shown per export folder, older ones are folded into one row
+EXPORT_VERSIONS_SHOWN = 3
+
+# Never shown besides dot-files/folders: OS clutter, not pipeline data
+HIDDEN_NAMES = {"Thumbs.db", "desktop.ini"}
+
+# Full path of a row, for context menus and actions
+PATH_ROLE = Qt.ItemDataRole.UserRole + 1
+
+
+class _Node:
+    # One loaded row. The path is not stored, it is rebuilt from the parents when asked for.
+    __slots__ = ("name", "is_dir", "parent", "row", "children", "hidden_count", "sequence")
+
+    def __init__(self, name: str, is_dir: bool, parent: Optional["_Node"], row: int):
+        self.name = name
+        self.is_dir = is_dir
+        self.parent = parent
+        self.row = row
+        # None until the folder is expanded (fetchMore)
+        self.children: Optional[List["_Node"]] = None
+        # Placeholder rows only: number of older versions folded into this row
+        self.hidden_count = 0
+        # Sequence rows only: the FileSequence shown by this row
+        self.sequence: Optional[FileSequence] = None
+
+    def key(self):
+        # Identity of a row when diffing a re-listed folder; a sequence that grew is a new row
+        return self.name, self.is_dir, self.hidden_count, str(self.sequence) if self.sequence else ""
+
+
+def _is_shown(name: str) -> bool:
+    return not name.startswith('.') and name not in HIDDEN_NAMES
+
+
+class CatalogTreeModel(QAbstractItemModel):
+    """
+    Single column tree of the base folder. Folders are listed through the catalog
+    only when expanded, and export folders show their latest export_versions versions
+    plus one "older versions" row. Call apply_fs_changes with the folders reported by
+    the watcher to update just those rows.
+    """
+
+    def __init__(self, catalog: Optional[ShowCatalog] = None, export_versions: int = EXPORT_VERSIONS_SHOWN,
+                 parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.export_versions = export_versions
+        self._root = _Node("", True, None, 0)
+        style = QApplication.style()
+        self._dir_icon = style.standardIcon(QStyle.StandardPixmap.SP_DirIcon)
+        self._file_icon = style.standardIcon(QStyle.StandardPixmap.SP_FileIcon)
+
+    def set_catalog(self, catalog: Optional[ShowCatalog]):
+        """Show another base folder (or nothing when catalog is None)."""
+        self.beginResetModel()
+        self.catalog = catalog
+        self._root = _Node("", True, None, 0)
+        self.endResetModel()
+
+    # ---- paths ----
+
+    def node_path(self, node: _Node):
+        names = []
+        while node.parent is not None:
+            names.append(node.name)
+            node = node.parent
+        path = self.catalog.base_path
+        for name in reversed(names):
+            path = join(path, name)
+        return path
+
+    def _node(self, index: QModelIndex) -> _Node:
+        return index.internalPointer() if index.isValid() else self._root
+
+    def _index_of(self, node: _Node) -> QModelIndex:
+        if node is self._root:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def _find_loaded(self, path) -> Optional[_Node]:
+        # Loaded node for a folder path, None if it (or one of its parents) was never expanded
+        try:
+            parts = path.relative_to(self.catalog.base_path).parts
+        except (ValueError, AttributeError):
+            return None
+        node = self._root
+        for name in parts:
+            if node.children is None:
+                return None
+            node = next((child for child in node.children if child.name == name and child.is_dir), None)
+            if node is None:
+                return None
+        return node if node.children is not None else None
+
+    # ---- listing ----
+
+    def _list_children(self, node: _Node) -> List[_Node]:
+        # Rows for a folder: hidden entries dropped, frame/UDIM runs as one row, export folders collapsed
+        try:
+            entries = self.catalog.items(self.node_path(node))
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            return []
+        entries = [entry for entry in entries if _is_shown(entry.name)]
+        hidden_count = 0
+        if node.name in VERSIONED_FOLDER_NAMES:
+            entries, hidden_count = latest_versions(entries, self.export_versions)
+
+        children = []
+        for row, entry in enumerate(entries):
+            child = _Node(entry.name, entry.is_dir, node, row)
+            if isinstance(entry, FileSequence):
+                child.sequence = entry
+            children.append(child)
+        if hidden_count:
+            placeholder = _Node(f"… {hidden_count} older items", False, node, len(children))
+            placeholder.hidden_count = hidden_count
+            children.append(placeholder)
+        return children
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        node = self._node(parent)
+        return self.catalog is not None and node.is_dir and node.children is None
+
+    def fetchMore(self, parent: QModelIndex):
+        node = self._node(parent)
+        if self.catalog is None or node.children is not None:
+            return
+        children = self._list_children(node)
+        if not children:
+            node.children = []
+            return
+        self.beginInsertRows(parent, 0, len(children) - 1)
+        node.children = children
+        self.endInsertRows()
+
+    def hasChildren(self, parent: QModelIndex = QModelIndex()) -> bool:
+        node = self._node(parent)
+        if not node.is_dir:
+            return False
+        # Unexpanded folders claim children so the view draws an expander without listing them
+        return node.children is None or bool(node.children)
+
+    def apply_fs_changes(self, changed_folders):
+        """Re-list the loaded folders among changed_folders, keeping rows (and expansion) that did not change."""
+        if self.catalog is None:
+            return
+        for path in changed_folders:
+            node = self._find_loaded(path)
+            if node is not None:
+                self._update_children(node)
+
+    def _update_children(self, node: _Node):
+        parent_index = self._index_of(node)
+        new_children = self._list_children(node)
+        new_keys = {child.key() for child in new_children}
+
+        # 1. Remove rows that are gone, from the bottom so row numbers stay valid
+        for old in reversed(list(node.children)):
+            if old.key() not in new_keys:
+                self.beginRemoveRows(parent_index, old.row, old.row)
+                del node.children[old.row]
+                for row in range(old.row, len(node.children)):
+                    node.children[row].row = row
+                self.endRemoveRows()
+
+        # 2. Insert new rows at their sorted position (the kept rows are already in order)
+        kept = {child.key() for child in node.children}
+        for row, child in enumerate(new_children):
+            if child.key() in kept:
+                continue
+            self.beginInsertRows(parent_index, row, row)
+            node.children.insert(row, child)
+            for renumber in range(row, len(node.children)):
+                node.children[renumber].row = renumber
+            self.endInsertRows()
+
+    # ---- QAbstractItemModel ----
+
+    def index(self, row: int, column: int, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        node = self._node(parent)
+        if column != 0 or node.children is None or not 0 <= row < len(node.children):
+            return QModelIndex()
+        return self.createIndex(row, 0, node.children[row])
+
+    def parent(self, index: QModelIndex = QModelIndex()) -> QModelIndex:
+        if not index.isValid():
+            return QModelIndex()
+        return self._index_of(index.internalPointer().parent)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        node = self._node(parent)
+        return len(node.children) if node.children is not None else 0
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 1
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role == Qt.ItemDataRole.DisplayRole:
+            return str(node.sequence) if node.sequence else node.name
+        if role == Qt.ItemDataRole.DecorationRole and not node.hidden_count:
+            return self._dir_icon if node.is_dir else self._file_icon
+        if role == Qt.ItemDataRole.ToolTipRole:
+            if node.hidden_count:
+                return f"{node.hidden_count} items of older versions are hidden"
+            if node.sequence and node.sequence.missing_frames():
+                return f"{self.node_path(node)}\nMissing frames: {len(node.sequence.missing_frames())}"
+            return str(self.node_path(node))
+        if role == PATH_ROLE and not node.hidden_count:
+            # Sequence rows give the path of their first frame
+            if node.sequence:
+                return join(self.node_path(node.parent), node.sequence.frame_name(node.sequence.first))
+            return self.node_path(node)
+        return None
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        if index.internalPointer().hidden_count:
+            return Qt.ItemFlag.ItemIsEnabled
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole and section == 0:
+            return "Name"
+        return None
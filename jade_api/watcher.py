@@ -0,0 +1,324 @@
+#Watches the show folder and reports which folders changed (inotify on Linux, polling everywhere else)
+#
+# inotify needs the optional inotify_simple package (pip install inotify_simple). Network shares
+# (NFS, SMB, sshfs) do not deliver inotify events for changes made on other machines, so they are
+# polled too: every folder is stat-ed each interval and only folders whose mtime moved are listed.
+# A GUI polls only the folders its catalog holds (the ones expanded or in use), backing off while nothing
+# changes, and over SFTP on a channel of its own.
+
+import errno
+import os
+import queue
+import sys
+import threading
+from typing import Callable, Iterable, Optional, Set
+
+from jade_api.fs import FsBackend, SftpFs, get_fs, join
+
+# Never watched: tool state (logs, profiles, caches) changes on every action and is not part of the show
+IGNORED_NAMES = {".tools"}
+
+POLL_INTERVAL = 0.5
+
+# While nothing changes the poll interval doubles after every pass, up to this
+MAX_POLL_INTERVAL = 8.0
+
+# Filesystem types whose changes from other clients never reach the local inotify
+NETWORK_FS_TYPES = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "fuse.sshfs", "9p", "afs", "ceph", "glusterfs"}
+
+
+class ShowWatcher:
+    """
+    Base class of the watchers. A background thread queues the folders whose listing
+    changed; the GUI collects them from its own thread with drain().
+    """
+    name = "base"
+
+    def __init__(self, base_path):
+        self.base_path = base_path
+        self._changes = queue.SimpleQueue()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "ShowWatcher":
+        self._thread = threading.Thread(target=self._run, name=f"jade-{self.name}-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def drain(self) -> Set:
+        """Return (and forget) every folder reported since the last call."""
+        changed = set()
+        while True:
+            try:
+                changed.add(self._changes.get_nowait())
+            except queue.Empty:
+                return changed
+
+    def _report(self, folder):
+        self._changes.put(folder)
+
+    def _run(self):
+        raise NotImplementedError
+
+
+class PollingWatcher(ShowWatcher):
+    """
+    Polls folder mtimes. A folder's mtime changes when an entry is added, removed or
+    renamed in it, so one stat per folder finds every listing change without re-listing
+    the show. Works on any backend, including SFTP.
+    """
+    name = "polling"
+
+    def __init__(self, base_path, fs: Optional[FsBackend] = None, interval: float = POLL_INTERVAL,
+                 folders: Optional[Callable[[], Iterable]] = None, max_interval: float = MAX_POLL_INTERVAL,
+                 close: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            interval: Seconds between passes while folders change
+            folders: Returns the folders to poll (ShowCatalog.cached_folders), polled as they come and go.
+                When None every folder of the show is tracked.
+            max_interval: Longest wait between passes once nothing changes
+            close: Called when the watcher stops (closes a channel opened for it)
+        """
+        super().__init__(base_path)
+        self.fs = get_fs(fs)
+        self.interval = interval
+        self.max_interval = max(interval, max_interval)
+        self.folders = folders
+        self._close = close
+        self._mtimes = {}
+
+    def _run(self):
+        try:
+            if self.folders is None:
+                self._track(self.base_path)
+            interval = self.interval
+            while not self._stop.wait(interval):
+                changed = self._poll() if self.folders is None else self._poll_folders()
+                interval = self.interval if changed else min(interval * 2, self.max_interval)
+        finally:
+            if self._close is not None:
+                self._close()
+
+    def _track(self, folder, report: bool = False):
+        # Record the mtime of folder and of every sub-folder below it
+        try:
+            mtime = self.fs.stat(folder).mtime
+            entries = self.fs.scandir(folder)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            return
+        self._mtimes[folder] = mtime
+        if report:
+            self._report(folder)
+        for entry in entries:
+            if entry.is_dir and entry.name not in IGNORED_NAMES:
+                self._track(join(folder, entry.name), report)
+
+    def _untrack(self, folder):
+        for tracked in [f for f in self._mtimes if f == folder or folder in getattr(f, "parents", ())]:
+            del self._mtimes[tracked]
+
+    def _stat_changed(self, folder, old_mtime) -> Optional[bool]:
+        # True (and reported) if folder changed or disappeared since old_mtime, None if it could not be read
+        try:
+            mtime = self.fs.stat(folder).mtime
+        except (FileNotFoundError, NotADirectoryError):
+            self._untrack(folder)
+            self._report(folder)
+            return True
+        except OSError as e:
+            print(f"WARNING: could not poll {folder}: {e}")
+            return None
+        if mtime == old_mtime:
+            return False
+        self._mtimes[folder] = mtime
+        self._report(folder)
+        return True
+
+    def _poll_folders(self) -> bool:
+        # One pass over the folders the caller holds; returns True if any changed
+        wanted = set(self.folders())
+        for folder in [folder for folder in self._mtimes if folder not in wanted]:
+            del self._mtimes[folder]
+        changed = False
+        for folder in wanted:
+            if self._stop.is_set():
+                break
+            if folder not in self._mtimes:
+                # Newly held: its listing was just read, only later changes are reported
+                try:
+                    self._mtimes[folder] = self.fs.stat(folder).mtime
+                except OSError:
+                    pass
+                continue
+            changed = bool(self._stat_changed(folder, self._mtimes[folder])) or changed
+        return changed
+
+    def _poll(self) -> bool:
+        # One pass over every tracked folder; returns True if any changed
+        changed = False
+        for folder, old_mtime in list(self._mtimes.items()):
+            if self._stop.is_set():
+                break
+            if folder not in self._mtimes:
+                continue  # untracked earlier in this pass
+            if not self._stat_changed(folder, old_mtime):
+                continue
+            changed = True
+            if folder not in self._mtimes:
+                continue  # disappeared
+            # Start tracking sub-folders created since the last pass
+            try:
+                entries = self.fs.scandir(folder)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            for entry in entries:
+                child = join(folder, entry.name)
+                if entry.is_dir and entry.name not in IGNORED_NAMES and child not in self._mtimes:
+                    self._track(child, report=True)
+        return changed
+
+
+class InotifyWatcher(ShowWatcher):
+    """
+    Kernel notifications for local Linux folders: no polling cost and changes show up at once.
+    inotify is not recursive, so every folder gets its own watch and new folders are added as they appear.
+
+    Raises:
+        ImportError: If inotify_simple is not installed
+    """
+    name = "inotify"
+
+    def __init__(self, base_path):
+        super().__init__(base_path)
+        from inotify_simple import INotify, flags
+        self._flags = flags
+        self._mask = (flags.CREATE | flags.DELETE | flags.MOVED_FROM | flags.MOVED_TO
+                      | flags.CLOSE_WRITE | flags.ATTRIB)
+        self._inotify = INotify()
+        self._wds = {}
+
+    def start(self) -> "ShowWatcher":
+        # Watches are added before the thread starts so a watch limit error reaches create_watcher
+        try:
+            self._add_tree(self.base_path, strict=True)
+        except OSError:
+            self._inotify.close()
+            raise
+        return super().start()
+
+    def stop(self):
+        super().stop()
+        self._inotify.close()
+
+    def _add_tree(self, folder, report: bool = False, strict: bool = False):
+        try:
+            wd = self._inotify.add_watch(str(folder), self._mask)
+        except (FileNotFoundError, NotADirectoryError):
+            return
+        except OSError as e:
+            if strict or e.errno != errno.ENOSPC:
+                raise
+            print(f"WARNING: inotify watch limit reached, {folder} is not watched "
+                  f"(raise fs.inotify.max_user_watches)")
+            return
+        self._wds[wd] = folder
+        if report:
+            # Files may have landed in the new folder before its watch existed
+            self._report(folder)
+        try:
+            with os.scandir(folder) as it:
+                sub_folders = [entry.name for entry in it
+                               if entry.is_dir(follow_symlinks=False) and entry.name not in IGNORED_NAMES]
+        except (FileNotFoundError, NotADirectoryError):
+            return
+        for name in sub_folders:
+            self._add_tree(join(folder, name), report, strict)
+
+    def _run(self):
+        flags = self._flags
+        while not self._stop.is_set():
+            try:
+                events = self._inotify.read(timeout=int(POLL_INTERVAL * 1000))
+            except (OSError, ValueError):
+                return  # closed by stop()
+            for event in events:
+                folder = self._wds.get(event.wd)
+                if folder is None:
+                    continue
+                if event.mask & flags.IGNORED:
+                    # The watched folder was deleted, its parent reports the change
+                    del self._wds[event.wd]
+                    continue
+                if event.name in IGNORED_NAMES:
+                    continue
+                self._report(folder)
+                if event.mask & flags.ISDIR and event.mask & (flags.CREATE | flags.MOVED_TO):
+                    self._add_tree(join(folder, event.name), report=True)
+
+
+def _mount_type(path) -> Optional[str]:
+    # Filesystem type of the mount holding path, from /proc/mounts (Linux only)
+    try:
+        with open("/proc/mounts") as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return None
+    resolved = os.path.realpath(path)
+    best, best_type = "", None
+    for mount_point, fs_type in mounts:
+        mount_point = mount_point.replace("\\040", " ")
+        inside = resolved == mount_point or resolved.startswith(mount_point.rstrip("/") + "/")
+        if inside and len(mount_point) > len(best):
+            best, best_type = mount_point, fs_type
+    return best_type
+
+
+def _polling_fs(fs: FsBackend):
+    # (backend, close) for a poller: an SFTP show is polled on a channel of its own, so its stats never queue
+    # behind the GUI's requests (SFTP answers the requests of a channel in order)
+    remote_fs = getattr(fs, "remote_fs", fs)
+    if remote_fs.name != "sftp":
+        return fs, None
+    import paramiko
+    try:
+        client = paramiko.SFTPClient.from_transport(remote_fs.sftp.get_channel().get_transport())
+    except (paramiko.SSHException, OSError) as e:
+        print(f"WARNING: could not open an SFTP channel for the folder watcher ({e}), sharing the GUI's")
+        return fs, None
+    return SftpFs(client), client.close
+
+
+def create_watcher(base_path, fs: Optional[FsBackend] = None, interval: float = POLL_INTERVAL,
+                   folders: Optional[Callable[[], Iterable]] = None) -> ShowWatcher:
+    """
+    Start the best watcher for base_path: inotify for local Linux disks when inotify_simple
+    is installed, polling for remote (SFTP) shows, network shares and other platforms.
+
+    Args:
+        folders: Folders to poll when polling (ShowCatalog.cached_folders), every folder of the show when None.
+            inotify watches every folder either way.
+
+    Returns:
+        The started watcher. Call stop() when the base path changes or the app closes.
+    """
+    fs = get_fs(fs)
+    if fs.name == "local" and sys.platform.startswith("linux"):
+        mount_type = _mount_type(base_path)
+        if mount_type in NETWORK_FS_TYPES:
+            print(f"{base_path} is on {mount_type}, polling for changes every {interval}s")
+        else:
+            try:
+                return InotifyWatcher(base_path).start()
+            except ImportError:
+                pass
+            except OSError as e:
+                print(f"WARNING: inotify unavailable for {base_path} ({e}), polling instead")
+    poll_fs, close = _polling_fs(fs)
+    return PollingWatcher(base_path, fs=poll_fs, interval=interval, folders=folders, close=close).start()
@@ -0,0 +1,334 @@
+#Command line maintenance of a show folder (no GUI needed, e.g. from a cron job or the farm)
+#
+# Usage:
+#   python run_jade_cli.py store-stats
+#   python run_jade_cli.py store-gc --dry-run
+#   python run_jade_cli.py --base /path/to/pipeline store-gc
+#   python run_jade_cli.py merkle-update
+#   python run_jade_cli.py merkle-compare /mnt/farm/stonelions/pipeline
+#   python run_jade_cli.py sync --host myfile.scad.edu --user me --remote-base /I-Drive/.../pipeline --dry-run
+#   python run_jade_cli.py farm-sync
+#   python run_jade_cli.py journal-recover
+#   python run_jade_cli.py prune-versions --keep 5 --dry-run
+#   python run_jade_cli.py archive-versions --days 90
+#   python run_jade_cli.py archive-restore prod/asset/working/char/lion/geo/export/lion_geo_v003_sg.usd
+#   python run_jade_cli.py publish-versions prod/asset/publish/char/lion/geo/lion_geo.usd
+#   python run_jade_cli.py publish-rollback prod/asset/publish/char/lion/geo/lion_geo.usd v002_ab
+#   python run_jade_cli.py --base ~/jade_cache checkout seq_010_shot_0010 --host ... --user ... --remote-base ...
+
+import argparse
+import getpass
+import logging
+import os
+import sys
+import time
+from pathlib import Path, PurePosixPath
+
+from jade_api.archive import (
+    ARCHIVE_AFTER_DAYS, ARCHIVE_KEEP_VERSIONS, archive_cold_versions, archived_versions, restore_version
+)
+from jade_api.checkout import SparseCheckout
+from jade_api.farm import FarmReplicator
+from jade_api.fs import SftpFs
+from jade_api.info import LocalUser
+from jade_api.journal import PublishJournal
+from jade_api.merkle import DEFAULT_ROOT, MerkleTree, compare_trees
+from jade_api.pointers import publish_versions, rollback_publish
+from jade_api.publish import recover_publishes
+from jade_api.retention import DELETE_RATE, KEEP_VERSIONS, RETENTION_WORKERS, prune_working_versions
+from jade_api.sequences import format_size
+from jade_api.store import ObjectStore
+from jade_api.sync import SYNC_CHANNELS, SftpChannelPool, ShowSync
+
+# Read instead of prompting, for unattended syncs
+SFTP_PASSWORD_ENV_VAR = "JADE_SFTP_PASSWORD"
+
+
+def store_stats(base_path: Path, args) -> int:
+    print(ObjectStore(base_path).stats())
+    return 0
+
+
+def store_gc(base_path: Path, args) -> int:
+    removed, freed = ObjectStore(base_path).gc(dry_run=args.dry_run)
+    verb = "Would remove" if args.dry_run else "Removed"
+    print(f"{verb} {removed} unpublished objects ({format_size(freed)})")
+    return 0
+
+
+def merkle_update(base_path: Path, args) -> int:
+    tree = MerkleTree(base_path)
+    digest = tree.update(args.path)
+    print(f"{args.path}: {digest} ({tree.hashed_files} files hashed)")
+    return 0
+
+
+def merkle_compare(base_path: Path, args) -> int:
+    local, other = MerkleTree(base_path), MerkleTree(args.other)
+    if not args.cached:
+        local.update(args.path)
+        other.update(args.path)
+    differences = compare_trees(local, other, args.path)
+    for path, change in differences:
+        print(f"{change:<9} {path}")
+    print("Trees match" if not differences else f"{len(differences)} differences")
+    return 1 if differences else 0
+
+
+def farm_sync(base_path: Path, args) -> int:
+    farm_path = args.farm or LocalUser().farm_path
+    if not farm_path:
+        print("Set JADE_FARM or pass --farm")
+        return 2
+    replicator = FarmReplicator(base_path, farm_path)
+    folders = [args.path] if args.path else replicator.publish_folders()
+    for relative_path in folders:
+        print(f"{relative_path}: {replicator.replicate_folder(relative_path)}")
+    return 0
+
+
+def journal_recover(base_path: Path, args) -> int:
+    if args.dry_run:
+        for entry in PublishJournal(base_path).pending():
+            print(f"{entry.header['target']}: {len(entry.done)}/{len(entry.steps)} steps done")
+        return 0
+    for target, outcome in recover_publishes(base_path):
+        print(f"{target}: {outcome}")
+    return 0
+
+
+def prune_versions(base_path: Path, args) -> int:
+    report = prune_working_versions(base_path, keep=args.keep, dry_run=args.dry_run, workers=args.workers,
+                                    rate=args.rate)
+    if args.dry_run:
+        for relative_path, _, size in report.candidates:
+            print(f"{format_size(size):>10}  {relative_path}")
+    print(report)
+    return 1 if report.failed else 0
+
+
+def archive_versions(base_path: Path, args) -> int:
+    report = archive_cold_versions(base_path, days=args.days, keep=args.keep, dry_run=args.dry_run,
+                                   workers=args.workers)
+    if args.dry_run:
+        for relative_path, _, size in report.retention.candidates:
+            print(f"{format_size(size):>10}  {relative_path}")
+    print(report)
+    return 0
+
+
+def archive_list(base_path: Path, args) -> int:
+    members = archived_versions(base_path, args.path)
+    for path, member in sorted(members.items()):
+        modified = time.strftime("%Y-%m-%d", time.localtime(member["mtime"]))
+        print(f"{format_size(member['size']):>10}  {modified}  {path}")
+    print(f"{len(members)} archived files")
+    return 0
+
+
+def archive_restore(base_path: Path, args) -> int:
+    try:
+        restored = restore_version(base_path, args.path, destination_base=args.to, overwrite=args.overwrite)
+    except (FileNotFoundError, FileExistsError) as e:
+        print(e)
+        return 1
+    for path in restored:
+        print(path)
+    return 0
+
+
+def versions(base_path: Path, args) -> int:
+    kept = publish_versions(base_path / args.published)
+    if not kept:
+        print(f"No pointer publishes of {args.published}")
+        return 1
+    for version, info, current in kept:
+        published = time.strftime("%Y-%m-%d %H:%M", time.localtime(info["published"]))
+        print(f"{'*' if current else ' '} {version:<16} {published}  {format_size(info['size']):>10}  {info['source']}")
+    return 0
+
+
+def rollback(base_path: Path, args) -> int:
+    try:
+        rollback_publish(base_path, base_path / args.published, args.version)
+    except KeyError as e:
+        print(e.args[0])
+        return 1
+    print(f"{args.published} -> {args.version}")
+    return 0
+
+
+def _connect(args):
+    # (sftp_client, ssh_client) from the --host/--user/--port arguments, (None, None) on failure
+    from jade_api.remoteSetup import sftp_connect
+
+    # jade_api turns on DEBUG logging, and paramiko logs every packet at that level
+    logging.getLogger("paramiko").setLevel(logging.WARNING)
+    password = os.environ.get(SFTP_PASSWORD_ENV_VAR) or getpass.getpass(f"Password for {args.user}@{args.host}: ")
+    return sftp_connect(args.host, args.user, password, args.port)
+
+
+def _add_sftp_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--host", required=True)
+    parser.add_argument("--user", required=True)
+    parser.add_argument("--port", type=int, default=22)
+    parser.add_argument("--remote-base", type=PurePosixPath, required=True, help="Show base folder on the server")
+    parser.add_argument("--channels", type=int, default=SYNC_CHANNELS, help="Parallel SFTP channels")
+
+
+def sync(base_path: Path, args) -> int:
+    sftp_client, ssh_client = _connect(args)
+    if sftp_client is None:
+        return 2
+
+    try:
+        show_sync = ShowSync(base_path, args.remote_base, SftpFs(sftp_client))
+        with SftpChannelPool(sftp_client, args.channels) as pool:
+            plan = show_sync.plan(args.path, use_merkle=args.merkle, propagate_deletes=args.delete,
+                                  prefer=args.prefer, pool=pool)
+            for action in plan.actions:
+                print(action)
+            print(plan.summary())
+            if args.dry_run:
+                return 0
+
+            results = show_sync.execute(plan, pool=pool)
+    finally:
+        sftp_client.close()
+        ssh_client.close()
+
+    failed = [(action, error) for action, error in results if error is not None]
+    for action, error in failed:
+        print(f"FAILED {action}: {error}")
+    print(f"{len(results) - len(failed)} of {len(results)} actions done, {len(plan.conflicts)} conflicts left")
+    return 1 if failed or plan.conflicts else 0
+
+
+def checkout(base_path: Path, args) -> int:
+    sftp_client, ssh_client = _connect(args)
+    if sftp_client is None:
+        return 2
+
+    try:
+        sparse = SparseCheckout(base_path, args.remote_base, SftpFs(sftp_client))
+        with SftpChannelPool(sftp_client, args.channels) as pool:
+            shots = args.shots or sparse.shots()
+            if not shots:
+                print("Nothing checked out yet, pass a shot name")
+                return 2
+            for shot_name in shots:
+                try:
+                    print(f"{shot_name}: {sparse.checkout(shot_name, pool=pool)}")
+                except ValueError as e:
+                    print(e)
+                    return 2
+    finally:
+        sftp_client.close()
+        ssh_client.close()
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="JADE show maintenance.")
+    parser.add_argument("--base", type=Path, default=None,
+                        help="Show base folder (default: $JADE_COLLAB_BASE_DIR)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    stats_parser = commands.add_parser("store-stats", help="Report the object store size and dedup ratio")
+    stats_parser.set_defaults(func=store_stats)
+
+    gc_parser = commands.add_parser("store-gc", help="Remove objects that are no longer published")
+    gc_parser.add_argument("--dry-run", action="store_true", help="Only report what would be removed")
+    gc_parser.set_defaults(func=store_gc)
+
+    update_parser = commands.add_parser("merkle-update", help="Refresh the Merkle hashes of the show")
+    update_parser.add_argument("--path", default=DEFAULT_ROOT, help="Subtree relative to the base folder")
+    update_parser.set_defaults(func=merkle_update)
+
+    compare_parser = commands.add_parser("merkle-compare", help="Compare the show with another copy of it")
+    compare_parser.add_argument("other", type=Path, help="Base folder of the other copy (e.g. a mounted mirror)")
+    compare_parser.add_argument("--path", default=DEFAULT_ROOT, help="Subtree relative to the base folder")
+    compare_parser.add_argument("--cached", action="store_true",
+                                help="Trust both caches as they are (each side keeps its own up to date)")
+    compare_parser.set_defaults(func=merkle_compare)
+
+    farm_parser = commands.add_parser("farm-sync", help="Replicate every publish folder to the farm cache")
+    farm_parser.add_argument("--farm", default=None, help="Show base folder on the farm (default: $JADE_FARM)")
+    farm_parser.add_argument("--path", default=None, help="One folder relative to the base folder")
+    farm_parser.set_defaults(func=farm_sync)
+
+    journal_parser = commands.add_parser("journal-recover", help="Repair publishes interrupted by a crash")
+    journal_parser.add_argument("--dry-run", action="store_true", help="Only list the interrupted publishes")
+    journal_parser.set_defaults(func=journal_recover)
+
+    prune_parser = commands.add_parser("prune-versions",
+                                       help="Remove old working versions, keeping the newest and published ones")
+    prune_parser.add_argument("--keep", type=int, default=KEEP_VERSIONS, help="Versions kept per export folder")
+    prune_parser.add_argument("--dry-run", action="store_true", help="Only list what would be removed")
+    prune_parser.add_argument("--workers", type=int, default=RETENTION_WORKERS, help="Parallel listings and removals")
+    prune_parser.add_argument("--rate", type=float, default=DELETE_RATE, help="Removals per second")
+    prune_parser.set_defaults(func=prune_versions)
+
+    archive_parser = commands.add_parser("archive-versions",
+                                         help="Move old working versions into compressed packs per asset / shot")
+    archive_parser.add_argument("--days", type=float, default=ARCHIVE_AFTER_DAYS,
+                                help="Archive versions untouched for this many days")
+    archive_parser.add_argument("--keep", type=int, default=ARCHIVE_KEEP_VERSIONS,
+                                help="Versions always left in every export folder")
+    archive_parser.add_argument("--dry-run", action="store_true", help="Only list what would be archived")
+    archive_parser.add_argument("--workers", type=int, default=RETENTION_WORKERS, help="Assets and shots packed at once")
+    archive_parser.set_defaults(func=archive_versions)
+
+    archive_list_parser = commands.add_parser("archive-list", help="List the archived files of an asset or shot")
+    archive_list_parser.add_argument("path", help="Working path relative to the base folder (asset, shot or below)")
+    archive_list_parser.set_defaults(func=archive_list)
+
+    restore_parser = commands.add_parser("archive-restore", help="Extract an archived version (file or folder)")
+    restore_parser.add_argument("path", help="Working path of the version relative to the base folder")
+    restore_parser.add_argument("--to", type=Path, default=None, help="Restore under another base folder")
+    restore_parser.add_argument("--overwrite", action="store_true", help="Replace existing files")
+    restore_parser.set_defaults(func=archive_restore)
+
+    versions_parser = commands.add_parser("publish-versions", help="List the kept versions of a pointer publish")
+    versions_parser.add_argument("published", help="Published file (or publish folder of a folder publish) relative to the base folder")
+    versions_parser.set_defaults(func=versions)
+
+    rollback_parser = commands.add_parser("publish-rollback", help="Point a pointer publish at another version")
+    rollback_parser.add_argument("published", help="Published file (or publish folder of a folder publish) relative to the base folder")
+    rollback_parser.add_argument("version", help="Version listed by publish-versions")
+    rollback_parser.set_defaults(func=rollback)
+
+    sync_parser = commands.add_parser("sync", help="Two-way sync of the local show with its SFTP remote")
+    _add_sftp_arguments(sync_parser)
+    sync_parser.add_argument("--path", default=DEFAULT_ROOT, help="Subtree relative to the base folders")
+    sync_parser.add_argument("--merkle", action="store_true",
+                             help="Skip subtrees whose Merkle hashes match (the server keeps its cache current)")
+    sync_parser.add_argument("--delete", action="store_true",
+                             help="Propagate deletions instead of transferring deleted files back")
+    sync_parser.add_argument("--prefer", choices=("local", "remote"), default=None,
+                             help="Resolve conflicts in favor of one side instead of reporting them")
+    sync_parser.add_argument("--dry-run", action="store_true", help="Only print the plan")
+    sync_parser.set_defaults(func=sync)
+
+    checkout_parser = commands.add_parser(
+        "checkout", help="Fetch shots' publishes and the asset publishes they reference into --base")
+    _add_sftp_arguments(checkout_parser)
+    checkout_parser.add_argument("shots", nargs="*", help="Shot names (default: refresh every checked out shot)")
+    checkout_parser.set_defaults(func=checkout)
+
+    args = parser.parse_args(argv)
+    base_path = args.base
+    if base_path is None:
+        collab_path = LocalUser().collab_path
+        if not collab_path:
+            parser.error("Set JADE_COLLAB_BASE_DIR or pass --base")
+        base_path = Path(collab_path)
+    if args.func is checkout:
+        base_path.mkdir(parents=True, exist_ok=True)
+    if not base_path.is_dir():
+        parser.error(f"Base folder not found: {base_path}")
+    return args.func(base_path, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,112 +1,36 @@
 import sys
 from pathlib import Path
-from typing import List, Optional
-import shutil
-import re
+from typing import Optional
 from jade_api.activity import log_action
 from jade_api.remoteSetup import sftp_connect
+from jade_api.profiling import install_gui_profiling
+from jade_api.fstrace import install_gui_fs_tracing
 
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QPushButton, QLineEdit, QComboBox, QPlainTextEdit,
-    QFileDialog, QSizePolicy, QMessageBox, QTreeView
+    QFileDialog, QSizePolicy, QMessageBox, QTreeView, QCheckBox
 )
-from PyQt6.QtCore import Qt, QSize, QDir, QModelIndex
+from PyQt6.QtCore import Qt, QSize, QTimer
 from PyQt6.QtGui import QFont, QColor, QPalette
-from PyQt6.QtGui import QFileSystemModel
 
 
-from jade_api.create import create_new_asset, create_new_shot, find_highest_version_file, create_new_shot_asset
-
-
-# ======================== UTILITY FUNCTIONS ========================
-def get_asset_types() -> List[str]:
-    """Return available asset types"""
-    return ["Character", "Prop", "Set"]
-
-
-def get_asset_names(base_path: Path, asset_type: str) -> List[str]:
-    """Get unique asset names for a given asset type from both publish and working dirs"""
-    if not base_path.exists():
-        return []
-
-    asset_names = set()
-    # (base_path / "prod" / "asset" / mode / asset_type_key / asset_name)
-    asset_type_key_map = {"Character": "char", "Prop": "prop", "Set": "set"}
-    asset_type_key = asset_type_key_map.get(asset_type)
-
-    if not asset_type_key:
-        return []
-
-    for mode in ["publish", "working"]:
-        asset_dir = base_path / "prod" / "asset" / mode / asset_type_key
-        if asset_dir.exists():
-            for item in asset_dir.iterdir():
-                if item.is_dir():
-                    asset_names.add(item.name)
-
-    return sorted(list(asset_names))
-
-
-def get_shot_names(base_path: Path) -> List[str]:
-    """Get unique shot folder names from the sequences directory"""
-    sequences_dir = base_path / "prod" / "sequences"
-    if not sequences_dir.exists():
-        return []
-
-    # Looks for folders starting with 'seq_' (e.g., seq_010_shot_0010)
-    shot_names = [item.name for item in sequences_dir.iterdir() if item.is_dir() and item.name.startswith("seq_")]
-    return sorted(shot_names)
-
-
-def get_shot_departments(base_path: Path, shot_name: str) -> List[str]:
-    """Get all department folder names from a specific shot's working directory."""
-    # Construct the path to the working directory for the specific shot
-    working_dir = base_path / "prod" / "sequences" / shot_name / "working"
-
-    if not working_dir.exists():
-        return []
-
-    # Return names of all sub-directories inside 'working', ignoring hidden folders
-    depts = [item.name for item in working_dir.iterdir() if item.is_dir() and not item.name.startswith('.')]
-    return sorted(depts)
-
-
-def build_directory_tree(path: Path, prefix: str = "") -> str:
-    #  build tree visualization
-    tree = ""
-    try:
-        # Sort items: directories first, then files, both alphabetically
-        items = sorted(path.iterdir(), key=lambda x: (not x.is_dir(), x.name.lower()))
-    except (PermissionError, NotADirectoryError):
-        return tree
-    except FileNotFoundError:
-        return tree
-
-    # Filter out hidden files/dirs
-    items = [item for item in items if not item.name.startswith('.')]
-
-    # Separate directories and files
-    folders = [item for item in items if item.is_dir()]
-    files = [item for item in items if item.is_file()]
-
-    # Render folders
-    for i, folder in enumerate(folders):
-        is_last_folder = (i == len(folders) - 1) and len(files) == 0
-        connector = "└── " if is_last_folder else "├── "
-        tree += f"{prefix}{connector}📁 {folder.name}\n"
-
-        extension = "    " if is_last_folder else "│   "
-        tree += build_directory_tree(folder, prefix + extension)
-
-    # Render files
-    for i, file in enumerate(files):
-        is_last = i == len(files) - 1
-        connector = "└── " if is_last else "├── "
-        tree += f"{prefix}{connector}📄 {file.name}\n"
-
-    return tree
+from jade_api.create import create_new_asset, create_new_shot, create_new_shot_asset
+from jade_api.scan import (
+    ASSET_TYPE_MAP, get_asset_types, get_asset_names, get_shot_names, get_shot_departments
+)
+from jade_api.publish import (
+    execute_asset_plan, publish_shot, publish_shot_sequence, get_shot_source_dir, SEQUENCE_DEPARTMENTS,
+    MissingFramesError, recover_publishes
+)
+from jade_api.sequences import parse_frame_range
+from jade_api.batch import resolve_shot_publishes, run_batch_publish, sequence_of, shot_departments, shot_names
+from jade_api.catalog import ShowCatalog
+from jade_api.plan import PublishPlanner
+from jade_api.prefetch import ShotPrefetcher
+from jade_api.watcher import create_watcher
+from jade_api.tree_model import CatalogTreeModel
 
 
 # ======================== UI WIDGET CLASSES ========================
@@ -222,6 +146,8 @@ class CreateShotAssetForm(QWidget):
         # 1. Shot Selection Dropdown
         layout.addWidget(QLabel("Shot #"))
         self.shot_name_combo = QComboBox()
+        self.shot_name_combo.currentIndexChanged.connect(
+            lambda: self.main_window.prefetch_shot(self.shot_name_combo.currentText()))
         layout.addWidget(self.shot_name_combo)
 
         # 2. Shot Asset Name Input
@@ -337,8 +263,17 @@ class PublishAssetForm(QWidget):
         # Asset Name Select
         layout.addWidget(QLabel("Asset Name"))
         self.asset_name_combo = QComboBox()
+        self.asset_name_combo.currentIndexChanged.connect(self.speculate_plan)
         layout.addWidget(self.asset_name_combo)
 
+        # Preview of the publish plan, resolved in the background as the selection changes
+        self.plan_preview = QLabel("")
+        self.plan_preview.setWordWrap(True)
+        layout.addWidget(self.plan_preview)
+        self._plan_future = None
+        self.plan_timer = QTimer(self)
+        self.plan_timer.timeout.connect(self._show_plan)
+
         # Publish Button
         self.publish_button = QPushButton("Publish Asset")
         self.publish_button.setFont(QFont('Consolas', 10))
@@ -377,6 +312,38 @@ class PublishAssetForm(QWidget):
             self.asset_name_combo.addItem("No assets found")
             self.publish_button.setEnabled(False)
 
+    def _selection(self):
+        # (base_path, asset type key, asset name, department), None without a valid selection
+        base_path = self.main_window.base_path
+        asset_name = self.asset_name_combo.currentText()
+        if not base_path or not asset_name or asset_name == "No assets found":
+            return None
+        return (base_path, ASSET_TYPE_MAP.get(self.asset_type_combo.currentText()), asset_name,
+                self.department_combo.currentText().lower())
+
+    def speculate_plan(self):
+        """Resolve the publish plan of the new selection in the background and preview it."""
+        selection = self._selection()
+        if selection is None:
+            self._plan_future = None
+            self.plan_timer.stop()
+            self.plan_preview.setText("")
+            return
+        self._plan_future = self.main_window.publish_planner.request(*selection)
+        self.plan_preview.setText("Planning...")
+        self.plan_timer.start(PLAN_POLL_MS)
+
+    def _show_plan(self):
+        future = self._plan_future
+        if future is None or future.done():
+            self.plan_timer.stop()
+        if future is None or not future.done():
+            return
+        try:
+            self.plan_preview.setText(future.result().preview())
+        except (OSError, ValueError) as e:
+            self.plan_preview.setText(str(e))
+
     def handle_publish_asset(self):
         """Handle publish asset button click: focused strictly on Assets."""
         base_path = self.main_window.base_path
@@ -389,108 +356,22 @@ class PublishAssetForm(QWidget):
             QMessageBox.warning(self, "Warning", "Please ensure a valid selection and base path.")
             return
 
-        department_map = {
-            "geo": [(".usd", ".usd", "file")],
-            "rig": [(".ma", ".ma", "file")],
-            "assembly": [
-                (".geo.usdc", ".geo.usdc", "file"),
-                (".mtl.usdc", ".mtl.usdc", "file"),
-                (".payload.usdc", ".payload.usdc", "file"),
-                (".usd", ".usd", "file"),
-                (None, ".textures", "folder")
-            ],
-            "tex": [
-                (".png", ".png", "file"),
-                (None, ".textures", "folder")
-            ]
-        }
-
-        target_extensions = department_map.get(department)
-        if not target_extensions:
-            QMessageBox.warning(self, "Warning", f"Publish logic not implemented for: {department}")
-            return
-
         try:
-            # Simplified Asset-Only Path Logic
-            asset_type_map = {"Character": "char", "Prop": "prop", "Set": "set"}
-            asset_type_key = asset_type_map.get(asset_type)
-
-            source_dir = base_path / "prod" / "asset" / "working" / asset_type_key / asset_name / department / "export"
-            destination_dir = base_path / "prod" / "asset" / "publish" / asset_type_key / asset_name / department
+            asset_type_key = ASSET_TYPE_MAP.get(asset_type)
             identifier_name = asset_name
 
-            destination_dir.mkdir(parents=True, exist_ok=True)
-            files_published = []
-            source_file_details = []
-
-            # 3. Special Case: TEX Department
-            if department == "tex":
-                highest_source_folder = find_highest_version_file(
-                    source_dir, identifier_name, department, None, is_folder_search=True
-                )
-                if highest_source_folder:
-                    source_file_details.append(highest_source_folder.name)
-                    # Clear destination
-                    for item in destination_dir.iterdir():
-                        if item.is_dir():
-                            shutil.rmtree(item)
-                        else:
-                            item.unlink()
-
-                    version_and_initials_pattern = re.compile(r'_v\d+_[a-zA-Z]+')
-                    items_copied_count = 0
-                    for source_item_path in highest_source_folder.iterdir():
-                        item_name = source_item_path.name
-                        if source_item_path.is_file() and version_and_initials_pattern.search(item_name):
-                            new_item_name = version_and_initials_pattern.sub('', item_name)
-                            shutil.copy2(source_item_path, destination_dir / new_item_name)
-                            items_copied_count += 1
-                        else:
-                            dest_item_path = destination_dir / item_name
-                            if source_item_path.is_dir():
-                                shutil.copytree(source_item_path, dest_item_path)
-                            else:
-                                shutil.copy2(source_item_path, dest_item_path)
-                            items_copied_count += 1
-                    files_published.append(f"TEX Folder: {items_copied_count} items")
-
-            # 4. Special Case: ASSEMBLY Department (Folder Logic)
-            elif department == "assembly":
-                highest_source_folder = find_highest_version_file(
-                    source_dir, identifier_name, department, None, is_folder_search=True
-                )
-                if highest_source_folder:
-                    source_file_details.append(highest_source_folder.name)
-                    dest_textures_path = destination_dir / ".textures"
-
-                    if dest_textures_path.exists():
-                        shutil.rmtree(dest_textures_path)
-
-                    shutil.copytree(highest_source_folder, dest_textures_path)
-                    files_published.append(f"Assembly Folder: .textures")
-
-            # 5. Standard Publishing Loop (Files)
-            for source_ext, publish_ext, item_type in target_extensions:
-                if item_type == "folder":
-                    continue
-
-                highest_source_file = find_highest_version_file(source_dir, identifier_name, department, source_ext)
-                if not highest_source_file:
-                    continue
-
-                source_file_details.append(highest_source_file.name)
-                new_file_name = f"{identifier_name}_{department}{publish_ext}"
-                destination_file = destination_dir / new_file_name
-
-                if destination_file.exists():
-                    destination_file.unlink()
-
-                shutil.copy2(highest_source_file, destination_file)
-                files_published.append(new_file_name)
+            try:
+                # Usually resolved in the background already, the click only runs it
+                plan = self.main_window.publish_planner.plan(base_path, asset_type_key, identifier_name, department)
+                files_published, source_file_details = execute_asset_plan(plan)
+            except ValueError as e:
+                QMessageBox.warning(self, "Warning", str(e))
+                return
+            self.speculate_plan()
 
             # 6. Success and Logging
             if files_published:
-                self.main_window.show_message(f"Published {source_file_details} to {new_file_name}", "success")
+                self.main_window.show_message(f"Published {source_file_details} to {files_published[-1]}", "success")
                 self.main_window.directory_viewer.refresh_tree()
                 log_action(
                     base_path=base_path,
@@ -535,6 +416,14 @@ class PublishShotForm(QWidget):
         self.department_combo = QComboBox()
         layout.addWidget(self.department_combo)
 
+        # Frame caches (fx, charfx): optional frame range and hardlinks instead of copies
+        layout.addWidget(QLabel("Frame Range (fx / charfx)"))
+        self.frame_range_input = QLineEdit()
+        self.frame_range_input.setPlaceholderText("e.g. 1001-1100, empty for all frames")
+        layout.addWidget(self.frame_range_input)
+        self.link_frames_checkbox = QCheckBox("Hardlink frames instead of copying (same volume)")
+        layout.addWidget(self.link_frames_checkbox)
+
         # Publish Button
         self.publish_button = QPushButton("Publish Shot")
         self.publish_button.setFont(QFont('Consolas', 10))
@@ -545,6 +434,22 @@ class PublishShotForm(QWidget):
         self.publish_button.clicked.connect(self.handle_publish_shot)
         layout.addWidget(self.publish_button)
 
+        # Batch publishing: versions resolved from the show catalog, copies run concurrently
+        batch_style = """
+            QPushButton { background-color: #c6ead8; padding: 5px 10px; min-height: 10px; border-radius: 10px; }
+            QPushButton:hover { background-color: #339664; }
+        """
+        self.publish_all_departments_button = QPushButton("Publish All Departments of Shot")
+        self.publish_sequence_button = QPushButton("Publish Every Shot in Sequence")
+        self.publish_changed_button = QPushButton("Publish Everything Changed")
+        for button, handler in ((self.publish_all_departments_button, self.handle_publish_all_departments),
+                                (self.publish_sequence_button, self.handle_publish_sequence),
+                                (self.publish_changed_button, self.handle_publish_changed)):
+            button.setFont(QFont('Consolas', 10))
+            button.setStyleSheet(batch_style)
+            button.clicked.connect(handler)
+            layout.addWidget(button)
+
         layout.addStretch(1)
         self.refresh_shots()
 
@@ -557,8 +462,12 @@ class PublishShotForm(QWidget):
             self.department_combo.clear()
             return
 
-        # Fetch folders directly from the filesystem
-        depts = get_shot_departments(base_path, shot_name)
+        # Cached listing from the show catalog, kept current by the folder watcher
+        catalog = self.main_window.catalog
+        if catalog is not None:
+            depts = shot_departments(catalog, shot_name)
+        else:
+            depts = get_shot_departments(base_path, shot_name)
 
         self.department_combo.clear()
         if depts:
@@ -567,6 +476,7 @@ class PublishShotForm(QWidget):
         else:
             self.department_combo.addItem("No departments found")
             self.publish_button.setEnabled(False)
+        self.main_window.prefetch_shot(shot_name)
 
     def refresh_shots(self):
         base_path = self.main_window.base_path
@@ -585,28 +495,24 @@ class PublishShotForm(QWidget):
         department = self.department_combo.currentText().lower()
 
         try:
-            # SHOT PATHS: prod/sequences/<shot_name>/working/<dept>/export
-            source_dir = base_path / "prod" / "sequences" / shot_name / "working" / department / "export"
-            destination_dir = base_path / "prod" / "sequences" / shot_name / "publish" / department
+            if department in SEQUENCE_DEPARTMENTS and self.publish_frame_sequence(base_path, shot_name, department):
+                return
 
-            # Identify highest version using your find_highest_version_file in create.py
-            # Extension is set to .usd as per your requirement
-            highest_file = find_highest_version_file(source_dir, shot_name, department, ".usd")
+            # SHOT PATHS: prod/sequences/<shot_name>/working/<dept>/export -> publish/<dept>
+            result = publish_shot(base_path, shot_name, department)
 
-            if not highest_file:
+            if not result:
+                source_dir = get_shot_source_dir(base_path, shot_name, department)
                 QMessageBox.warning(self, "Not Found", f"No versioned .usd files found in {source_dir}")
                 return
 
-            # Final name: seq_010_shot_0010_light.usd
-            dest_file = destination_dir / f"{shot_name}_{department}.usd"
-            destination_file = f"{shot_name}_{department}.usd"
-            destination_dir.mkdir(parents=True, exist_ok=True)
-            if dest_file.exists():
-                dest_file.unlink()
+            highest_file, dest_file, copied = result
+            destination_file = dest_file.name
 
-            shutil.copy2(highest_file, dest_file)
-
-            self.main_window.show_message(f"Published {highest_file.name} to {destination_file}", "success")
+            if copied:
+                self.main_window.show_message(f"Published {highest_file.name} to {destination_file}", "success")
+            else:
+                self.main_window.show_message(f"{destination_file} is already {highest_file.name}, nothing copied", "info")
             self.main_window.directory_viewer.refresh_tree()
 
             log_action(
@@ -618,6 +524,105 @@ class PublishShotForm(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to publish shot: {str(e)}")
 
+    def handle_publish_all_departments(self):
+        shot_name = self.shot_name_combo.currentText()
+        if shot_name == "No shots found":
+            return
+        self.batch_publish([shot_name], f"all departments of {shot_name}")
+
+    def handle_publish_sequence(self):
+        shot_name = self.shot_name_combo.currentText()
+        catalog = self.main_window.catalog
+        if shot_name == "No shots found" or catalog is None:
+            return
+        sequence = sequence_of(shot_name)
+        self.batch_publish(shot_names(catalog, sequence), f"every shot in {sequence}")
+
+    def handle_publish_changed(self):
+        catalog = self.main_window.catalog
+        if catalog is None:
+            return
+        self.batch_publish(shot_names(catalog), "everything changed since the last publish", changed_only=True)
+
+    def batch_publish(self, shots, description: str, changed_only: bool = False):
+        """Resolve every shot department of shots from the catalog, confirm, then publish them concurrently."""
+        base_path = self.main_window.base_path
+        catalog = self.main_window.catalog
+        if not base_path or catalog is None:
+            QMessageBox.warning(self, "Warning", "Please ensure a valid base path.")
+            return
+
+        # Apply pending watcher events so just-exported versions are seen
+        self.main_window._apply_fs_changes()
+        jobs = resolve_shot_publishes(catalog, shots, changed_only=changed_only)
+        if not jobs:
+            QMessageBox.information(self, "Nothing to Publish", f"No versioned exports to publish for {description}.")
+            return
+
+        preview = "\n".join(str(job) for job in jobs[:15]) + ("\n..." if len(jobs) > 15 else "")
+        answer = QMessageBox.question(self, "Batch Publish",
+                                      f"Publish {len(jobs)} items ({description})?\n\n{preview}")
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+
+        try:
+            results = run_batch_publish(catalog, jobs, progress=lambda done, total: QApplication.processEvents())
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Batch publish failed: {str(e)}")
+            return
+
+        failed = [(job, error) for job, _, error in results if error is not None]
+        for job, result, error in results:
+            if error is None and result:
+                log_action(
+                    base_path=base_path,
+                    action="Publish_Shot",
+                    details=f"{job.department.upper()} / {job.shot_name} | Source: {job.source.name} | Batch"
+                )
+
+        published_count = len(results) - len(failed)
+        self.main_window.show_message(f"Batch published {published_count} of {len(results)} items", "success")
+        self.main_window.directory_viewer.refresh_tree()
+        if failed:
+            details = "\n".join(f"{job}: {error}" for job, error in failed)
+            QMessageBox.warning(self, "Batch Publish", f"Failed:\n{details}")
+
+    def publish_frame_sequence(self, base_path, shot_name: str, department: str) -> bool:
+        """Publish the latest frame-cache folder. Returns False when the department has no cache folder."""
+        try:
+            frame_range = parse_frame_range(self.frame_range_input.text())
+        except ValueError as e:
+            QMessageBox.warning(self, "Warning", str(e))
+            return True
+
+        link = self.link_frames_checkbox.isChecked()
+        try:
+            result = publish_shot_sequence(base_path, shot_name, department, frame_range=frame_range, link=link)
+        except MissingFramesError as e:
+            answer = QMessageBox.question(self, "Missing Frames", f"{e}\n\nPublish the existing frames anyway?")
+            if answer != QMessageBox.StandardButton.Yes:
+                return True
+            result = publish_shot_sequence(base_path, shot_name, department, frame_range=frame_range, link=link,
+                                           allow_missing=True)
+        except ValueError as e:
+            QMessageBox.warning(self, "Warning", str(e))
+            return True
+
+        if not result:
+            return False
+
+        source_folder, _, sequences = result
+        published = ", ".join(str(sequence) for sequence in sequences)
+        self.main_window.show_message(f"Published {published} from {source_folder.name}", "success")
+        self.main_window.directory_viewer.refresh_tree()
+
+        log_action(
+            base_path=base_path,
+            action="Publish_Shot",
+            details=f"{department.upper()} / {shot_name} | Source: {source_folder.name} | {published}"
+        )
+        return True
+
 
 class CreateShotForm(QWidget):
     """Widget for creating a new shot."""
@@ -724,7 +729,7 @@ class CreateShotForm(QWidget):
 
 
 class DirectoryViewer(QWidget):
-    """Widget for displaying the directory tree using QTreeView and QFileSystemModel."""
+    """Widget for displaying the directory tree using QTreeView and the catalog-backed CatalogTreeModel."""
 
     def __init__(self, main_window):
         super().__init__()
@@ -741,49 +746,31 @@ class DirectoryViewer(QWidget):
         header.setFont(QFont('Consolas', 15))
         layout.addWidget(header)
 
-        # 1. Initialize the Model
-        self.model = QFileSystemModel()
-        self.model.setRootPath(QDir.rootPath())  # Start at the root for model initialization
+        # 1. Initialize the Model: lists folders through the show catalog only when they are expanded
+        self.model = CatalogTreeModel(parent=self)
 
         # 2. Initialize the View
         self.tree_display = QTreeView()
         self.tree_display.setModel(self.model)
-        self.tree_display.setSortingEnabled(True)
+        self.tree_display.setHeaderHidden(True)
         self.tree_display.setUniformRowHeights(True)
         self.tree_display.setMinimumSize(400, 300)  # Ensure it has space
 
-        # Hide unnecessary columns (Size, Type, Date Modified)
-        for i in range(1, self.model.columnCount()):
-            self.tree_display.hideColumn(i)
-
         layout.addWidget(self.tree_display)
 
         # Initial refresh
         self.refresh_tree()
 
     def refresh_tree(self):
-        base_path = self.main_window.base_path
+        # The catalog is replaced when the base path changes; the rows of the same catalog
+        # are kept current by apply_fs_changes, so there is nothing to reload here
+        catalog = self.main_window.catalog
+        if catalog is not self.model.catalog:
+            self.model.set_catalog(catalog)
 
-        if not base_path or not base_path.exists():
-            # Clear or show a message if the path is invalid
-            self.tree_display.setRootIndex(QModelIndex())  # Clear the view
-            # You might need a separate status label if you want a text warning
-            return
-
-        # Set the root of the view to the base_path
-        root_index = self.model.index(str(base_path))
-
-        if root_index.isValid():
-            self.tree_display.setRootIndex(root_index)
-            # Ensure the first level is expanded for visibility (optional)
-            self.tree_display.expand(root_index)
-
-            # Auto-size the Name column to fit the path name
-            self.tree_display.header().resizeSection(0, 300)
-        else:
-            # Handle case where the path exists but isn't valid for QFileSystemModel
-            # (less common, but good practice)
-            self.tree_display.setRootIndex(QModelIndex())
+    def apply_fs_changes(self, changed_folders):
+        """Update the expanded folders the watcher reported as changed."""
+        self.model.apply_fs_changes(changed_folders)
 
 
 class TextDirectoryViewer(QWidget):
@@ -813,20 +800,33 @@ class TextDirectoryViewer(QWidget):
 
     def refresh_tree(self):
         base_path = self.main_window.base_path
-        if not base_path or not base_path.exists():
+        catalog = self.main_window.catalog
+        if not base_path or catalog is None:
             self.tree_display.setPlainText("Base folder not found. Please check the path.")
             return
 
         tree_text = f"📦 {base_path.name}\n"
         try:
-            tree_text += build_directory_tree(base_path)
+            # Only folders changed since the last render are listed again
+            tree_text += catalog.render_tree()
             self.tree_display.setPlainText(tree_text)
         except Exception as e:
             self.tree_display.setPlainText(f"Error reading directory: {str(e)}")
 
+    def apply_fs_changes(self, changed_folders):
+        """Re-render after the watcher reported changes (the catalog is already invalidated)."""
+        self.refresh_tree()
+
 
 # ======================== MAIN WINDOW ========================
 
+# How often the GUI applies the changes queued by the folder watcher
+WATCH_DRAIN_MS = 250
+
+# How often a form checks whether its background publish plan is ready
+PLAN_POLL_MS = 100
+
+
 class JADEGui(QMainWindow):
     """Main application window, replacing the Streamlit layout."""
 
@@ -841,6 +841,13 @@ class JADEGui(QMainWindow):
         self.setGeometry(100, 100, 1200, 800)
         # self.setStyleSheet(QSS_THEME)
         self.selected_action = "publish_asset"  # "new_asset"
+        # Cached listings of the base folder, kept current by a background watcher
+        self.catalog: Optional[ShowCatalog] = None
+        self.watcher = None
+        # Warms the catalog (and the remote cache) for the shot selected in a form
+        self.prefetcher: Optional[ShotPrefetcher] = None
+        # Asset publish plans resolved ahead of the click
+        self.publish_planner = PublishPlanner()
 
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
@@ -848,6 +855,56 @@ class JADEGui(QMainWindow):
 
         self.init_ui()
 
+        # Opt-in cProfile hooks on every action handler (set JADE_PROFILE=1)
+        install_gui_profiling(self)
+        # Opt-in metadata call counts per action handler (set JADE_FS_TRACE=1)
+        install_gui_fs_tracing(self)
+
+        # Apply changes seen by the watcher (ours and other artists') a few times per second
+        self.watch_timer = QTimer(self)
+        self.watch_timer.timeout.connect(self._apply_fs_changes)
+        self.watch_timer.start(WATCH_DRAIN_MS)
+
+    def _watch_base_path(self):
+        """Restart the catalog and the folder watcher on the current base path."""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+        if self.prefetcher is not None:
+            self.prefetcher.stop()
+            self.prefetcher = None
+        self.catalog = None
+        if self.base_path:
+            # Publishes interrupted by a crash are rolled forward or removed from their journals
+            try:
+                recover_publishes(self.base_path)
+            except OSError as e:
+                print(f"WARNING: could not recover interrupted publishes: {e}")
+            self.catalog = ShowCatalog(self.base_path)
+            self.watcher = create_watcher(self.base_path, folders=self.catalog.cached_folders)
+            self.prefetcher = ShotPrefetcher(self.catalog)
+
+    def _apply_fs_changes(self):
+        if self.watcher is None or self.catalog is None:
+            return
+        changed_folders = self.watcher.drain()
+        if changed_folders:
+            self.catalog.apply_changes(changed_folders)
+            self.directory_viewer.apply_fs_changes(changed_folders)
+
+    def prefetch_shot(self, shot_name: str):
+        """Start warming a shot selected in a form, cancelling the previous prefetch."""
+        if self.prefetcher is not None and shot_name.startswith("seq_"):
+            self.prefetcher.prefetch(shot_name)
+
+    def closeEvent(self, event):
+        if self.watcher is not None:
+            self.watcher.stop()
+        if self.prefetcher is not None:
+            self.prefetcher.stop()
+        self.publish_planner.stop()
+        super().closeEvent(event)
+
     def init_ui(self):
         # 1. Title and Messages
         title_widget = self._render_title_and_messages()
@@ -989,12 +1046,14 @@ class JADEGui(QMainWindow):
             self.path_status_label.setStyleSheet("color: green; font-weight: bold;")
 
             # Re-enable main content if it was disabled
+            self._watch_base_path()
             self.directory_viewer.refresh_tree()
             self.publish_asset_form.update_asset_names()
         else:
             self.base_path = None
             self.path_status_label.setText("Path Not Found")
             self.path_status_label.setStyleSheet("color: red; font-weight: bold;")
+            self._watch_base_path()
             self.directory_viewer.refresh_tree()  # Display error message
 
     def _render_actions_panel(self):